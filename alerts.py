@@ -0,0 +1,243 @@
+"""
+Alertas de precio objetivo ("avísame cuando CEMEXCPO < 18") indexadas por ticker
+"""
+import json
+import uuid
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+import pytz
+
+from ticker_registry import REGISTRO, normalizar
+
+CDMX_TZ = pytz.timezone("America/Mexico_City")
+
+# una_vez: se dispara y queda inactiva
+# histeresis: se rearma cuando el precio regresa más allá de histeresis_pct del umbral
+# diario: se rearma al día siguiente
+REARMES = ["una_vez", "histeresis", "diario"]
+
+
+def _clave_ticker(ticker):
+    return REGISTRO.resolver(ticker) or normalizar(ticker).replace("*", "").replace(".MX", "")
+
+
+def resolver_tenencia(ticker, tenencias):
+    """
+    Ticker de la posición a la que se refiere `ticker` ("AMZN" → "AMZN*",
+    "alsea" → "ALSEA*"), tal como aparece en el portafolio; None si no se tiene.
+    """
+    clave = _clave_ticker(ticker)
+    for t in tenencias:
+        if _clave_ticker(t) == clave:
+            return normalizar(t)
+    return None
+
+
+def nueva_alerta(ticker, condicion, precio, rearme="una_vez", histeresis_pct=1.0, tenencias=None):
+    """
+    Alerta lista para guardarse en portfolio["alertas"]. El precio es en MXN
+    (se compara contra precio_mercado de la posición). Con `tenencias` el
+    ticker se resuelve a la posición y se rechaza si no se tiene.
+    """
+    if condicion not in ("<", ">"):
+        raise ValueError(f"Condición inválida: {condicion}")
+    if tenencias is not None:
+        resuelto = resolver_tenencia(ticker, tenencias)
+        if resuelto is None:
+            raise ValueError(f"{ticker} no está en el portafolio: solo hay precio para las posiciones")
+        ticker = resuelto
+    return {
+        "id": uuid.uuid4().hex[:8],
+        "ticker": normalizar(ticker),
+        "condicion": condicion,
+        "precio": float(precio),
+        "rearme": rearme,
+        "histeresis_pct": float(histeresis_pct),
+        "activa": True,
+        "disparada_en": None,
+    }
+
+
+class _Lado:
+    """Umbrales de un ticker y una condición, ordenados para búsqueda binaria."""
+    __slots__ = ("niveles", "claves")
+
+    def __init__(self):
+        self.niveles = []
+        self.claves = []
+
+    def agregar(self, nivel, clave):
+        i = bisect_right(self.niveles, nivel)
+        self.niveles.insert(i, nivel)
+        self.claves.insert(i, clave)
+
+    def quitar(self, nivel, clave):
+        i = bisect_left(self.niveles, nivel)
+        while i < len(self.niveles) and self.niveles[i] == nivel:
+            if self.claves[i] == clave:
+                del self.niveles[i], self.claves[i]
+                return
+            i += 1
+
+    def extraer(self, i, j):
+        """Saca y regresa las claves en el rango [i, j)."""
+        claves = self.claves[i:j]
+        del self.niveles[i:j], self.claves[i:j]
+        return claves
+
+
+class IndiceAlertas:
+    """
+    Alertas de todos los usuarios en listas ordenadas por ticker y condición.
+    Con cada precio nuevo solo se revisa el rango de umbrales cruzado entre el
+    precio previo y el nuevo (dos bisect), no todas las alertas.
+
+    Las alertas son los mismos dicts del portafolio: al dispararse se marcan en
+    sitio y el usuario queda en `pendientes_guardar`.
+    """
+
+    def __init__(self):
+        self._activas = {}   # (ticker, condicion) → _Lado por umbral
+        self._rearme = {}    # (ticker, condicion) → _Lado por nivel de rearme (histéresis)
+        self._diarias = []   # claves disparadas que se rearman al cambiar el día
+        self._alertas = {}   # clave → (user_id, alerta)
+        self._ultimo = {}    # ticker → último precio visto
+        self._fecha = None
+        self.pendientes_guardar = set()
+
+    def cargar_usuario(self, user_id, alertas):
+        for alerta in alertas or []:
+            self.agregar(user_id, alerta)
+        return self
+
+    def agregar(self, user_id, alerta):
+        clave = (user_id, alerta["id"])
+        self._alertas[clave] = (user_id, alerta)
+        lado = (alerta["ticker"], alerta["condicion"])
+        if alerta.get("activa", True):
+            self._activas.setdefault(lado, _Lado()).agregar(alerta["precio"], clave)
+        elif alerta.get("rearme") == "histeresis":
+            self._rearme.setdefault(lado, _Lado()).agregar(self._nivel_rearme(alerta), clave)
+        elif alerta.get("rearme") == "diario":
+            self._diarias.append(clave)
+
+    def quitar(self, user_id, id_alerta):
+        clave = (user_id, id_alerta)
+        if clave not in self._alertas:
+            return
+        _, alerta = self._alertas.pop(clave)
+        lado = (alerta["ticker"], alerta["condicion"])
+        for indice in (self._activas, self._rearme):
+            if lado in indice:
+                indice[lado].quitar(alerta["precio"], clave)
+                indice[lado].quitar(self._nivel_rearme(alerta), clave)
+        if clave in self._diarias:
+            self._diarias.remove(clave)
+
+    @staticmethod
+    def _nivel_rearme(alerta):
+        h = alerta.get("histeresis_pct", 1.0) / 100
+        return alerta["precio"] * (1 + h) if alerta["condicion"] == "<" else alerta["precio"] * (1 - h)
+
+    def _rearmar(self, claves):
+        for clave in claves:
+            if clave not in self._alertas:
+                continue
+            _, alerta = self._alertas[clave]
+            alerta["activa"] = True
+            self._activas.setdefault((alerta["ticker"], alerta["condicion"]), _Lado()).agregar(alerta["precio"], clave)
+            self.pendientes_guardar.add(clave[0])
+
+    def procesar(self, ticker, precio, marca=None):
+        """
+        Precio nuevo de un ticker → lista de (user_id, alerta) disparadas.
+        "<": se dispara si el umbral quedó en (nuevo, previo]; ">": en [previo, nuevo).
+        Sin precio previo se revisa el nivel (todas las que ya se cumplen).
+        """
+        marca = marca or datetime.now(CDMX_TZ)
+        if self._fecha is not None and marca.date() != self._fecha and self._diarias:
+            diarias, self._diarias = self._diarias, []
+            self._rearmar(diarias)
+        self._fecha = marca.date()
+
+        previo = self._ultimo.get(ticker)
+        self._ultimo[ticker] = precio
+        disparadas = []
+
+        debajo = self._activas.get((ticker, "<"))
+        if debajo and (previo is None or precio < previo):
+            tope = len(debajo.niveles) if previo is None else bisect_right(debajo.niveles, previo)
+            disparadas += debajo.extraer(bisect_right(debajo.niveles, precio), tope)
+
+        encima = self._activas.get((ticker, ">"))
+        if encima and (previo is None or precio > previo):
+            piso = 0 if previo is None else bisect_left(encima.niveles, previo)
+            disparadas += encima.extraer(piso, bisect_left(encima.niveles, precio))
+
+        # Rearme por histéresis: el precio regresó lo suficiente del otro lado
+        if previo is not None:
+            rearme_bajo = self._rearme.get((ticker, "<"))
+            if rearme_bajo and precio > previo:
+                self._rearmar(rearme_bajo.extraer(bisect_right(rearme_bajo.niveles, previo),
+                                                  bisect_right(rearme_bajo.niveles, precio)))
+            rearme_alto = self._rearme.get((ticker, ">"))
+            if rearme_alto and precio < previo:
+                self._rearmar(rearme_alto.extraer(bisect_left(rearme_alto.niveles, precio),
+                                                  bisect_left(rearme_alto.niveles, previo)))
+
+        resultado = []
+        for clave in disparadas:
+            user_id, alerta = self._alertas[clave]
+            alerta["activa"] = False
+            alerta["disparada_en"] = marca.isoformat()
+            alerta["precio_disparo"] = float(precio)
+            if alerta.get("rearme") == "histeresis":
+                self._rearme.setdefault((ticker, alerta["condicion"]), _Lado()).agregar(self._nivel_rearme(alerta), clave)
+            elif alerta.get("rearme") == "diario":
+                self._diarias.append(clave)
+            self.pendientes_guardar.add(user_id)
+            resultado.append((user_id, alerta))
+        return resultado
+
+    def procesar_precios(self, precios, marca=None):
+        """{ticker: precio} → todas las alertas disparadas."""
+        disparadas = []
+        for ticker, precio in precios.items():
+            disparadas += self.procesar(ticker, float(precio), marca)
+        return disparadas
+
+    def alertas_usuario(self, user_id):
+        return [a for (u, _), (_, a) in self._alertas.items() if u == user_id]
+
+
+def cargar_indice_usuarios():
+    """
+    Índice con las alertas de todos los usuarios (proceso de fondo con llave de
+    servicio; con la llave anónima RLS solo regresa el portafolio propio).
+    Regresa (índice, {user_id: portfolio}) para poder guardar los cambios.
+    """
+    from data_loader import get_supabase
+
+    indice, portafolios = IndiceAlertas(), {}
+    try:
+        response = get_supabase().table('portfolios').select('user_id, data').execute()
+        for fila in response.data or []:
+            portfolio = json.loads(fila['data']) if fila.get('data') else {}
+            portafolios[fila['user_id']] = portfolio
+            indice.cargar_usuario(fila['user_id'], portfolio.get('alertas', []))
+    except Exception as e:
+        print(f"Error cargando alertas: {e}")
+    return indice, portafolios
+
+
+def guardar_pendientes(indice, portafolios):
+    """
+    Guarda los portafolios cuyos estados de alerta cambiaron.
+    portafolios: {user_id: portfolio dict} con las mismas listas de alertas del índice.
+    """
+    from data_loader import save_user_portfolio_to_supabase
+
+    for user_id in list(indice.pendientes_guardar):
+        if user_id in portafolios and save_user_portfolio_to_supabase(user_id, portafolios[user_id]):
+            indice.pendientes_guardar.discard(user_id)
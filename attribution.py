@@ -0,0 +1,100 @@
+"""
+Atribución de P&L en efecto precio local, efecto tipo de cambio y término cruzado
+"""
+import numpy as np
+import pandas as pd
+
+from price_history import cargar_cierres, cargar_fx, moneda_ticker
+
+
+def _descomponer(q, p0, p1, x0, x1):
+    """
+    q·(p1·x1 − p0·x0) = q·Δp·x0  +  q·p0·Δx  +  q·Δp·Δx
+                        (precio)    (fx)       (cruzado)
+    """
+    dp, dx = p1 - p0, x1 - x0
+    return q * dp * x0, q * p0 * dx, q * dp * dx
+
+
+def costos_desde_ledger(ledger, fx_hist, monedas):
+    """
+    Costo en moneda local y tipo de cambio implícito de compra por ticker,
+    usando la fecha de cada lote FIFO abierto y el tipo de cambio de ese día.
+    """
+    lotes = ledger.lotes_abiertos()
+    if lotes.empty:
+        return pd.DataFrame(columns=["costo_local", "fx_costo"])
+    fechas = pd.to_datetime(lotes["fecha_compra"])
+    fx = np.ones(len(lotes))
+    for moneda in set(monedas.values()) - {"MXN"}:
+        if moneda not in fx_hist:
+            continue
+        mask = (lotes["ticker"].map(monedas) == moneda).to_numpy()
+        serie = fx_hist[moneda].dropna()
+        pos = np.clip(np.searchsorted(serie.index.values, fechas[mask].values, side="right") - 1, 0, None)
+        fx[mask] = serie.to_numpy()[pos]
+
+    lotes["costo_local"] = lotes["costo_unitario"] / fx * lotes["titulos"]
+    lotes["costo_mxn"] = lotes["costo_unitario"] * lotes["titulos"]
+    agg = lotes.groupby("ticker")[["titulos", "costo_local", "costo_mxn"]].sum()
+    return pd.DataFrame({
+        "costo_local": agg["costo_local"] / agg["titulos"],
+        "fx_costo": agg["costo_mxn"] / agg["costo_local"],
+    })
+
+
+def atribucion(df, cierres=None, fx_hist=None, costos=None, actualizar=False):
+    """
+    Atribución diaria y total por posición (vectorizada) usando los cierres y
+    tipos de cambio de la caché local; con actualizar=False no hay consultas.
+
+    - Diaria: entre los dos últimos cierres disponibles.
+    - Total: contra el costo. Para posiciones en USD/HKD necesita el costo en
+      moneda local (`costos`, p.ej. de costos_desde_ledger); sin él queda NaN.
+    """
+    posiciones = df.drop_duplicates("ticker").reset_index(drop=True)
+    tickers = posiciones["ticker"].tolist()
+    mercados = posiciones["mercado"].tolist()
+    monedas = {t: moneda_ticker(t, m) for t, m in zip(tickers, mercados)}
+
+    if cierres is None:
+        cierres = cargar_cierres(tickers, mercados, en_mxn=False, actualizar=actualizar)
+    if fx_hist is None:
+        fx_hist = cargar_fx(sorted(set(monedas.values()) - {"MXN"}), actualizar=actualizar)
+
+    cierres = cierres.reindex(columns=tickers).ffill()
+    fx = fx_hist.reindex(cierres.index).ffill().bfill()
+    fx["MXN"] = 1.0
+    X = fx.reindex(columns=[monedas[t] for t in tickers]).to_numpy()
+    P = cierres.to_numpy()
+
+    q = posiciones["titulos"].to_numpy(dtype=float)
+    p0, p1 = P[-2], P[-1]
+    x0, x1 = X[-2], X[-1]
+    precio_d, fx_d, cruz_d = _descomponer(q, p0, p1, x0, x1)
+
+    # Costo local y fx de compra: MXN directo; USD/HKD desde `costos`
+    costo_mxn = posiciones["costo_promedio"].to_numpy(dtype=float)
+    es_mxn = np.array([monedas[t] == "MXN" for t in tickers])
+    costos = costos if costos is not None else pd.DataFrame(columns=["costo_local", "fx_costo"])
+    pc = np.where(es_mxn, costo_mxn, posiciones["ticker"].map(costos["costo_local"]).to_numpy(dtype=float))
+    xc = np.where(es_mxn, 1.0, posiciones["ticker"].map(costos["fx_costo"]).to_numpy(dtype=float))
+    precio_t, fx_t, cruz_t = _descomponer(q, pc, p1, xc, x1)
+
+    tabla = pd.DataFrame({
+        "moneda": [monedas[t] for t in tickers],
+        "efecto_precio_dia": precio_d,
+        "efecto_fx_dia": fx_d,
+        "cruzado_dia": cruz_d,
+        "pnl_dia": precio_d + fx_d + cruz_d,
+        "efecto_precio_total": precio_t,
+        "efecto_fx_total": fx_t,
+        "cruzado_total": cruz_t,
+        "pnl_total": precio_t + fx_t + cruz_t,
+    }, index=pd.Index(tickers, name="ticker"))
+    return tabla
+
+
+def resumen_atribucion(tabla):
+    """Totales del portafolio por componente (ignora posiciones sin costo local)."""
+    return tabla.drop(columns="moneda").sum(min_count=1)
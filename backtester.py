@@ -0,0 +1,152 @@
+"""
+Backtest vectorizado de políticas de rebalanceo sobre cierres diarios
+"""
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+DIAS_POR_ANIO = 252
+FRECUENCIAS = {"mensual": 21, "trimestral": 63, "semestral": 126, "anual": 252}
+
+
+def pesos_objetivo(tickers, tipo="igual", pesos_actuales=None):
+    """Vector de pesos objetivo: 'igual' o 'actual' (dict ticker → peso)."""
+    if tipo == "actual" and pesos_actuales:
+        w = np.array([pesos_actuales.get(t, 0.0) for t in tickers], dtype=float)
+        if w.sum() > 0:
+            return w / w.sum()
+    return np.full(len(tickers), 1.0 / len(tickers))
+
+
+def backtest(cierres, pesos, politica="calendario", frecuencia="mensual", banda=0.05,
+             costo_bps=10.0, valor_inicial=100.0):
+    """
+    Simula una política de rebalanceo sobre la matriz fecha × ticker.
+
+    - politica: "calendario" (cada `frecuencia`), "umbral" (en cuanto algún peso
+      se aleja más de `banda` del objetivo), "ambos" (en cada fecha de calendario,
+      solo si se rebasó la banda) o "nunca" (buy & hold).
+    - Entre rebalanceos los títulos son constantes, así que la deriva de pesos de
+      todo un tramo se calcula de una vez: valores = títulos × precios.
+    """
+    precios = cierres.ffill().dropna().to_numpy(dtype=float)
+    T = len(precios)
+    pesos = np.asarray(pesos, dtype=float)
+    paso_cal = FRECUENCIAS.get(frecuencia, frecuencia) if politica in ("calendario", "ambos") else None
+    usa_umbral = politica == "umbral"
+    costo = costo_bps / 10_000
+
+    valores = np.empty(T)
+    titulos = valor_inicial * pesos / precios[0]
+    rotacion = 0.0
+    n_rebalanceos = 0
+    t0 = 0
+
+    while t0 < T:
+        fin = T if paso_cal is None else min(t0 + paso_cal, T)
+
+        # Deriva del tramo completo en una sola operación
+        tramo = titulos * precios[t0:fin]
+        valor_tramo = tramo.sum(axis=1)
+
+        # El día 0 solo está en el objetivo al arrancar; tras un rebalanceo ya trae deriva
+        inicio = 1 if t0 == 0 else 0
+        if usa_umbral and fin - t0 > inicio:
+            desvio = np.abs(tramo / valor_tramo[:, None] - pesos).max(axis=1)
+            fuera = np.flatnonzero(desvio[inicio:] > banda)
+            if fuera.size:
+                fin = t0 + inicio + fuera[0] + 1  # el día del rompimiento cierra el tramo
+
+        valores[t0:fin] = valor_tramo[:fin - t0]
+        if fin >= T:
+            break
+
+        # Rebalanceo al cierre del último día del tramo
+        t = fin - 1
+        valor = valores[t]
+        actual = titulos * precios[t]
+        if politica == "ambos" and np.abs(actual / valor - pesos).max() <= banda:
+            t0 = fin
+            continue
+        operado = np.abs(valor * pesos - actual).sum()
+        valor -= operado * costo
+        valores[t] = valor
+        titulos = valor * pesos / precios[t]
+        rotacion += operado / valor
+        n_rebalanceos += 1
+        t0 = fin
+
+    serie = pd.Series(valores, index=cierres.ffill().dropna().index)
+    return serie, estadisticas(serie, rotacion, n_rebalanceos)
+
+
+def estadisticas(serie, rotacion=0.0, n_rebalanceos=0):
+    """CAGR, volatilidad, Sharpe (sin tasa libre), máximo drawdown y rotación anual."""
+    v = serie.to_numpy()
+    anios = max(len(v) / DIAS_POR_ANIO, 1e-9)
+    ret = np.diff(v) / v[:-1]
+    vol = ret.std() * np.sqrt(DIAS_POR_ANIO) if len(ret) > 1 else 0.0
+    cagr = (v[-1] / v[0]) ** (1 / anios) - 1
+    drawdown = (v / np.maximum.accumulate(v) - 1).min()
+    return {
+        "cagr": cagr,
+        "volatilidad": vol,
+        "sharpe": cagr / vol if vol > 0 else 0.0,
+        "max_drawdown": drawdown,
+        "rotacion_anual": rotacion / anios,
+        "rebalanceos": n_rebalanceos,
+    }
+
+
+def _correr_config(args):
+    cierres, pesos, config = args
+    _, stats = backtest(cierres, pesos, **config)
+    return {**config, **stats}
+
+
+def backtest_lote(cierres, pesos, politicas=("nunca", "calendario", "umbral"),
+                  frecuencias=("mensual", "trimestral", "anual"), bandas=(0.02, 0.05, 0.10),
+                  costo_bps=10.0, n_workers=None):
+    """
+    Corre todas las combinaciones de parámetros en un pool de procesos.
+    Regresa una tabla con una fila por configuración.
+    """
+    configs = []
+    for politica in politicas:
+        if politica == "nunca":
+            configs.append({"politica": "nunca"})
+        elif politica == "calendario":
+            configs += [{"politica": politica, "frecuencia": f} for f in frecuencias]
+        elif politica == "umbral":
+            configs += [{"politica": politica, "banda": b} for b in bandas]
+        else:
+            configs += [{"politica": politica, "frecuencia": f, "banda": b}
+                        for f, b in product(frecuencias, bandas)]
+    for config in configs:
+        config["costo_bps"] = costo_bps
+
+    trabajos = [(cierres, pesos, c) for c in configs]
+    if n_workers == 1 or len(trabajos) == 1:
+        filas = [_correr_config(t) for t in trabajos]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers or os.cpu_count()) as pool:
+            filas = list(pool.map(_correr_config, trabajos))
+    return pd.DataFrame(filas)
+
+
+def cierres_demo(path="demo.json", actualizar=True):
+    """Cierres en MXN de los tickers de demo.json (u otro JSON con la misma forma)."""
+    from price_history import cargar_cierres
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    tickers, mercados = [], []
+    for clave, mercado in (("global", "Global"), ("mexico", "México")):
+        for asset in data.get(clave, []):
+            tickers.append(asset["ticker"])
+            mercados.append(mercado)
+    return cargar_cierres(tickers, mercados, en_mxn=True, actualizar=actualizar)
@@ -0,0 +1,155 @@
+"""
+Prima/descuento de las emisoras del SIC (BMV, en MXN) contra el precio en su
+mercado de origen por el tipo de cambio
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from intraday import BAR_STORE, CDMX_TZ
+from ticker_registry import REGISTRO
+
+UMBRAL_PRIMA_PCT = 3.0    # |prima| mayor se marca como cotización sospechosa
+UMBRAL_Z = 4.0            # Desviaciones contra la historia de la propia prima
+MAX_RETRASO_MIN = 30      # Barra BMV más vieja que el origen → cotización vieja
+TTL_ORIGEN_SEG = 60       # Los reruns dentro de este lapso reusan la descarga de origen
+
+# tuple(símbolos) → (hora de descarga, {símbolo: serie})
+_CACHE_ORIGEN = {}
+
+
+def listados_duales(tickers, mercados=None):
+    """
+    {ticker: (símbolo de origen, moneda)} de las posiciones que cotizan en el
+    SIC con un precio de origen en otra moneda (p.ej. "AMZN*" → ("AMZN", "USD")).
+    """
+    if mercados is None:
+        mercados = ["Global"] * len(tickers)
+    duales = {}
+    for t, m in zip(tickers, mercados):
+        info = REGISTRO.info(t, m)
+        if info["bolsa"] == "SIC" and info["moneda"] != "MXN":
+            duales[str(t)] = (info["yf"], info["moneda"])
+    return duales
+
+
+def primas(precio_bmv, precio_origen, fx):
+    """
+    Prima % = BMV / (origen × FX) - 1, elemento a elemento. Acepta escalares,
+    arreglos o DataFrames alineados (fecha × ticker) y da NaN si falta un lado.
+    """
+    teorico = precio_origen * fx
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (precio_bmv / teorico - 1) * 100
+
+
+def serie_primas(duales):
+    """
+    Prima diaria fecha × ticker desde las cachés locales (sin descargas): los
+    cierres BMV del screener, los de origen de price_history y el FX del día.
+    """
+    from price_history import cargar_cierres, cargar_fx
+    from screener import cierres_en_cache
+
+    bmv = cierres_en_cache().reindex(columns=list(duales))
+    if bmv.empty:
+        return pd.DataFrame(columns=list(duales))
+    origen = cargar_cierres(list(duales), en_mxn=False, actualizar=False).reindex(bmv.index).ffill()
+    monedas = [m for _, m in duales.values()]
+    fx = cargar_fx(sorted(set(monedas)), actualizar=False).reindex(bmv.index).ffill()
+    fx_columnas = fx.reindex(columns=monedas).to_numpy()
+    tabla = primas(bmv.to_numpy(), origen.reindex(columns=list(duales)).to_numpy(), fx_columnas)
+    return pd.DataFrame(tabla, index=bmv.index, columns=list(duales)).dropna(how="all")
+
+
+def _precios_origen(simbolos, ttl=TTL_ORIGEN_SEG):
+    """
+    Minutos de hoy en el mercado de origen de todos los símbolos en una sola
+    descarga; se reusa durante `ttl` segundos (cada rerun de la app lo pide).
+    """
+    clave = tuple(simbolos)
+    previa = _CACHE_ORIGEN.get(clave)
+    if previa is not None and time.time() - previa[0] < ttl:
+        return previa[1]
+    _CACHE_ORIGEN.clear()   # Solo interesa el conjunto de símbolos vigente
+    _CACHE_ORIGEN[clave] = (time.time(), _descargar_origen(simbolos))
+    return _CACHE_ORIGEN[clave][1]
+
+
+def _descargar_origen(simbolos):
+    import yfinance as yf
+
+    try:
+        hist = yf.download(" ".join(simbolos), period="1d", interval="1m", progress=False)["Close"]
+    except Exception as e:
+        print(f"Error descargando precios de origen: {e}")
+        return {}
+    if isinstance(hist, pd.Series):
+        hist = hist.to_frame(simbolos[0])
+    idx = pd.DatetimeIndex(hist.index)
+    hist.index = (idx.tz_localize("UTC") if idx.tz is None else idx).tz_convert(CDMX_TZ)
+    return {s: hist[s].dropna() for s in hist.columns}
+
+
+def formatear_marcas(marcas):
+    """Columna de marcas (datetime, NaT sin barra BMV) como "HH:MM" o "–"."""
+    return pd.to_datetime(pd.Series(marcas)).dt.strftime("%H:%M").fillna("–")
+
+
+def monitor_primas(duales, store=BAR_STORE, fx_rates=None, historico=None, precios_origen=None):
+    """
+    Prima actual de cada listado dual en una pasada: último precio BMV del
+    store (DataBursatil) contra el precio de origen en el mismo minuto × FX.
+    Marca cotizaciones viejas, sin datos o atípicas (umbral fijo o z-score
+    contra la serie histórica de la prima).
+    """
+    fx_rates = fx_rates or store.fx_rates
+    tickers = list(duales)
+    if precios_origen is None:
+        simbolos = sorted({s for s, _ in duales.values()})
+        precios_origen = _precios_origen(simbolos) if simbolos else {}
+
+    n = len(tickers)
+    bmv, origen = np.full(n, np.nan), np.full(n, np.nan)
+    retraso = np.full(n, np.nan)
+    marcas = [None] * n
+    for i, t in enumerate(tickers):
+        serie = store.serie(t)
+        if not len(serie) or store.bolsa(t) != "BMV":
+            continue
+        marcas[i], bmv[i] = serie.index[-1], serie.iloc[-1]
+        ref = precios_origen.get(duales[t][0])
+        if ref is not None and len(ref):
+            origen[i] = ref.asof(marcas[i]) if ref.index[0] <= marcas[i] else np.nan
+            retraso[i] = (ref.index[-1] - marcas[i]).total_seconds() / 60
+
+    fx = np.array([fx_rates.get(f"{m}_MXN", np.nan) for _, m in duales.values()], dtype=float)
+    prima = primas(bmv, origen, fx)
+
+    z = np.full(n, np.nan)
+    if historico is not None and not historico.empty:
+        hist = historico.reindex(columns=tickers)
+        media, desv = hist.mean().to_numpy(), hist.std().to_numpy()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            z = (prima - media) / desv
+
+    estado = np.select(
+        [np.isnan(bmv), np.isnan(origen), retraso > MAX_RETRASO_MIN,
+         (np.abs(prima) > UMBRAL_PRIMA_PCT) | (np.abs(z) > UMBRAL_Z)],
+        ["sin BMV", "sin origen", "vieja", "atípica"],
+        default="ok",
+    )
+    return pd.DataFrame({
+        "ticker": tickers,
+        "origen": [s for s, _ in duales.values()],
+        "precio_bmv": bmv,
+        "precio_origen": origen,
+        "fx": fx,
+        "precio_teorico": origen * fx,
+        "prima_pct": prima,
+        "z": z,
+        "marca_bmv": pd.to_datetime(marcas),
+        "retraso_min": retraso,
+        "estado": estado,
+    })
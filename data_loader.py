@@ -132,19 +132,25 @@ def save_user_portfolio_to_supabase(user_id, data):
         traceback.print_exc()
         return False
 
-def load_positions(path=None):
+def load_positions(path=None, desde_ledger=False):
     """
     Carga posiciones como DataFrame:
     1. Si path dado: carga desde archivo (demo.json)
-    2. Si usuario logueado: carga desde Supabase
-    3. Si no: carga desde positions.json local
+    2. Si desde_ledger y hay bitácora de operaciones: vista agregada del último checkpoint
+    3. Si usuario logueado: carga desde Supabase
+    4. Si no: carga desde positions.json local
     """
+    from ledger import existe_ledger, portafolio_desde_ledger
+    
     # 1. Si path explícito, usar archivo
     if path is not None:
         with open(path, "r", encoding="utf-8") as f:
             data = json.load(f)
+    elif desde_ledger and existe_ledger(get_logged_user_id() or "demo"):
+        # 2. Posiciones derivadas de la bitácora (sin re-aplicar todo el historial)
+        data = portafolio_desde_ledger(get_logged_user_id() or "demo")
     else:
-        # 2. Ver si hay usuario logueado
+        # 3. Ver si hay usuario logueado
         user_id = get_logged_user_id()
         
         if user_id:
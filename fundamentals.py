@@ -0,0 +1,119 @@
+"""
+Caché diaria de fundamentales por símbolo (capitalización, P/E, dividendo y
+sector) llenada en segundo plano desde yfinance
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+FUNDAMENTALES_PATH = "history/fundamentals.json"
+TTL_FUNDAMENTALES = 86400   # Como máximo una consulta al día por símbolo
+TAMANO_LOTE = 20
+TRABAJADORES = 4
+
+# Columna → campo de yfinance .info
+CAMPOS = {
+    "market_cap": "marketCap",
+    "pe": "trailingPE",
+    "dividend_yield": "trailingAnnualDividendYield",
+    "sector": "sector",
+}
+
+
+def _consultar(ticker):
+    """Fundamentales de un yf.Ticker; None si yfinance falla."""
+    try:
+        info = ticker.info or {}
+    except Exception as e:
+        print(f"Error leyendo fundamentales de {ticker.ticker}: {e}")
+        return None
+    datos = {col: info.get(campo) for col, campo in CAMPOS.items()}
+    if datos["dividend_yield"] is not None:
+        datos["dividend_yield"] = datos["dividend_yield"] * 100
+    return datos
+
+
+class CacheFundamentales:
+    """
+    Fotografía de fundamentales en memoria y en un JSON local. La lectura es
+    un solo DataFrame para todos los símbolos, sin red; los vencidos se
+    refrescan por lotes en un hilo y cada lote se guarda al terminar.
+    """
+
+    def __init__(self, path=FUNDAMENTALES_PATH, ttl=TTL_FUNDAMENTALES):
+        self.path = path
+        self.ttl = ttl
+        self._datos = None
+        self._lock = threading.Lock()
+        self._hilo = None
+
+    def _cargar(self):
+        if self._datos is None:
+            self._datos = {}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        self._datos = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"Error leyendo caché de fundamentales: {e}")
+        return self._datos
+
+    def _guardar(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temporal = f"{self.path}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(self._datos, f, ensure_ascii=False)
+        os.replace(temporal, self.path)
+
+    def leer(self, simbolos):
+        """DataFrame símbolo × CAMPOS con lo que haya en caché (NaN si falta)."""
+        with self._lock:
+            datos = self._cargar()
+            filas = [datos.get(s, {}) for s in simbolos]
+        return pd.DataFrame(filas, index=list(simbolos), columns=list(CAMPOS))
+
+    def vencidos(self, simbolos):
+        limite = time.time() - self.ttl
+        with self._lock:
+            datos = self._cargar()
+            return [s for s in dict.fromkeys(simbolos) if datos.get(s, {}).get("actualizado", 0) < limite]
+
+    def refrescar(self, simbolos, tamano_lote=TAMANO_LOTE):
+        """Consulta los símbolos vencidos por lotes; devuelve cuántos se actualizaron."""
+        import yfinance as yf
+
+        pendientes = self.vencidos(simbolos)
+        actualizados = 0
+        with ThreadPoolExecutor(max_workers=TRABAJADORES) as pool:
+            for i in range(0, len(pendientes), tamano_lote):
+                lote = pendientes[i:i + tamano_lote]
+                tickers = yf.Tickers(" ".join(lote)).tickers
+                resultados = list(pool.map(_consultar, [tickers.get(s.upper()) or yf.Ticker(s) for s in lote]))
+                ahora = time.time()
+                with self._lock:
+                    for simbolo, datos in zip(lote, resultados):
+                        # Un símbolo que falla tampoco se reintenta antes del TTL
+                        self._datos[simbolo] = {**(datos or self._datos.get(simbolo, {})), "actualizado": ahora}
+                        actualizados += datos is not None
+                    try:
+                        self._guardar()
+                    except OSError as e:
+                        print(f"Error guardando caché de fundamentales: {e}")
+        return actualizados
+
+    def refrescar_en_segundo_plano(self, simbolos):
+        """Lanza refrescar() en un hilo si hay vencidos y no hay otro en curso."""
+        if self._hilo is not None and self._hilo.is_alive():
+            return False
+        if not self.vencidos(simbolos):
+            return False
+        self._hilo = threading.Thread(target=self.refrescar, args=(list(simbolos),), daemon=True)
+        self._hilo.start()
+        return True
+
+
+FUNDAMENTALES = CacheFundamentales()
@@ -1,5 +1,210 @@
+"""
+Indicadores técnicos vectorizados sobre una matriz fecha × ticker
+"""
+import numpy as np
 import pandas as pd
 
+
+def ema(cierres, span):
+    return cierres.ewm(span=span, adjust=False).mean()
+
+
+def rsi(cierres, periodo=14):
+    """RSI de Wilder."""
+    delta = cierres.diff()
+    ganancias = delta.clip(lower=0).ewm(alpha=1 / periodo, adjust=False).mean()
+    perdidas = (-delta.clip(upper=0)).ewm(alpha=1 / periodo, adjust=False).mean()
+    rs = ganancias / perdidas.replace(0, np.nan)
+    return (100 - 100 / (1 + rs)).fillna(100.0).where(cierres.notna())
+
+
+def macd(cierres, rapida=12, lenta=26, senal=9):
+    """Regresa (macd, señal, histograma)."""
+    linea = ema(cierres, rapida) - ema(cierres, lenta)
+    linea_senal = linea.ewm(span=senal, adjust=False).mean()
+    return linea, linea_senal, linea - linea_senal
+
+
+def bollinger(cierres, ventana=20, k=2.0):
+    """Regresa (media, banda superior, banda inferior)."""
+    media = cierres.rolling(ventana).mean()
+    desv = cierres.rolling(ventana).std(ddof=0)
+    return media, media + k * desv, media - k * desv
+
+
+def atr(cierres, altos=None, bajos=None, periodo=14):
+    """
+    Average True Range de Wilder. Sin altos/bajos (solo cierres diarios) el
+    rango verdadero se reduce a |cierre − cierre previo|.
+    """
+    previo = cierres.shift(1)
+    if altos is None or bajos is None:
+        rango = (cierres - previo).abs()
+    else:
+        rango = pd.concat([altos - bajos, (altos - previo).abs(), (bajos - previo).abs()]).groupby(level=0).max()
+        rango = rango.reindex(cierres.index)
+    return rango.ewm(alpha=1 / periodo, adjust=False).mean()
+
+
+def maximos(cierres, ventana=20):
+    return cierres.rolling(ventana).max()
+
+
+def minimos(cierres, ventana=20):
+    return cierres.rolling(ventana).min()
+
+
+def calcular_indicadores(cierres, altos=None, bajos=None):
+    """Todos los indicadores para todos los tickers a la vez."""
+    linea, senal, hist = macd(cierres)
+    media, superior, inferior = bollinger(cierres)
+    return {
+        "ema_12": ema(cierres, 12),
+        "ema_26": ema(cierres, 26),
+        "rsi_14": rsi(cierres),
+        "macd": linea,
+        "macd_senal": senal,
+        "macd_hist": hist,
+        "ma20": media,
+        "bb_superior": superior,
+        "bb_inferior": inferior,
+        "atr_14": atr(cierres, altos, bajos),
+        "max_20": maximos(cierres),
+        "min_20": minimos(cierres),
+    }
+
+
+def resumen_indicadores(cierres, indicadores):
+    """Último valor por ticker en columnas listas para la tabla y las reglas."""
+    ultimo = cierres.ffill().iloc[-1]
+    ult = {nombre: frame.ffill().iloc[-1] for nombre, frame in indicadores.items()}
+    ancho = (ult["bb_superior"] - ult["bb_inferior"]).replace(0, np.nan)
+    tabla = pd.DataFrame({
+        "rsi_14": ult["rsi_14"],
+        "macd_hist": ult["macd_hist"],
+        "dist_ma20_pct": (ultimo / ult["ma20"] - 1) * 100,
+        "bb_pct_b": (ultimo - ult["bb_inferior"]) / ancho,
+        "atr_pct": ult["atr_14"] / ultimo * 100,
+        "dist_max20_pct": (ultimo / ult["max_20"] - 1) * 100,
+        "dist_min20_pct": (ultimo / ult["min_20"] - 1) * 100,
+    })
+    tabla.index.name = "ticker"
+    return tabla
+
+
+def _paso_ewm(estado, x, alfa):
+    """Un paso de EWM (adjust=False) que arranca en el primer valor y conserva el estado con NaN."""
+    return np.where(np.isnan(estado), x, np.where(np.isnan(x), estado, estado + alfa * (x - estado)))
+
+
+class IndicadoresIncrementales:
+    """
+    Mismos indicadores, pero actualizados barra por barra en O(tickers):
+    EMAs/RSI/ATR con su recurrencia, Bollinger con sumas móviles y máximos/
+    mínimos con un buffer circular de tamaño fijo (ventana × tickers).
+    Se arranca con una matriz histórica para el calentamiento; los tickers con
+    menos historia que la ventana quedan en NaN hasta completarla, igual que
+    en calcular_indicadores.
+    """
+
+    def __init__(self, cierres, ventana=20, periodo=14):
+        self.tickers = list(cierres.columns)
+        self.ventana = ventana
+        self.alfa_rsi = 1 / periodo
+        self.alfas = {s: 2 / (s + 1) for s in (12, 26, 9)}
+
+        cierres = cierres.ffill()
+        self.fecha = cierres.index[-1]
+        ind = calcular_indicadores(cierres)
+        ultimo = lambda nombre: ind[nombre].iloc[-1].to_numpy(dtype=float).copy()
+
+        self.cierre = cierres.iloc[-1].to_numpy(dtype=float).copy()
+        self.ema12, self.ema26 = ultimo("ema_12"), ultimo("ema_26")
+        self.senal = ultimo("macd_senal")
+        self.atr = ultimo("atr_14")
+
+        delta = cierres.diff()
+        self.ganancia = delta.clip(lower=0).ewm(alpha=self.alfa_rsi, adjust=False).mean().iloc[-1].to_numpy().copy()
+        self.perdida = (-delta.clip(upper=0)).ewm(alpha=self.alfa_rsi, adjust=False).mean().iloc[-1].to_numpy().copy()
+
+        # Historia más corta que la ventana: las filas faltantes van al inicio como NaN
+        historia = cierres.iloc[-ventana:].to_numpy(dtype=float)
+        self.buffer = np.full((ventana, len(self.tickers)), np.nan)
+        self.buffer[ventana - len(historia):] = historia
+        self.pos = 0  # Próxima fila del buffer a sobrescribir (la más vieja)
+        self._recalcular_sumas()
+
+    def _recalcular_sumas(self):
+        validos = ~np.isnan(self.buffer)
+        self.n = validos.sum(axis=0)
+        self.suma = np.where(validos, self.buffer, 0.0).sum(axis=0)
+        self.suma2 = np.where(validos, self.buffer ** 2, 0.0).sum(axis=0)
+
+    def actualizar(self, nuevo_cierre, alto=None, bajo=None):
+        """Incorpora una barra (vector o Series por ticker) y regresa el resumen actual."""
+        if isinstance(nuevo_cierre, pd.Series):
+            nuevo_cierre = nuevo_cierre.reindex(self.tickers).to_numpy(dtype=float)
+        c = np.where(np.isnan(nuevo_cierre), self.cierre, nuevo_cierre)
+        previo = self.cierre
+
+        self.ema12 = _paso_ewm(self.ema12, c, self.alfas[12])
+        self.ema26 = _paso_ewm(self.ema26, c, self.alfas[26])
+        linea = self.ema12 - self.ema26
+        self.senal = _paso_ewm(self.senal, linea, self.alfas[9])
+
+        delta = c - previo
+        self.ganancia = _paso_ewm(self.ganancia, np.maximum(delta, 0), self.alfa_rsi)
+        self.perdida = _paso_ewm(self.perdida, np.maximum(-delta, 0), self.alfa_rsi)
+
+        if alto is None or bajo is None:
+            rango = np.abs(delta)
+        else:
+            rango = np.maximum.reduce([alto - bajo, np.abs(alto - previo), np.abs(bajo - previo)])
+        self.atr = _paso_ewm(self.atr, rango, self.alfa_rsi)
+
+        # Sumas móviles sin NaN: cada ticker cuenta sus propios valores válidos
+        viejo = self.buffer[self.pos]
+        nuevo_ok, viejo_ok = ~np.isnan(c), ~np.isnan(viejo)
+        self.suma += np.where(nuevo_ok, c, 0.0) - np.where(viejo_ok, viejo, 0.0)
+        self.suma2 += np.where(nuevo_ok, c ** 2, 0.0) - np.where(viejo_ok, viejo ** 2, 0.0)
+        self.n += nuevo_ok.astype(int) - viejo_ok.astype(int)
+        self.buffer[self.pos] = c
+        self.pos = (self.pos + 1) % self.ventana
+        if self.pos == 0:
+            self._recalcular_sumas()  # Una vez por vuelta: evita acumular error de redondeo
+        self.cierre = c
+
+        return self.resumen()
+
+    def actualizar_desde(self, cierres):
+        """Incorpora solo las filas posteriores a la última fecha procesada."""
+        nuevas = cierres.loc[cierres.index > self.fecha].reindex(columns=self.tickers)
+        for fecha, fila in zip(nuevas.index, nuevas.to_numpy(dtype=float)):
+            self.actualizar(fila)
+            self.fecha = fecha
+        return self.resumen()
+
+    def resumen(self):
+        c = self.cierre
+        lleno = self.n == self.ventana
+        media = np.where(lleno, self.suma / self.ventana, np.nan)
+        desv = np.sqrt(np.maximum(self.suma2 / self.ventana - media ** 2, 0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rs = self.ganancia / self.perdida
+            valor_rsi = np.where(self.perdida > 0, 100 - 100 / (1 + rs), 100.0)
+            ancho = 4 * desv
+            tabla = pd.DataFrame({
+                "rsi_14": np.where(np.isnan(c), np.nan, valor_rsi),
+                "macd_hist": (self.ema12 - self.ema26) - self.senal,
+                "dist_ma20_pct": (c / media - 1) * 100,
+                "bb_pct_b": np.where(ancho > 0, (c - (media - 2 * desv)) / ancho, np.nan),
+                "atr_pct": self.atr / c * 100,
+                "dist_max20_pct": (c / np.where(lleno, self.buffer.max(axis=0), np.nan) - 1) * 100,
+                "dist_min20_pct": (c / np.where(lleno, self.buffer.min(axis=0), np.nan) - 1) * 100,
+            }, index=pd.Index(self.tickers, name="ticker"))
+        return tabla
+
+
 def detect_opportunities(price_data):
 
     opportunities = []
@@ -0,0 +1,300 @@
+"""
+Barras intradía por ticker y curva de valor del portafolio minuto a minuto
+"""
+import threading
+from datetime import datetime, time as dtime
+
+import numpy as np
+import pandas as pd
+import pytz
+
+CDMX_TZ = pytz.timezone("America/Mexico_City")
+MAX_CAMBIOS = 10_000  # Entradas del change log compartido entre sesiones
+
+# Horario de cada bolsa en su zona horaria local
+SESIONES = {
+    "BMV": (dtime(8, 30), dtime(15, 0), "America/Mexico_City"),
+    "US": (dtime(9, 30), dtime(16, 0), "America/New_York"),
+    "HK": (dtime(9, 30), dtime(16, 0), "Asia/Hong_Kong"),
+}
+
+
+class BarStore:
+    """
+    Barras de 1 minuto por ticker (índice en hora de CDMX) con la moneda de la
+    fuente. Se comparte entre reruns: price_fetcher guarda aquí lo que antes
+    descartaba y la curva/estadísticas lo leen sin nuevas consultas.
+    """
+
+    def __init__(self):
+        self._series = {}
+        self._monedas = {}
+        self._bolsas = {}
+        self._volumenes = {}
+        self._cambios = []  # (ticker, primera marca nueva) en orden de llegada
+        self._base = 0      # Versión de la primera entrada que sigue en _cambios
+        self._lock = threading.Lock()
+        self.fx_rates = {"USD_MXN": 20.0, "HKD_MXN": 2.60}
+
+    def agregar(self, ticker, barras, moneda="MXN", bolsa="BMV", volumen=None):
+        """
+        Une barras nuevas (pd.Series indexada por timestamp) con las existentes.
+        El volumen es opcional: el payload de DataBursatil solo trae precio.
+        """
+        if barras is None or len(barras) == 0:
+            return
+        barras = barras.astype(float)
+        idx = pd.DatetimeIndex(barras.index)
+        idx = idx.tz_localize(CDMX_TZ) if idx.tz is None else idx.tz_convert(CDMX_TZ)
+        barras = pd.Series(barras.to_numpy(), index=idx.floor("min"))
+        barras = barras[~barras.index.duplicated(keep="last")]
+
+        with self._lock:
+            previa = self._series.get(ticker)
+            # Primer minuto realmente nuevo o con precio distinto al guardado
+            if previa is not None:
+                antes = previa.reindex(barras.index).to_numpy()
+                distintas = np.isnan(antes) | (antes != barras.to_numpy())
+                primera = barras.index[distintas].min() if distintas.any() else None
+                barras = pd.concat([previa, barras])
+                barras = barras[~barras.index.duplicated(keep="last")].sort_index()
+            else:
+                barras = barras.sort_index()
+                primera = barras.index[0]
+            self._series[ticker] = barras
+            if volumen is not None:
+                vol = pd.Series(np.asarray(volumen, dtype=float), index=idx.floor("min"))
+                previo = self._volumenes.get(ticker)
+                if previo is not None:
+                    vol = pd.concat([previo, vol])
+                self._volumenes[ticker] = vol[~vol.index.duplicated(keep="last")].sort_index()
+            self._monedas[ticker] = moneda
+            self._bolsas[ticker] = bolsa
+            if primera is not None:
+                self._cambios.append((ticker, primera))
+                if len(self._cambios) > MAX_CAMBIOS:
+                    # Se descarta la mitad más vieja del log; la versión sigue siendo absoluta
+                    recorte = len(self._cambios) // 2
+                    self._cambios = self._cambios[recorte:]
+                    self._base += recorte
+
+    def agregar_payload(self, ticker, payload, moneda="MXN", bolsa="BMV"):
+        """Payload de DataBursatil intradía: {"YYYY-mm-dd HH:MM:SS": precio, ...}."""
+        serie = pd.Series(payload, dtype=float)
+        serie.index = pd.to_datetime(serie.index)
+        self.agregar(ticker, serie, moneda, bolsa)
+
+    @property
+    def version(self):
+        return self._base + len(self._cambios)
+
+    def cambios_desde(self, version):
+        """
+        Inserciones posteriores a `version`: [(ticker, primera marca), ...]. Si
+        esa parte del log ya se recortó, se devuelve el inicio de cada serie
+        para que el consumidor recalcule todo.
+        """
+        with self._lock:
+            if version < self._base:
+                return [(t, s.index[0]) for t, s in self._series.items() if len(s)]
+            return self._cambios[version - self._base:]
+
+    def serie(self, ticker):
+        return self._series.get(ticker, pd.Series(dtype=float))
+
+    def volumen(self, ticker):
+        return self._volumenes.get(ticker)
+
+    def moneda(self, ticker):
+        return self._monedas.get(ticker, "MXN")
+
+    def bolsa(self, ticker):
+        return self._bolsas.get(ticker, "BMV")
+
+    def tickers(self):
+        return list(self._series)
+
+    def ultima_marca(self):
+        marcas = [s.index[-1] for s in self._series.values() if len(s)]
+        return max(marcas) if marcas else None
+
+
+BAR_STORE = BarStore()
+
+
+def barras_yfinance(ticker_yf, store=BAR_STORE, ticker=None, moneda="USD", bolsa="US"):
+    """Completa el store con barras de 1m de yfinance para tickers sin DataBursatil."""
+    import yfinance as yf
+    try:
+        hist = yf.Ticker(ticker_yf).history(period="1d", interval="1m")
+        if not hist.empty:
+            store.agregar(ticker or ticker_yf, hist["Close"], moneda, bolsa, volumen=hist["Volume"])
+    except Exception as e:
+        print(f"Error descargando barras de {ticker_yf}: {e}")
+
+
+def grilla_sesion(fecha, bolsas):
+    """
+    Minutos (hora CDMX) que cubren las sesiones BMV/EE.UU. del día. Hong Kong
+    opera de madrugada en CDMX, así que aporta su último precio (as-of).
+    """
+    inicios, finales = [], []
+    for bolsa in set(bolsas) & {"BMV", "US"} or {"BMV"}:
+        apertura, cierre, zona = SESIONES[bolsa]
+        tz = pytz.timezone(zona)
+        inicios.append(tz.localize(datetime.combine(fecha, apertura)).astimezone(CDMX_TZ))
+        finales.append(tz.localize(datetime.combine(fecha, cierre)).astimezone(CDMX_TZ))
+    return pd.date_range(min(inicios), max(finales), freq="min")
+
+
+def estadisticas_intradia(tickers, store=BAR_STORE, fecha=None, umbral_movimiento=0.5):
+    """
+    Estadísticas del día por ticker a partir de las barras ya guardadas
+    (sin consultas nuevas), calculadas en pasadas vectorizadas sobre la
+    matriz minuto × ticker:
+
+    - vol_intradia: volatilidad realizada del día, sqrt(Σ r²) de retornos log de 1m (%)
+    - rango_pct: (máximo − mínimo) / mínimo (%)
+    - dist_vwap_pct: distancia del último precio al VWAP (TWAP si no hay volumen) (%)
+    - movs_grandes: minutos con |retorno| > umbral_movimiento (%)
+    """
+    columnas = ["vol_intradia", "rango_pct", "dist_vwap_pct", "movs_grandes"]
+    ultima = store.ultima_marca()
+    tickers = [t for t in tickers if len(store.serie(t))]
+    if ultima is None or not tickers:
+        return pd.DataFrame(columns=columnas)
+
+    fecha = fecha or ultima.date()
+    inicio = CDMX_TZ.localize(datetime.combine(fecha, dtime(0, 0)))
+    fin = inicio + pd.Timedelta(days=1)
+
+    dia = {t: store.serie(t)[(store.serie(t).index >= inicio) & (store.serie(t).index < fin)] for t in tickers}
+    precios = pd.DataFrame(dia)
+    if precios.empty:
+        return pd.DataFrame(columns=columnas)
+    P = precios.to_numpy()
+
+    volumenes = pd.DataFrame({t: store.volumen(t) for t in tickers if store.volumen(t) is not None})
+    V = volumenes.reindex(index=precios.index, columns=precios.columns).to_numpy()
+    sin_volumen = np.nansum(V, axis=0) <= 0
+    V = np.where(np.isnan(P), np.nan, np.where(sin_volumen, 1.0, V))
+
+    log_p = np.log(precios.ffill().to_numpy())
+    r = np.diff(log_p, axis=0)
+
+    alto, bajo = np.nanmax(P, axis=0), np.nanmin(P, axis=0)
+    ultimo = precios.ffill().to_numpy()[-1]
+    vwap = np.nansum(P * V, axis=0) / np.nansum(V, axis=0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        tabla = pd.DataFrame({
+            "vol_intradia": np.sqrt(np.nansum(r ** 2, axis=0)) * 100,
+            "rango_pct": (alto - bajo) / bajo * 100,
+            "dist_vwap_pct": (ultimo - vwap) / vwap * 100,
+            "movs_grandes": np.sum(np.abs(r) > umbral_movimiento / 100, axis=0),
+        }, index=precios.columns)
+    tabla.index.name = "ticker"
+    return tabla.round(2)
+
+
+class CurvaIntradia:
+    """
+    Valor del portafolio minuto a minuto:
+        valor_t = Σ precio_t × fx × títulos
+    con cada precio alineado a la grilla común por as-of (último precio conocido).
+    """
+
+    def __init__(self, titulos):
+        self.titulos = pd.Series(titulos, dtype=float)
+        self.tickers = list(self.titulos.index)
+        self.curva = pd.DataFrame(columns=["valor", "pnl"])
+        self.fecha = None
+        self._version = 0
+        self._precios = None  # Matriz minuto × ticker ya alineada
+        self._previos = None  # Cierre previo por ticker
+        self._factor = None   # fx × títulos por ticker
+        self._base = 0.0      # Valor al cierre previo
+
+    def _factores(self, store):
+        fx = {"MXN": 1.0, "USD": store.fx_rates.get("USD_MXN", 1.0), "HKD": store.fx_rates.get("HKD_MXN", 1.0)}
+        return np.array([fx.get(store.moneda(t), 1.0) for t in self.tickers]) * self.titulos.to_numpy()
+
+    def _fin_grilla(self, store, ahora):
+        grilla = grilla_sesion(self.fecha, [store.bolsa(t) for t in self.tickers])
+        fin = min(grilla[-1], store.ultima_marca())
+        if ahora is not None:
+            fin = min(fin, ahora.floor("min"))
+        return grilla[0], fin
+
+    def _alinear(self, store, ticker, j, grilla):
+        col = store.serie(ticker).reindex(grilla, method="ffill").to_numpy()  # as-of join
+        return np.where(np.isnan(col), self._previos[j], col)
+
+    def construir(self, store=BAR_STORE, fecha=None, ahora=None):
+        """Curva completa del día (por omisión el de la barra más reciente)."""
+        ultima = store.ultima_marca()
+        if ultima is None:
+            return self.curva
+        self.fecha = fecha or ultima.date()
+        self._version = store.version
+        inicio_dia = CDMX_TZ.localize(datetime.combine(self.fecha, dtime(0, 0)))
+
+        # Cierre previo: última barra del día anterior; si no hay, la primera de hoy
+        previos = []
+        for t in self.tickers:
+            s = store.serie(t)
+            previa, hoy = s[s.index < inicio_dia], s[s.index >= inicio_dia]
+            previos.append(previa.iloc[-1] if len(previa) else (hoy.iloc[0] if len(hoy) else 0.0))
+        self._previos = np.array(previos, dtype=float)
+        self._factor = self._factores(store)
+        self._base = float(self._previos @ self._factor)
+
+        inicio, fin = self._fin_grilla(store, ahora)
+        grilla = pd.date_range(inicio, fin, freq="min")
+        self._precios = np.column_stack(
+            [self._alinear(store, t, j, grilla) for j, t in enumerate(self.tickers)]
+        ) if self.tickers else np.empty((len(grilla), 0))
+
+        valor = self._precios @ self._factor
+        self.curva = pd.DataFrame({"valor": valor, "pnl": valor - self._base}, index=grilla)
+        return self.curva
+
+    def actualizar_desde_store(self, store=BAR_STORE, ahora=None):
+        """
+        Solo recalcula desde el primer minuto afectado por barras nuevas: si
+        llegan al final, se agregan filas; si llega una barra atrasada, se
+        rehace la cola desde ese minuto. Si cambió el día se reconstruye.
+        """
+        ultima = store.ultima_marca()
+        if ultima is None:
+            return self.curva
+        if self.fecha != ultima.date() or self.curva.empty:
+            return self.construir(store, ahora=ahora)
+
+        cambios = [(t, m) for t, m in store.cambios_desde(self._version) if t in self.titulos.index]
+        self._version = store.version
+        if not cambios:
+            return self.curva
+
+        inicio, fin = self._fin_grilla(store, ahora)
+        desde = max(min(m for _, m in cambios), inicio)
+        k = int(self.curva.index.searchsorted(desde))
+        cola = pd.date_range(desde, fin, freq="min")
+        if len(cola) == 0:
+            return self.curva
+
+        # Columnas sin cambios: se reutilizan las filas ya alineadas y se arrastra la última
+        viejas = self._precios[k:k + len(cola)]
+        ultima_fila = self._precios[k - 1] if k > 0 else self._previos
+        relleno = np.tile(viejas[-1] if len(viejas) else ultima_fila, (len(cola) - len(viejas), 1))
+        precios = np.vstack([viejas, relleno])
+
+        for t in {t for t, _ in cambios}:
+            j = self.tickers.index(t)
+            precios[:, j] = self._alinear(store, t, j, cola)
+
+        valor = precios @ self._factor
+        cola_df = pd.DataFrame({"valor": valor, "pnl": valor - self._base}, index=cola)
+        self.curva = pd.concat([self.curva.iloc[:k], cola_df])
+        self._precios = np.vstack([self._precios[:k], precios])
+        return self.curva
@@ -0,0 +1,247 @@
+"""
+Bitácora de operaciones (solo se agrega) con lotes FIFO y checkpoints
+"""
+import json
+import os
+from collections import deque
+from datetime import date, datetime
+
+import pandas as pd
+
+LEDGER_DIR = "history/ledger"
+CHECKPOINT_CADA = 50  # Operaciones entre snapshots
+TIPOS = ("compra", "venta", "split", "dividendo")
+
+
+class Ledger:
+    """
+    Bitácora por usuario. Cada operación se agrega al final de un .jsonl y se
+    aplica de forma incremental sobre los lotes abiertos, así que registrar una
+    operación cuesta O(lotes tocados). Cada CHECKPOINT_CADA operaciones se guarda
+    un snapshot del estado con el offset del .jsonl; al cargar solo se
+    re-aplican las operaciones posteriores al último snapshot.
+    """
+
+    def __init__(self, user_id="demo", directorio=LEDGER_DIR):
+        self.user_id = str(user_id)
+        self.ruta = os.path.join(directorio, f"{self.user_id}.jsonl")
+        self.ruta_checkpoint = os.path.join(directorio, f"{self.user_id}_checkpoint.json")
+        self.directorio = directorio
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self.seq = 0
+        self.offset = 0
+        self.lotes = {}          # ticker → deque([fecha, titulos, costo_unitario])
+        self.mercados = {}       # ticker → "global" / "mexico"
+        self.ultimo_precio = {}  # ticker → precio de la última operación
+        self.dividendos = {}     # ticker → monto acumulado
+        self.realizadas = []     # ventas cerradas contra lotes FIFO
+        self.desde_checkpoint = 0
+
+    # ── Persistencia ────────────────────────────────────────────────
+    def cargar(self):
+        """Estado = último checkpoint + operaciones posteriores del .jsonl."""
+        self._reiniciar()
+        if os.path.exists(self.ruta_checkpoint):
+            with open(self.ruta_checkpoint, "r", encoding="utf-8") as f:
+                snap = json.load(f)
+            self.seq = snap["seq"]
+            self.offset = snap["offset"]
+            self.lotes = {t: deque(l) for t, l in snap["lotes"].items()}
+            self.mercados = snap["mercados"]
+            self.ultimo_precio = snap["ultimo_precio"]
+            self.dividendos = snap["dividendos"]
+            self.realizadas = snap["realizadas"]
+
+        if os.path.exists(self.ruta):
+            with open(self.ruta, "r", encoding="utf-8") as f:
+                f.seek(self.offset)
+                for linea in iter(f.readline, ""):
+                    if linea.strip():
+                        tx = json.loads(linea)
+                        self._aplicar(tx)
+                        self.seq = tx["seq"]
+                        self.desde_checkpoint += 1
+                self.offset = f.tell()
+        return self
+
+    def guardar_checkpoint(self):
+        """Snapshot atómico del estado derivado."""
+        snap = {
+            "seq": self.seq,
+            "offset": self.offset,
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "lotes": {t: list(l) for t, l in self.lotes.items() if l},
+            "mercados": self.mercados,
+            "ultimo_precio": self.ultimo_precio,
+            "dividendos": self.dividendos,
+            "realizadas": self.realizadas,
+            "posiciones": self.posiciones().to_dict("records"),
+        }
+        os.makedirs(self.directorio, exist_ok=True)
+        tmp = self.ruta_checkpoint + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(snap, f)
+        os.replace(tmp, self.ruta_checkpoint)
+        self.desde_checkpoint = 0
+
+    def registrar(self, tipo, ticker, titulos=0, precio=0.0, mercado="global",
+                  fecha=None, factor=None, monto=None):
+        """
+        Agrega una operación y la aplica. Se valida antes de escribir, así que
+        una venta sin títulos suficientes no deja rastro en la bitácora.
+        """
+        if tipo not in TIPOS:
+            raise ValueError(f"Tipo de operación inválido: {tipo}")
+        tx = {
+            "seq": self.seq + 1,
+            "fecha": (fecha or date.today()).isoformat() if not isinstance(fecha, str) else fecha,
+            "tipo": tipo,
+            "ticker": str(ticker).strip().upper(),
+            "mercado": mercado,
+            "titulos": float(titulos),
+            "precio": float(precio),
+        }
+        if factor is not None:
+            tx["factor"] = float(factor)
+        if monto is not None:
+            tx["monto"] = float(monto)
+
+        self._validar(tx)
+        os.makedirs(self.directorio, exist_ok=True)
+        with open(self.ruta, "a", encoding="utf-8") as f:
+            f.write(json.dumps(tx) + "\n")
+            self.offset = f.tell()
+        self._aplicar(tx)
+        self.seq = tx["seq"]
+
+        self.desde_checkpoint += 1
+        if self.desde_checkpoint >= CHECKPOINT_CADA:
+            self.guardar_checkpoint()
+        return tx
+
+    # ── Aplicación incremental ─────────────────────────────────────
+    def _validar(self, tx):
+        if tx["tipo"] in ("compra", "venta") and tx["titulos"] <= 0:
+            raise ValueError("La operación debe tener títulos positivos")
+        if tx["tipo"] == "venta":
+            disponibles = sum(l[1] for l in self.lotes.get(tx["ticker"], ()))
+            if tx["titulos"] > disponibles + 1e-9:
+                raise ValueError(f"Venta de {tx['titulos']} {tx['ticker']} con solo {disponibles} disponibles")
+        if tx["tipo"] == "split" and not tx.get("factor", 0) > 0:
+            raise ValueError("El split necesita un factor positivo")
+
+    def _aplicar(self, tx):
+        ticker, tipo = tx["ticker"], tx["tipo"]
+        self.mercados.setdefault(ticker, tx.get("mercado", "global"))
+        lotes = self.lotes.setdefault(ticker, deque())
+
+        if tipo == "compra":
+            lotes.append([tx["fecha"], tx["titulos"], tx["precio"]])
+            self.ultimo_precio[ticker] = tx["precio"]
+
+        elif tipo == "venta":
+            pendientes = tx["titulos"]
+            while pendientes > 1e-9 and lotes:
+                lote = lotes[0]
+                usados = min(lote[1], pendientes)
+                self.realizadas.append({
+                    "ticker": ticker,
+                    "fecha_compra": lote[0],
+                    "fecha_venta": tx["fecha"],
+                    "titulos": usados,
+                    "costo_unitario": lote[2],
+                    "precio_venta": tx["precio"],
+                    "ganancia": usados * (tx["precio"] - lote[2]),
+                    "dias": (date.fromisoformat(tx["fecha"]) - date.fromisoformat(lote[0])).days,
+                })
+                lote[1] -= usados
+                pendientes -= usados
+                if lote[1] <= 1e-9:
+                    lotes.popleft()
+            self.ultimo_precio[ticker] = tx["precio"]
+
+        elif tipo == "split":
+            factor = tx["factor"]
+            for lote in lotes:
+                lote[1] *= factor
+                lote[2] /= factor
+            if ticker in self.ultimo_precio:
+                self.ultimo_precio[ticker] /= factor
+
+        elif tipo == "dividendo":
+            self.dividendos[ticker] = self.dividendos.get(ticker, 0.0) + tx.get("monto", 0.0)
+
+    # ── Vistas ──────────────────────────────────────────────────────
+    def posiciones(self):
+        """Vista agregada compatible con el JSON del portafolio."""
+        filas = []
+        for ticker, lotes in self.lotes.items():
+            titulos = sum(l[1] for l in lotes)
+            if titulos <= 1e-9:
+                continue
+            costo = sum(l[1] * l[2] for l in lotes)
+            precio = self.ultimo_precio.get(ticker, costo / titulos)
+            filas.append({
+                "ticker": ticker,
+                "mercado": self.mercados.get(ticker, "global"),
+                "titulos": titulos,
+                "costo_promedio": costo / titulos,
+                "precio_mercado": precio,
+                "valor_mercado": precio * titulos,
+            })
+        return pd.DataFrame(filas, columns=["ticker", "mercado", "titulos", "costo_promedio",
+                                            "precio_mercado", "valor_mercado"])
+
+    def lotes_abiertos(self, precios=None):
+        """Lotes FIFO abiertos con días de tenencia y P&L (si se dan precios por ticker)."""
+        hoy = date.today()
+        filas = [
+            {"ticker": t, "fecha_compra": l[0], "titulos": l[1], "costo_unitario": l[2],
+             "dias": (hoy - date.fromisoformat(l[0])).days}
+            for t, lotes in self.lotes.items() for l in lotes
+        ]
+        df = pd.DataFrame(filas, columns=["ticker", "fecha_compra", "titulos", "costo_unitario", "dias"])
+        if precios is not None:
+            df["precio_mercado"] = df["ticker"].map(precios)
+            df["ganancia_lote"] = (df["precio_mercado"] - df["costo_unitario"]) * df["titulos"]
+        return df
+
+    def ganancias_realizadas(self):
+        return pd.DataFrame(self.realizadas, columns=["ticker", "fecha_compra", "fecha_venta", "titulos",
+                                                      "costo_unitario", "precio_venta", "ganancia", "dias"])
+
+
+def existe_ledger(user_id, directorio=LEDGER_DIR):
+    user_id = str(user_id)
+    return (os.path.exists(os.path.join(directorio, f"{user_id}_checkpoint.json"))
+            or os.path.exists(os.path.join(directorio, f"{user_id}.jsonl")))
+
+
+def portafolio_desde_ledger(user_id, directorio=LEDGER_DIR):
+    """
+    Dict con la misma forma que el JSON del portafolio ({"global": [...], "mexico": [...]}).
+    Si el checkpoint está al día se usa su vista agregada sin reconstruir lotes.
+    """
+    ruta_checkpoint = os.path.join(directorio, f"{user_id}_checkpoint.json")
+    ruta = os.path.join(directorio, f"{user_id}.jsonl")
+
+    posiciones = None
+    if os.path.exists(ruta_checkpoint):
+        with open(ruta_checkpoint, "r", encoding="utf-8") as f:
+            snap = json.load(f)
+        tamano = os.path.getsize(ruta) if os.path.exists(ruta) else 0
+        if snap["offset"] >= tamano:
+            posiciones = pd.DataFrame(snap["posiciones"])
+            ultima = snap["fecha"]
+
+    if posiciones is None:
+        posiciones = Ledger(user_id, directorio).cargar().posiciones()
+        ultima = datetime.now().isoformat(timespec="seconds")
+
+    data = {"global": [], "mexico": [], "ultima_actualizacion": ultima}
+    for fila in posiciones.to_dict("records"):
+        mercado = fila.pop("mercado", "global")
+        data.setdefault(mercado, []).append(fila)
+    return data
@@ -0,0 +1,134 @@
+"""
+Proyección Monte Carlo del valor del portafolio
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+HISTORY_PATH = "history/portfolio_history.csv"
+DIAS_POR_ANIO = 252
+HORIZONTES_ANIOS = (1, 5, 10)
+PERCENTILES = (5, 25, 50, 75, 95)
+PASO_MUESTREO = 21      # Guardamos un punto por mes (~21 días hábiles)
+TAMANO_BLOQUE = 5_000   # Trayectorias por tarea del pool
+
+
+def cargar_retornos_historicos(path=HISTORY_PATH):
+    """Retornos diarios del portafolio desde el histórico (sin NaN)."""
+    df_history = pd.read_csv(path, index_col=0)
+    return df_history["daily_return"].dropna().to_numpy(dtype=float)
+
+
+def _simular_bloque(retornos, n_paths, n_pasos, semilla, metodo="bootstrap", paso=PASO_MUESTREO):
+    """
+    Simula un bloque de trayectorias y regresa el valor relativo (base 1)
+    en cada punto de muestreo: matriz (n_paths, n_pasos // paso).
+    Se genera por tramos de `paso` días para no tener toda la matriz en memoria.
+    """
+    rng = np.random.default_rng(semilla)
+    log_ret = np.log1p(retornos)
+    mu, sigma = log_ret.mean(), log_ret.std(ddof=1)
+
+    n_puntos = n_pasos // paso
+    resultado = np.empty((n_paths, n_puntos), dtype=np.float32)
+    acumulado = np.zeros(n_paths)
+
+    for j in range(n_puntos):
+        if metodo == "bootstrap":
+            idx = rng.integers(0, len(log_ret), size=(n_paths, paso))
+            incrementos = log_ret[idx]
+        else:
+            incrementos = rng.normal(mu, sigma, size=(n_paths, paso))
+        acumulado += incrementos.sum(axis=1)
+        resultado[:, j] = acumulado
+
+    return np.exp(resultado)
+
+
+def _percentiles(valores, valor_inicial, paso=PASO_MUESTREO):
+    """Tabla de percentiles (filas = años, columnas = p5..p95) en pesos."""
+    pct = np.percentile(valores, PERCENTILES, axis=0).T * valor_inicial
+    anios = np.arange(1, valores.shape[1] + 1) * paso / DIAS_POR_ANIO
+    abanico = pd.DataFrame(pct, index=anios, columns=[f"p{p}" for p in PERCENTILES])
+    abanico.index.name = "anios"
+    # Punto de partida para que la gráfica arranque en el valor actual
+    abanico.loc[0.0] = valor_inicial
+    return abanico.sort_index()
+
+
+def simular_montecarlo_progresivo(valor_inicial, retornos, n_paths=100_000,
+                                  anios=max(HORIZONTES_ANIOS), metodo="bootstrap",
+                                  n_workers=None, seed=None, intervalo=0.5):
+    """
+    Genera las trayectorias en un pool de procesos y va entregando percentiles
+    parciales conforme terminan los bloques.
+
+    Cada bloque recibe su propia semilla derivada con SeedSequence.spawn, así
+    que el resultado es reproducible con `seed` sin importar el orden en que
+    terminen los procesos.
+
+    Yields: (abanico, trayectorias_completadas)
+    """
+    n_pasos = anios * DIAS_POR_ANIO
+    n_puntos = n_pasos // PASO_MUESTREO
+    tamanos = [min(TAMANO_BLOQUE, n_paths - i) for i in range(0, n_paths, TAMANO_BLOQUE)]
+    semillas = np.random.SeedSequence(seed).spawn(len(tamanos))
+    offsets = np.concatenate([[0], np.cumsum(tamanos)[:-1]])
+
+    valores = np.empty((n_paths, n_puntos), dtype=np.float32)
+    completadas = 0
+    ultimo_envio = time.monotonic()
+    n_workers = n_workers or os.cpu_count() or 1
+
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        futuros = {
+            pool.submit(_simular_bloque, retornos, tam, n_pasos, sem, metodo): (off, tam)
+            for tam, sem, off in zip(tamanos, semillas, offsets)
+        }
+        # Los bloques se escriben compactos al inicio del arreglo en orden de llegada
+        for futuro in as_completed(futuros):
+            _, tam = futuros[futuro]
+            valores[completadas:completadas + tam] = futuro.result()
+            completadas += tam
+
+            ahora = time.monotonic()
+            if completadas < n_paths and ahora - ultimo_envio >= intervalo:
+                ultimo_envio = ahora
+                yield _percentiles(valores[:completadas], valor_inicial), completadas
+
+    yield _percentiles(valores, valor_inicial), completadas
+
+
+def simular_montecarlo(valor_inicial, retornos, **kwargs):
+    """Versión bloqueante: regresa solo el abanico final."""
+    abanico = None
+    for abanico, _ in simular_montecarlo_progresivo(valor_inicial, retornos, **kwargs):
+        pass
+    return abanico
+
+
+def resumen_horizontes(abanico, horizontes=HORIZONTES_ANIOS):
+    """Percentiles a 1, 5 y 10 años (o los horizontes pedidos)."""
+    filas = abanico.reindex([float(h) for h in horizontes], method="nearest")
+    filas.index = [f"{h} año{'s' if h > 1 else ''}" for h in horizontes]
+    return filas
+
+
+def proyectar_portafolio(df=None, history_path=HISTORY_PATH, progresivo=False, **kwargs):
+    """
+    Proyección de las posiciones actuales (load_positions) usando los
+    retornos diarios del histórico. Si progresivo=True regresa el generador.
+    """
+    if df is None:
+        from data_loader import load_positions
+        df = load_positions()
+
+    valor_inicial = float(df["valor_mercado"].sum())
+    retornos = cargar_retornos_historicos(history_path)
+
+    if progresivo:
+        return simular_montecarlo_progresivo(valor_inicial, retornos, **kwargs)
+    return simular_montecarlo(valor_inicial, retornos, **kwargs)
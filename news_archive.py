@@ -0,0 +1,174 @@
+"""
+Archivo local de titulares con búsqueda de texto completo (SQLite FTS5)
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+ARCHIVO_NOTICIAS = "history/news.db"
+RETENCION_DIAS = 365
+TAMANO_LOTE = 200
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS noticias (
+    id INTEGER PRIMARY KEY,
+    hash TEXT UNIQUE NOT NULL,
+    titulo TEXT NOT NULL,
+    medio TEXT,
+    link TEXT,
+    resumen TEXT,
+    publicado INTEGER,
+    guardado INTEGER
+);
+CREATE TABLE IF NOT EXISTS noticias_tickers (
+    hash TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    PRIMARY KEY (hash, ticker)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_noticias_tickers_ticker ON noticias_tickers(ticker);
+CREATE INDEX IF NOT EXISTS idx_noticias_publicado ON noticias(publicado);
+CREATE VIRTUAL TABLE IF NOT EXISTS noticias_fts USING fts5(
+    titulo, resumen, medio, content='noticias', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS noticias_ai AFTER INSERT ON noticias BEGIN
+    INSERT INTO noticias_fts(rowid, titulo, resumen, medio) VALUES (new.id, new.titulo, new.resumen, new.medio);
+END;
+CREATE TRIGGER IF NOT EXISTS noticias_ad AFTER DELETE ON noticias BEGIN
+    INSERT INTO noticias_fts(noticias_fts, rowid, titulo, resumen, medio)
+    VALUES ('delete', old.id, old.titulo, old.resumen, old.medio);
+END;
+"""
+
+
+class ArchivoNoticias:
+    """
+    Titulares descargados, con sus tickers, en SQLite. Las inserciones se
+    acumulan en memoria y se escriben en lotes en una sola transacción; la
+    poda por retención corre como máximo una vez al día.
+    """
+
+    def __init__(self, path=ARCHIVO_NOTICIAS, retencion_dias=RETENCION_DIAS):
+        self.path = path
+        self.retencion_dias = retencion_dias
+        self._pendientes = []
+        self._lock = threading.Lock()
+        self._conexion = None
+        self._ultima_poda = 0.0
+
+    def _conectar(self):
+        if self._conexion is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conexion = sqlite3.connect(self.path, check_same_thread=False)
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.executescript(ESQUEMA)
+        return self._conexion
+
+    def encolar(self, ticker, noticias):
+        """Agrega noticias (dicts de news_fetcher) a la cola; escribe si el lote se llenó."""
+        from news_fetcher import hash_titular
+
+        ahora = int(time.time())
+        with self._lock:
+            for n in noticias:
+                self._pendientes.append((
+                    hash_titular(n["title"]), ticker, n["title"], n.get("publisher"), n.get("link"),
+                    n.get("snippet"), int(n.get("timestamp") or ahora), ahora,
+                ))
+            lleno = len(self._pendientes) >= TAMANO_LOTE
+        if lleno:
+            self.vaciar()
+
+    def vaciar(self):
+        """Escribe la cola en una transacción y poda si ya toca."""
+        with self._lock:
+            filas, self._pendientes = self._pendientes, []
+            if not filas and time.time() - self._ultima_poda < 86400:
+                return 0
+            try:
+                con = self._conectar()
+                with con:
+                    con.executemany(
+                        "INSERT OR IGNORE INTO noticias (hash, titulo, medio, link, resumen, publicado, guardado) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [(h, t, m, l, r, p, g) for h, _, t, m, l, r, p, g in filas],
+                    )
+                    con.executemany(
+                        "INSERT OR IGNORE INTO noticias_tickers (hash, ticker) VALUES (?, ?)",
+                        [(h, tk) for h, tk, *_ in filas],
+                    )
+                if time.time() - self._ultima_poda >= 86400:
+                    self._podar(con)
+            except sqlite3.Error as e:
+                print(f"Error guardando noticias en el archivo: {e}")
+                return 0
+        return len(filas)
+
+    def _podar(self, con):
+        limite = int(time.time()) - self.retencion_dias * 86400
+        with con:
+            con.execute("DELETE FROM noticias WHERE publicado < ?", (limite,))
+            con.execute("DELETE FROM noticias_tickers WHERE hash NOT IN (SELECT hash FROM noticias)")
+        self._ultima_poda = time.time()
+
+    @staticmethod
+    def _consulta_fts(texto):
+        """'Cemex deuda' → '"cemex"* AND "deuda"*' (sin sintaxis FTS del usuario)."""
+        palabras = re.findall(r"\w+", texto.lower())
+        return " AND ".join(f'"{p}"*' for p in palabras)
+
+    def buscar(self, texto, ticker=None, desde=None, limite=50):
+        """
+        Búsqueda de texto completo en título, resumen y medio, opcionalmente
+        filtrada por ticker y fecha (más recientes primero).
+        """
+        columnas = ["publicado", "titulo", "medio", "link", "tickers"]
+        consulta = self._consulta_fts(texto or "")
+        if not consulta:
+            return pd.DataFrame(columns=columnas)
+
+        sql = ("SELECT n.publicado, n.titulo, n.medio, n.link, "
+               "(SELECT group_concat(ticker, ' ') FROM noticias_tickers t WHERE t.hash = n.hash) "
+               "FROM noticias_fts f JOIN noticias n ON n.id = f.rowid WHERE noticias_fts MATCH ?")
+        params = [consulta]
+        if ticker:
+            sql += " AND n.hash IN (SELECT hash FROM noticias_tickers WHERE ticker = ?)"
+            params.append(ticker)
+        if desde is not None:
+            sql += " AND n.publicado >= ?"
+            params.append(int(pd.Timestamp(desde).timestamp()))
+        sql += " ORDER BY n.publicado DESC LIMIT ?"
+        params.append(limite)
+
+        self.vaciar()
+        with self._lock:
+            filas = self._conectar().execute(sql, params).fetchall()
+        tabla = pd.DataFrame(filas, columns=columnas)
+        tabla["publicado"] = pd.to_datetime(tabla["publicado"], unit="s")
+        return tabla
+
+    def noticias_ticker(self, ticker, limite=20):
+        """Últimas noticias archivadas de un ticker con la forma de fetch_ticker_news_rss."""
+        if not os.path.exists(self.path):
+            return []
+        with self._lock:
+            filas = self._conectar().execute(
+                "SELECT n.titulo, n.medio, n.link, n.resumen, n.publicado FROM noticias n "
+                "JOIN noticias_tickers t ON t.hash = n.hash WHERE t.ticker = ? "
+                "ORDER BY n.publicado DESC LIMIT ?", (ticker, limite)
+            ).fetchall()
+        return [{
+            "timestamp": publicado,
+            "title": titulo,
+            "publisher": medio,
+            "link": link,
+            "snippet": resumen or "",
+            "published": time.strftime("%d/%m/%Y %H:%M", time.gmtime(publicado)),
+        } for titulo, medio, link, resumen, publicado in filas]
+
+
+ARCHIVO = ArchivoNoticias()
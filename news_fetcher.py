@@ -1,37 +1,34 @@
 import feedparser
+import calendar
+import hashlib
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import urllib.parse  # ← ¡importa esto!
 import streamlit as st
 
-def fetch_ticker_news_rss(ticker, num_news=5):
-    """
-    Obtiene noticias vía RSS de Google News usando nombre real de la empresa.
-    """
-    # Mapeo de tickers → nombre empresa (extiéndelo con tus tickers reales)
-    company_map = {
-        "AMZN*": "Amazon",
-        "AMZN": "Amazon",
-        "1211N": "BYD Company",
-        "NION": "NIO Inc",
-        "NUN": "Nu Holdings",
-        "BKCH*": "Global X Blockchain ETF",
-        "BOTZ*": "Global X Robotics & Artificial Intelligence ETF",
-        "GSG*": "iShares S&P GSCI Commodity Indexed Trust",
-        "HERO*": "Global X Video Games & Esports ETF",
-        "ICLN*": "iShares Global Clean Energy ETF",
-        "SOCL*": "Global X Social Media ETF",
-        "CEMEXCPO": "Cemex",
-        "ALSEA*": "Alsea",
-        "FUNO11": "Fibra Uno",
-        "KOFUBL": "Coca-Cola Femsa",
-        # Agrega más según tu positions.json
-    }
+from news_archive import ARCHIVO
+from sentiment import clave_sentimiento
+from ticker_registry import REGISTRO
+
+# Caché de feeds por URL: {url: {"noticias", "etag", "modified", "ts"}}
+TTL_NOTICIAS = 15 * 60  # segundos
+MAX_NOTICIAS_FEED = 20
+MAX_NOTICIAS_PORTAFOLIO = 500  # El feed vive en session_state: se quedan las más recientes
+_CACHE_NOTICIAS = {}
+_EN_VUELO = {}
+_LOCK = threading.Lock()
+_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="noticias")
 
-    # Limpieza del ticker
-    cleaned_ticker = ticker.replace("*", "").replace(".MX", "").upper()
-    
-    # Nombre de empresa (fallback al ticker limpio)
-    company = company_map.get(cleaned_ticker, cleaned_ticker)
+
+def _url_noticias(ticker):
+    """Nombre de la empresa y URL de Google News RSS para el ticker."""
+    # Nombre de empresa desde el registro (fallback al ticker limpio)
+    company = REGISTRO.nombre(ticker)
 
     # Términos de búsqueda
     search_terms = f"{company} acciones OR bolsa OR stock OR news OR earnings"
@@ -47,28 +44,106 @@ def fetch_ticker_news_rss(ticker, num_news=5):
         f"gl=MX&"
         f"ceid=MX:es-419"
     )
+    return company, url
+
+
+def _formatear_entrada(entry):
+    published = entry.get("published", "")
+    if published:
+        try:
+            dt = datetime.strptime(published, "%a, %d %b %Y %H:%M:%S %Z")
+            published = dt.strftime("%d/%m/%Y %H:%M")
+        except:
+            published = published[:16]
+
+    parsed = entry.get("published_parsed")
+    return {
+        "timestamp": calendar.timegm(parsed) if parsed else 0,
+        "title": entry.title,
+        "publisher": entry.source.title if hasattr(entry, "source") else "Google News",
+        "link": entry.link,
+        "snippet": entry.summary[:250] + "..." if entry.get("summary") else "",
+        "published": published
+    }
+
+
+def _descargar_feed(url, ticker=None):
+    """
+    Descarga el feed con GET condicional (ETag / Last-Modified) y actualiza la
+    caché. Con 304 solo se renueva la marca de tiempo. Sin llamadas a st: se
+    usa también desde los hilos de precarga.
+    """
+    with _LOCK:
+        previo = _CACHE_NOTICIAS.get(url)
+    etag = previo.get("etag") if previo else None
+    modified = previo.get("modified") if previo else None
+
+    feed = feedparser.parse(url, etag=etag, modified=modified)
+    if feed.get("bozo") and not feed.entries and feed.get("status") is None:
+        raise feed.get("bozo_exception") or ValueError("Feed inválido")
+
+    if feed.get("status") == 304 and previo:
+        noticias = previo["noticias"]
+    else:
+        noticias = [_formatear_entrada(e) for e in feed.entries[:MAX_NOTICIAS_FEED]]
+        noticias.sort(key=lambda n: n["timestamp"], reverse=True)
+        if ticker:
+            ARCHIVO.encolar(ticker, noticias)
+
+    entrada = {
+        "noticias": noticias,
+        "etag": feed.get("etag", etag),
+        "modified": feed.get("modified", modified),
+        "ts": time.time(),
+    }
+    with _LOCK:
+        _CACHE_NOTICIAS[url] = entrada
+    return entrada
+
+
+def _vigente(url):
+    entrada = _CACHE_NOTICIAS.get(url)
+    return entrada is not None and time.time() - entrada["ts"] < TTL_NOTICIAS
+
+
+def prefetch_news(tickers):
+    """
+    Lanza en segundo plano la descarga de los feeds vencidos de todos los
+    tickers. No bloquea: el render sigue y el sidebar lee de la caché.
+    """
+    futuros = []
+    for ticker in dict.fromkeys(tickers):
+        _, url = _url_noticias(str(ticker))
+        with _LOCK:
+            if _vigente(url) or url in _EN_VUELO:
+                continue
+            futuro = _POOL.submit(_descargar_feed, url, str(ticker))
+            _EN_VUELO[url] = futuro
+        futuro.add_done_callback(lambda _, u=url: _EN_VUELO.pop(u, None))
+        futuros.append(futuro)
+    return futuros
+
+
+def fetch_ticker_news_rss(ticker, num_news=5):
+    """
+    Obtiene noticias vía RSS de Google News usando nombre real de la empresa.
+    Lee de la caché si el feed sigue vigente; si la precarga está en curso la
+    espera en lugar de repetir la descarga.
+    """
+    company, url = _url_noticias(ticker)
 
     try:
-        feed = feedparser.parse(url)
-        entries = feed.entries[:num_news]
-
-        news_list = []
-        for entry in entries:
-            published = entry.get("published", "")
-            if published:
-                try:
-                    dt = datetime.strptime(published, "%a, %d %b %Y %H:%M:%S %Z")
-                    published = dt.strftime("%d/%m/%Y %H:%M")
-                except:
-                    published = published[:16]
-
-            news_list.append({
-                "title": entry.title,
-                "publisher": entry.source.title if hasattr(entry, "source") else "Google News",
-                "link": entry.link,
-                "snippet": entry.summary[:250] + "..." if entry.get("summary") else "",
-                "published": published
-            })
+        with _LOCK:
+            vigente = _vigente(url)
+            en_vuelo = _EN_VUELO.get(url)
+        if vigente:
+            entrada = _CACHE_NOTICIAS[url]
+        elif en_vuelo is not None:
+            entrada = en_vuelo.result(timeout=30)
+        else:
+            entrada = _descargar_feed(url, ticker)
+
+        news_list = entrada["noticias"][:num_news]
 
         if not news_list:
             return [{"title": f"No se encontraron noticias para {company}", 
@@ -77,43 +152,101 @@ def fetch_ticker_news_rss(ticker, num_news=5):
         return news_list
 
     except Exception as e:
+        if url in _CACHE_NOTICIAS:
+            # Feed vencido pero utilizable: mejor noticias de hace un rato que ninguna
+            return _CACHE_NOTICIAS[url]["noticias"][:num_news]
+        archivadas = ARCHIVO.noticias_ticker(ticker, num_news)
+        if archivadas:
+            # Sin red: lo último que quedó en el archivo local
+            return archivadas
         st.warning(f"Error cargando noticias para {ticker}: {str(e)}")
         return [{"title": "Error al cargar noticias", 
                  "publisher": str(e), "link": "#", "snippet": ""}]
 
 
-def suggest_similar_opportunities(ticker):
+def hash_titular(titulo):
     """
-    Sugerencias similares adaptadas a tickers de positions.json (BMV/originales).
+    Hash del titular normalizado: sin el " - Medio" final de Google News, sin
+    acentos ni puntuación y con las palabras ordenadas, para que la misma nota
+    publicada con pequeñas variaciones caiga en el mismo hash.
     """
-    # Limpieza para matching
-    cleaned_ticker = ticker.replace("*", "").replace(".MX", "").upper()
-
-    # Mapeo de sugerencias (basado en tu JSON - extiéndelo)
-    similares = {
-        "1211N": ["NION", "TSLA", "LI", "XPEV"],  # BYD EV
-        "AMZN*": ["MSFT", "GOOGL", "AAPL*", "META"],  # Tech giants
-        "BKCH*": ["BITO", "WGMI", "MARA", "RIOT"],  # Blockchain/crypto ETFs
-        "BOTZ*": ["ROBO", "IRBO", "ARKQ"],  # Robotics/AI
-        "GSG*": ["DBC", "USCI", "CMDY"],  # Commodities
-        "HERO*": ["ESPO", "NERD", "GAMR"],  # Gaming/esports
-        "ICLN*": ["TAN", "QCLN", "FAN"],  # Clean energy
-        "NION": ["TSLA", "LI", "XPEV"],  # EV companies
-        "NUN": ["SOFI", "HOOD", "XP"],  # Fintech/neobanks
-        "SOCL*": ["BUZZ", "METV", "ONLN"],  # Social media/online
-        "SPYM*": ["VWO", "EEM", "IEMG"],  # Emerging markets
-        "VEA*": ["EFA", "IEFA", "SCHF"],  # Developed markets
-        "VWO*": ["IEMG", "EEM", "SPEM"],  # Emerging markets
-
-        # Mexicanos
-        "AGUA*": ["ROTPLAS", "AGUA.MX", "AQUA"],  # Agua/Rotoplas
-        "ALSEA*": ["ASUR", "GAPB", "OMA"],  # Restaurantes/operadores
-        "CEMEXCPO": ["GCC", "CMOCTEZ", "GMEXICOB"],  # Construcción/minería
-        "FMTY14": ["FIBRAMQ", "TERRA13", "FUNO11"],  # FIBRAs
-        "FUNO11": ["FIBRAMQ", "TERRA13", "FMTY14"],  # FIBRAs
-        "GMXT*": ["GMEXICOB", "RAILMEX", "TFII"],  # Transporte
-        "KOFUBL": ["KO", "PEP", "FMX"],  # Bebidas
-        "NAFTRACISHRS": ["MEXTRAC", "SPY", "VOO"],  # ETFs México/USA
-    }
+    titulo = re.sub(r"\s+-\s+[^-]+$", "", titulo or "")
+    titulo = unicodedata.normalize("NFKD", titulo.lower()).encode("ascii", "ignore").decode()
+    palabras = sorted(set(p for p in re.findall(r"[a-z0-9]+", titulo) if len(p) > 2))
+    return hashlib.md5(" ".join(palabras).encode()).hexdigest()
+
+
+class FeedPortafolio:
+    """
+    Noticias de todas las posiciones en un solo flujo ordenado por fecha
+    (más reciente primero), sin duplicados y con las posiciones que menciona.
+    Solo procesa los feeds cuya versión en caché cambió desde la última vez.
+    """
+
+    def __init__(self, maximo=MAX_NOTICIAS_PORTAFOLIO):
+        self.noticias = []     # Orden descendente por timestamp
+        self.maximo = maximo
+        self._por_hash = {}
+        self._versiones = {}   # url → ts de la caché ya incorporado
+        self._corte = None     # Timestamp de la más vieja conservada tras recortar
+
+    def actualizar(self, tickers):
+        """Incorpora lo nuevo de la caché (no descarga); regresa las noticias nuevas."""
+        nuevas_por_feed = []
+        for ticker in dict.fromkeys(tickers):
+            _, url = _url_noticias(str(ticker))
+            with _LOCK:
+                entrada = _CACHE_NOTICIAS.get(url)
+            if entrada is None or self._versiones.get(url) == entrada["ts"]:
+                continue
+            self._versiones[url] = entrada["ts"]
+
+            nuevas = []
+            for noticia in entrada["noticias"]:
+                if self._corte is not None and noticia["timestamp"] < self._corte:
+                    continue  # Ya se descartó por vieja; no regresa al feed
+                clave = hash_titular(noticia["title"])
+                existente = self._por_hash.get(clave)
+                if existente is not None:
+                    if ticker not in existente["tickers"]:
+                        existente["tickers"].append(ticker)
+                    continue
+                item = {**noticia, "tickers": [ticker], "hash": clave,
+                        "clave_sentimiento": clave_sentimiento(noticia["title"])}
+                self._por_hash[clave] = item
+                nuevas.append(item)
+            if nuevas:
+                nuevas_por_feed.append(nuevas)  # Cada feed ya viene ordenado
+
+        if not nuevas_por_feed:
+            return []
+        clave_orden = lambda n: -n["timestamp"]
+        nuevas = list(heapq.merge(*nuevas_por_feed, key=clave_orden))
+        self.noticias = list(heapq.merge(nuevas, self.noticias, key=clave_orden))
+        if len(self.noticias) > self.maximo:
+            for item in self.noticias[self.maximo:]:
+                self._por_hash.pop(item["hash"], None)
+            self.noticias = self.noticias[:self.maximo]
+            self._corte = self.noticias[-1]["timestamp"]
+            nuevas = [n for n in nuevas if n["hash"] in self._por_hash]
+        return nuevas
+
+    def recientes(self, n=20, ticker=None):
+        if ticker is None:
+            return self.noticias[:n]
+        return [x for x in self.noticias if ticker in x["tickers"]][:n]
+
+
+def suggest_similar_opportunities(ticker, k=5, extra=None):
+    """
+    Sugerencias similares para tickers de positions.json (BMV/originales):
+    vecinos por correlación de retornos y sector (similarity); si el ticker no
+    está en el índice, la lista del registro de tickers.
+    """
+    from similarity import indice_similitud
 
-    return similares.get(cleaned_ticker, [])
\ No newline at end of file
+    indice = indice_similitud(extra)
+    vecinos = indice.similares(ticker, k) if indice is not None else []
+    if vecinos:
+        return [t for t, _ in vecinos]
+    return REGISTRO.similares(ticker)
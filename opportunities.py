@@ -1,48 +1,168 @@
-def detectar_oportunidades(df):
+import numpy as np
+import pandas as pd
+
+# Umbrales con nombre; cada usuario puede sobrescribirlos en
+# portfolio["umbrales_oportunidades"] (ver umbrales_usuario)
+UMBRALES = {
+    "caida_severa": -25.0,
+    "caida": -15.0,
+    "ganancia_fuerte": 40.0,
+    "ganancia": 25.0,
+    "subida_dia": 5.0,
+    "bajada_dia": -5.0,
+    "rebote_dia": 2.0,
+    "rebote_caida": -10.0,
+    "lateral": 1.0,
+    "vol_intradia": 4.0,
+    "bajo_vwap": -2.0,
+    "sobre_vwap": 2.0,
+    "movs_grandes": 5.0,
+    "rsi_sobreventa": 30.0,
+    "rsi_sobrecompra": 70.0,
+    "bajo_ma20": -5.0,
+}
+
+# Cada regla: condiciones (columna, comparador, umbral) unidas con AND. El
+# umbral es un número o el nombre de una entrada de UMBRALES. `valor` es la
+# columna de la primera condición; `tono` decide el color en la UI y `direccion`
+# es el movimiento que la regla anticipa (+1 sube, −1 baja, 0 sin dirección),
+# usado por signal_backtest para medir aciertos.
+REGLAS = [
+    {"id": "caida_severa", "severidad": 3, "tono": "negativo", "direccion": 1,
+     "condiciones": [("var_pct_total", "<", "caida_severa")],
+     "mensaje": "🔻 {ticker} {valor:.2f}% desde tu compra. Considera promediar o revisar fundamentos."},
+    {"id": "caida", "severidad": 2, "tono": "negativo", "direccion": 1,
+     "condiciones": [("var_pct_total", "<", "caida"), ("var_pct_total", ">=", "caida_severa")],
+     "mensaje": "🔻 {ticker} {valor:.2f}% desde tu compra. Posible oportunidad de acumulación si sigue tendencia."},
+    {"id": "ganancia_fuerte", "severidad": 2, "tono": "positivo", "direccion": -1,
+     "condiciones": [("var_pct_total", ">", "ganancia_fuerte")],
+     "mensaje": "🟢 {ticker} +{valor:.2f}% desde tu compra. Podrías vender parcial (20-30%) para asegurar ganancias."},
+    {"id": "ganancia", "severidad": 1, "tono": "positivo", "direccion": -1,
+     "condiciones": [("var_pct_total", ">", "ganancia"), ("var_pct_total", "<=", "ganancia_fuerte")],
+     "mensaje": "🟢 {ticker} +{valor:.2f}% desde tu compra. Buen momento para evaluar salida parcial."},
+    {"id": "subida_dia", "severidad": 2, "tono": "positivo", "direccion": 1,
+     "condiciones": [("var_pct_dia", ">", "subida_dia")],
+     "mensaje": "🚀 {ticker} +{valor:.2f}% hoy. Momentum alcista intradía → posible continuación o toma de ganancias."},
+    {"id": "bajada_dia", "severidad": 3, "tono": "negativo", "direccion": -1,
+     "condiciones": [("var_pct_dia", "<", "bajada_dia")],
+     "mensaje": "📉 {ticker} {valor:.2f}% hoy. Movimiento bajista intradía → vigila si es sobreventa o cambio de tendencia."},
+    {"id": "rebote", "severidad": 1, "tono": "info", "direccion": 1,
+     "condiciones": [("var_pct_dia", ">", "rebote_dia"), ("var_pct_total", "<", "rebote_caida")],
+     "mensaje": "📈 {ticker} rebotando +{valor:.2f}% hoy tras caída acumulada. Posible señal de reversión."},
+    {"id": "lateral", "severidad": 0, "tono": "neutral", "direccion": 0,
+     "condiciones": [("var_pct_dia", "abs<", "lateral")],
+     "mensaje": "➡️ {ticker} lateral hoy ({valor:+.2f}%). Esperando catalizador o ruptura."},
+    {"id": "vol_intradia", "severidad": 2, "tono": "neutral", "direccion": 0,
+     "condiciones": [("vol_intradia", ">", "vol_intradia")],
+     "mensaje": "⚡ {ticker} con volatilidad intradía alta ({valor:.2f}%). Cuidado con órdenes a mercado."},
+    {"id": "bajo_vwap", "severidad": 2, "tono": "negativo", "direccion": -1,
+     "condiciones": [("dist_vwap_pct", "<", "bajo_vwap")],
+     "mensaje": "📉 {ticker} {valor:.2f}% debajo del VWAP. Presión vendedora en la sesión."},
+    {"id": "sobre_vwap", "severidad": 1, "tono": "positivo", "direccion": 1,
+     "condiciones": [("dist_vwap_pct", ">", "sobre_vwap")],
+     "mensaje": "🚀 {ticker} +{valor:.2f}% sobre el VWAP. Compradores dominando la sesión."},
+    {"id": "movs_grandes", "severidad": 1, "tono": "neutral", "direccion": 0,
+     "condiciones": [("movs_grandes", ">=", "movs_grandes")],
+     "mensaje": "⚡ {ticker} tuvo {valor:.0f} saltos bruscos de un minuto hoy."},
+    {"id": "sobreventa", "severidad": 2, "tono": "info", "direccion": 1,
+     "condiciones": [("rsi_14", "<", "rsi_sobreventa")],
+     "mensaje": "📈 {ticker} en sobreventa (RSI {valor:.0f}). Posible rebote técnico."},
+    {"id": "sobrecompra", "severidad": 1, "tono": "positivo", "direccion": -1,
+     "condiciones": [("rsi_14", ">", "rsi_sobrecompra")],
+     "mensaje": "🟢 {ticker} en sobrecompra (RSI {valor:.0f}). Vigila toma de utilidades."},
+    {"id": "bajo_ma20", "severidad": 2, "tono": "negativo", "direccion": 1,
+     "condiciones": [("dist_ma20_pct", "<", "bajo_ma20")],
+     "mensaje": "📉 {ticker} {valor:.2f}% debajo de su MA20."},
+]
+REGLAS_POR_ID = {r["id"]: r for r in REGLAS}
+
+COMPARADORES = {
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "abs<": lambda x, u: np.abs(x) < u,
+    "abs>": lambda x, u: np.abs(x) > u,
+}
+
+COLUMNAS_SENALES = ["ticker", "regla", "severidad", "valor", "tono"]
+
+
+def umbrales_usuario(portfolio=None):
+    """UMBRALES con los valores personalizados del portafolio del usuario."""
+    umbrales = dict(UMBRALES)
+    if portfolio:
+        for nombre, valor in (portfolio.get("umbrales_oportunidades") or {}).items():
+            if nombre in umbrales:
+                umbrales[nombre] = float(valor)
+    return umbrales
+
+
+def _umbral(umbral, umbrales):
+    return umbrales[umbral] if isinstance(umbral, str) else umbral
+
+
+def evaluar_reglas(df, reglas=REGLAS, umbrales=None):
     """
-    Detecta oportunidades refinadas usando datos intradía (precios por minuto).
-    Asume que df tiene columnas: ticker, var_pct_dia, var_pct_total, precio_mercado,
-    y que fetch_live_prices ya cargó datos intradía (puedes pasarlos como extra si necesitas).
+    Evalúa todas las reglas como máscaras booleanas sobre columnas numpy (sin
+    iterrows). Columnas faltantes valen NaN y nunca disparan. Regresa la tabla
+    de señales: ticker, regla, severidad, valor, tono.
     """
-    ops = []
-
-    for _, row in df.iterrows():
-        ticker = row['ticker']
-        var_dia = row.get('var_pct_dia', 0.0)
-        var_total = row.get('var_pct_total', 0.0)
-        precio_actual = row.get('precio_mercado', 0.0)
-        costo_prom = row.get('costo_promedio', 0.0)
-
-        # 1. Caídas fuertes desde compra (oportunidad de promediar o salir)
-        if var_total < -25:
-            ops.append(f"🔻 {ticker} -{abs(var_total):.2f}% desde tu compra. Considera promediar o revisar fundamentos.")
-        elif var_total < -15:
-            ops.append(f"🔻 {ticker} -{abs(var_total):.2f}% desde tu compra. Posible oportunidad de acumulación si sigue tendencia.")
-
-        # 2. Ganancias fuertes (tomar utilidades parciales)
-        if var_total > 40:
-            ops.append(f"🟢 {ticker} +{var_total:.2f}% desde tu compra. Podrías vender parcial (20-30%) para asegurar ganancias.")
-        elif var_total > 25:
-            ops.append(f"🟢 {ticker} +{var_total:.2f}% desde tu compra. Buen momento para evaluar salida parcial.")
-
-        # 3. Movimiento intradía fuerte (usando var_pct_dia)
-        if var_dia > 5:
-            ops.append(f"🚀 {ticker} +{var_dia:.2f}% hoy. Momentum alcista intradía → posible continuación o toma de ganancias.")
-        elif var_dia < -5:
-            ops.append(f"📉 {ticker} -{abs(var_dia):.2f}% hoy. Movimiento bajista intradía → vigila si es sobreventa o cambio de tendencia.")
-
-        # 4. Rebotando tras caída (señal de posible reversión)
-        if var_dia > 2 and var_total < -10:
-            ops.append(f"📈 {ticker} rebotando +{var_dia:.2f}% hoy tras caída acumulada. Posible señal de reversión.")
-        # 5. Consolidación o lateralidad (poca variación intradía)
-        if abs(var_dia) < 1:
-            ops.append(f"➡️ {ticker} lateral hoy (±{var_dia:.2f}%). Esperando catalizador o ruptura.")
+    umbrales = umbrales or UMBRALES
+    n = len(df)
+    columnas = {}
+
+    def col(nombre):
+        if nombre not in columnas:
+            columnas[nombre] = (df[nombre].to_numpy(dtype=float) if nombre in df.columns
+                                else np.full(n, np.nan))
+        return columnas[nombre]
+
+    indices, numeros, valores = [], [], []
+    with np.errstate(invalid="ignore"):
+        for k, regla in enumerate(reglas):
+            mask = np.ones(n, dtype=bool)
+            for columna, comparador, umbral in regla["condiciones"]:
+                mask &= COMPARADORES[comparador](col(columna), _umbral(umbral, umbrales))
+            idx = np.flatnonzero(mask)
+            if idx.size:
+                indices.append(idx)
+                numeros.append(np.full(idx.size, k))
+                valores.append(col(regla["condiciones"][0][0])[idx])
+
+    if not indices:
+        return pd.DataFrame(columns=COLUMNAS_SENALES)
+    idx, k = np.concatenate(indices), np.concatenate(numeros)
+    return pd.DataFrame({
+        "ticker": df["ticker"].to_numpy()[idx],
+        "regla": np.array([r["id"] for r in reglas], dtype=object)[k],
+        "severidad": np.array([r["severidad"] for r in reglas])[k],
+        "valor": np.concatenate(valores),
+        "tono": np.array([r["tono"] for r in reglas], dtype=object)[k],
+    })
+
+
+def ordenar_senales(senales):
+    """Más graves primero; dentro de la misma severidad, el valor más extremo."""
+    if senales.empty:
+        return senales
+    orden = np.lexsort((-senales["valor"].abs().to_numpy(), -senales["severidad"].to_numpy()))
+    return senales.iloc[orden].reset_index(drop=True)
+
+
+def formatear_senal(ticker, regla, valor):
+    return REGLAS_POR_ID[regla]["mensaje"].format(ticker=ticker, valor=valor)
+
+
+def detectar_oportunidades(df, umbrales=None):
+    """
+    Compatibilidad: mensajes de texto ordenados por severidad a partir de la
+    tabla de evaluar_reglas.
+    """
+    senales = ordenar_senales(evaluar_reglas(df, umbrales=umbrales))
+    ops = [formatear_senal(t, r, v) for t, r, v in zip(senales["ticker"], senales["regla"], senales["valor"])]
 
     # Mensaje por defecto si no hay señales fuertes
     if not ops:
         ops.append("No se detectaron oportunidades o movimientos significativos hoy. Todo en rango normal.")
-
-    # Opcional: ordenar por prioridad (más graves primero)
-    ops = sorted(ops, key=lambda x: "🔻" in x, reverse=True)  # Caídas al inicio
-
-    return ops
\ No newline at end of file
+    return ops
@@ -0,0 +1,199 @@
+"""
+Optimización media-varianza y frontera eficiente de las posiciones actuales
+"""
+import numpy as np
+import pandas as pd
+
+from price_history import cargar_cierres, version_datos
+
+DIAS_POR_ANIO = 252
+AVERSIONES = np.logspace(-1, 3, 60)  # Barrido de aversión al riesgo para la frontera
+ITERACIONES = 600
+
+# Resultados por versión de datos: mover el slider no recalcula la covarianza
+_CACHE = {}
+MAX_VERSIONES = 8   # Las más viejas se descartan (el proceso vive días)
+
+
+def covarianza_shrinkage(retornos):
+    """
+    Covarianza de Ledoit-Wolf encogida hacia la identidad escalada.
+    retornos: arreglo (T, n) de retornos diarios sin NaN.
+    """
+    X = retornos - retornos.mean(axis=0)
+    T, n = X.shape
+    S = X.T @ X / T
+    m = np.trace(S) / n
+    d2 = np.sum((S - m * np.eye(n)) ** 2)
+
+    # Varianza del estimador muestral: ||x x' - S||² = ||x||⁴ - 2 x'Sx + ||S||²
+    normas = np.sum(X ** 2, axis=1)
+    xSx = np.sum((X @ S) * X, axis=1)
+    b2 = np.sum(normas ** 2 - 2 * xSx + np.sum(S ** 2)) / T ** 2
+    b2 = min(b2, d2)
+
+    delta = b2 / d2 if d2 > 0 else 1.0
+    return delta * m * np.eye(n) + (1 - delta) * S
+
+
+def _proyectar_simplex(V):
+    """Proyecta cada fila de V sobre {w >= 0, sum(w) = 1}."""
+    n = V.shape[1]
+    U = -np.sort(-V, axis=1)
+    css = np.cumsum(U, axis=1) - 1
+    ind = np.arange(1, n + 1)
+    cond = U - css / ind > 0
+    rho = n - 1 - np.argmax(cond[:, ::-1], axis=1)
+    theta = css[np.arange(len(V)), rho] / (rho + 1)
+    return np.maximum(V - theta[:, None], 0)
+
+
+def resolver_lote(mu, cov, aversiones, W0=None, iteraciones=ITERACIONES):
+    """
+    Maximiza w'mu - (λ/2) w'Σw sin cortos para todos los λ a la vez
+    (gradiente proyectado acelerado; cada fila de W es una cartera).
+    """
+    aversiones = np.atleast_1d(np.asarray(aversiones, dtype=float))
+    n = len(mu)
+    L = max(np.linalg.eigvalsh(cov)[-1], 1e-12)
+    paso = 1.0 / (aversiones * L)
+
+    W = np.full((len(aversiones), n), 1.0 / n) if W0 is None else np.array(W0, dtype=float)
+    Y, t = W.copy(), 1.0
+    for _ in range(iteraciones):
+        grad = mu - aversiones[:, None] * (Y @ cov)
+        W_nuevo = _proyectar_simplex(Y + paso[:, None] * grad)
+        t_nuevo = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        Y = W_nuevo + ((t - 1) / t_nuevo) * (W_nuevo - W)
+        W, t = W_nuevo, t_nuevo
+    return W
+
+
+def _metricas(W, mu, cov, tasa_libre):
+    rend = W @ mu
+    vol = np.sqrt(np.maximum(np.sum((W @ cov) * W, axis=1), 0))
+    sharpe = np.where(vol > 0, (rend - tasa_libre) / np.where(vol > 0, vol, 1), 0.0)
+    return rend, vol, sharpe
+
+
+def estimar_parametros(cierres):
+    """Rendimiento esperado y covarianza encogida anualizados, cacheados por versión."""
+    version = version_datos(cierres)
+    if version in _CACHE:
+        return _CACHE[version]
+
+    # Los calendarios BMV/EE.UU. difieren: arrastramos el último cierre antes de calcular retornos
+    retornos = cierres.ffill().pct_change().iloc[1:]
+    retornos = retornos.dropna(axis=1, how="all").dropna(how="any")
+    mu = retornos.mean().to_numpy() * DIAS_POR_ANIO
+    cov = covarianza_shrinkage(retornos.to_numpy()) * DIAS_POR_ANIO
+
+    while len(_CACHE) >= MAX_VERSIONES:
+        _CACHE.pop(next(iter(_CACHE)))
+    _CACHE[version] = {"version": version, "tickers": list(retornos.columns), "mu": mu, "cov": cov}
+    return _CACHE[version]
+
+
+def _barrido(params):
+    """Carteras de la frontera para todo el barrido de λ (no depende de la tasa libre)."""
+    if "barrido" not in params:
+        params["barrido"] = resolver_lote(params["mu"], params["cov"], AVERSIONES)
+    return params["barrido"]
+
+
+def frontera_eficiente(cierres, tasa_libre=0.0):
+    """
+    Frontera eficiente sin cortos, mínima varianza y máximo Sharpe.
+    Todo queda cacheado en la entrada de la versión de datos.
+    """
+    params = estimar_parametros(cierres)
+    llave = ("frontera", tasa_libre)
+    if llave in params:
+        return params[llave]
+
+    mu, cov, tickers = params["mu"], params["cov"], params["tickers"]
+
+    W = _barrido(params)
+    rend, vol, sharpe = _metricas(W, mu, cov, tasa_libre)
+
+    w_min_var = resolver_lote(np.zeros_like(mu), cov, [1.0])[0]
+
+    # Refinamos el máximo Sharpe entre los vecinos del mejor punto del barrido
+    i = int(np.argmax(sharpe))
+    lo, hi = AVERSIONES[max(i - 1, 0)], AVERSIONES[min(i + 1, len(AVERSIONES) - 1)]
+    finas = np.geomspace(lo, hi, 30)
+    W_finas = resolver_lote(mu, cov, finas, W0=np.repeat(W[i:i + 1], len(finas), axis=0))
+    _, _, sharpe_finas = _metricas(W_finas, mu, cov, tasa_libre)
+    w_max_sharpe = W_finas[int(np.argmax(sharpe_finas))]
+
+    frontera = pd.DataFrame({
+        "aversion": AVERSIONES,
+        "rendimiento": rend,
+        "volatilidad": vol,
+        "sharpe": sharpe,
+    })
+    resultado = {
+        "frontera": frontera,
+        "pesos_frontera": pd.DataFrame(W, columns=tickers),
+        "min_var": pd.Series(w_min_var, index=tickers),
+        "max_sharpe": pd.Series(w_max_sharpe, index=tickers),
+    }
+    params[llave] = resultado
+    return resultado
+
+
+def cartera_por_aversion(cierres, aversion):
+    """
+    Cartera óptima para un λ puntual (slider). Parte de la cartera del
+    barrido con λ más cercano, así que converge en pocas iteraciones.
+    """
+    params = estimar_parametros(cierres)
+    W = _barrido(params)
+    i = int(np.argmin(np.abs(np.log(AVERSIONES) - np.log(aversion))))
+    w = resolver_lote(params["mu"], params["cov"], [aversion], W0=W[i:i + 1], iteraciones=100)[0]
+    return pd.Series(w, index=params["tickers"])
+
+
+def metricas_cartera(cierres, pesos, tasa_libre=0.0):
+    """Rendimiento, volatilidad y Sharpe anualizados de una cartera."""
+    params = estimar_parametros(cierres)
+    w = pesos.reindex(params["tickers"]).fillna(0).to_numpy()[None, :]
+    rend, vol, sharpe = _metricas(w, params["mu"], params["cov"], tasa_libre)
+    return {"rendimiento": rend[0], "volatilidad": vol[0], "sharpe": sharpe[0]}
+
+
+def pesos_actuales(df):
+    """Pesos actuales por ticker según valor_mercado."""
+    valor = df.groupby("ticker")["valor_mercado"].sum()
+    total = valor.sum()
+    return valor / total if total > 0 else valor * 0
+
+
+def comparar_pesos(df, cierres, aversion=None, tasa_libre=0.0):
+    """
+    Tabla de pesos actual vs mínima varianza vs máximo Sharpe (y λ del slider).
+    Los pesos actuales se re-normalizan sobre los tickers con historia de precios.
+    """
+    resultado = frontera_eficiente(cierres, tasa_libre)
+    tickers = estimar_parametros(cierres)["tickers"]
+
+    actual = pesos_actuales(df).reindex(tickers).fillna(0)
+    if actual.sum() > 0:
+        actual = actual / actual.sum()
+
+    tabla = pd.DataFrame({
+        "peso_actual": actual,
+        "peso_min_var": resultado["min_var"],
+        "peso_max_sharpe": resultado["max_sharpe"],
+    })
+    if aversion is not None:
+        tabla["peso_aversion"] = cartera_por_aversion(cierres, aversion)
+    tabla.index.name = "ticker"
+    return tabla
+
+
+def cierres_portafolio(df, actualizar=True):
+    """Cierres diarios en MXN de los tickers del portafolio."""
+    posiciones = df.drop_duplicates("ticker")
+    return cargar_cierres(posiciones["ticker"].tolist(), posiciones["mercado"].tolist(),
+                          en_mxn=True, actualizar=actualizar)
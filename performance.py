@@ -0,0 +1,214 @@
+"""
+Rendimiento ponderado por tiempo (TWR) y por dinero (MWR/TIR) con flujos de efectivo
+"""
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+HISTORY_PATH = "history/portfolio_history.csv"
+FLOWS_PATH = "history/cash_flows.csv"
+PERIODOS = ["1M", "3M", "YTD", "1A", "Total"]
+
+# (versión de datos, periodo) → resultado
+_CACHE = {}
+
+
+def cargar_historial(path=HISTORY_PATH):
+    """Valor diario del portafolio (serie indexada por fecha)."""
+    df_history = pd.read_csv(path, index_col=0)
+    df_history.index = pd.to_datetime(df_history.index)
+    return df_history["portfolio_value"]
+
+
+def cargar_flujos(portfolio=None, path=FLOWS_PATH):
+    """
+    Tabla compacta de flujos: columnas fecha, monto (+ aportación, − retiro).
+    Usa portfolio["flujos"] si viene el dict del usuario; si no, el CSV local.
+    """
+    if portfolio is not None:
+        flujos = pd.DataFrame(portfolio.get("flujos", []), columns=["fecha", "monto"])
+    elif os.path.exists(path):
+        flujos = pd.read_csv(path)
+    else:
+        flujos = pd.DataFrame(columns=["fecha", "monto"])
+    flujos["fecha"] = pd.to_datetime(flujos["fecha"])
+    flujos["monto"] = flujos["monto"].astype(float)
+    return flujos.sort_values("fecha").reset_index(drop=True)
+
+
+def flujos_diarios(valores, flujos):
+    """
+    Flujos agregados sobre el calendario del histórico. Un flujo en día
+    inhábil se asigna al siguiente día con valuación.
+    """
+    diarios = np.zeros(len(valores))
+    if flujos.empty:
+        return pd.Series(diarios, index=valores.index)
+    pos = np.searchsorted(valores.index.values, flujos["fecha"].values, side="left")
+    dentro = pos < len(valores)
+    np.add.at(diarios, pos[dentro], flujos["monto"].values[dentro])
+    return pd.Series(diarios, index=valores.index)
+
+
+def retornos_ajustados(valores, flujos):
+    """
+    Retorno diario sin el efecto de aportaciones/retiros:
+    r_t = (V_t - F_t) / V_{t-1} - 1, con el flujo valuado al cierre del día.
+    """
+    F = flujos_diarios(valores, flujos).to_numpy()
+    V = valores.to_numpy(dtype=float)
+    r = np.zeros(len(V))
+    r[1:] = (V[1:] - F[1:]) / V[:-1] - 1
+    return pd.Series(r, index=valores.index)
+
+
+def _inicio_periodo(fin, periodo, primera):
+    if periodo == "1M":
+        return fin - pd.DateOffset(months=1)
+    if periodo == "3M":
+        return fin - pd.DateOffset(months=3)
+    if periodo == "YTD":
+        return pd.Timestamp(year=fin.year, month=1, day=1) - pd.Timedelta(days=1)
+    if periodo == "1A":
+        return fin - pd.DateOffset(years=1)
+    return primera
+
+
+def _tramos(valores, flujos, periodos):
+    """
+    Para cada periodo: índice de arranque, TWR encadenado y los flujos de la
+    TIR vistos por el inversionista (−V_inicio, −F_i, +V_fin) con su tiempo en años.
+    """
+    fechas = valores.index
+    V = valores.to_numpy(dtype=float)
+    F = flujos_diarios(valores, flujos).to_numpy()
+    r = retornos_ajustados(valores, flujos).to_numpy()
+    crecimiento = np.cumprod(1 + r)
+
+    tramos = []
+    for periodo in periodos:
+        inicio = _inicio_periodo(fechas[-1], periodo, fechas[0])
+        # Valuación al cierre del último día hábil antes (o igual) al arranque del periodo
+        i0 = max(int(np.searchsorted(fechas.values, np.datetime64(inicio), side="right")) - 1, 0)
+        twr = crecimiento[-1] / crecimiento[i0] - 1
+
+        dias = (fechas[i0 + 1:] - fechas[i0]).days.to_numpy() / 365.0
+        montos = np.concatenate([[-V[i0]], -F[i0 + 1:]])
+        tiempos = np.concatenate([[0.0], dias])
+        montos[-1] += V[-1]
+        tramos.append({"periodo": periodo, "inicio": fechas[i0], "twr": twr,
+                       "montos": montos, "tiempos": tiempos})
+    return tramos
+
+
+def tir_vectorizada(montos, tiempos, iteraciones=50, tol=1e-10):
+    """
+    TIR anual para muchas series de flujos a la vez (filas de matrices K × M,
+    rellenas con ceros). Newton sobre log(1 + r) con bisección de respaldo.
+    """
+    montos = np.asarray(montos, dtype=float)
+    tiempos = np.asarray(tiempos, dtype=float)
+    K = montos.shape[0]
+
+    # Newton en x = log(1 + r): NPV(x) = Σ c_j e^{-x t_j}
+    x = np.zeros(K)
+    for _ in range(iteraciones):
+        descuento = np.exp(-x[:, None] * tiempos)
+        npv = np.sum(montos * descuento, axis=1)
+        dnpv = -np.sum(montos * tiempos * descuento, axis=1)
+        paso = np.where(np.abs(dnpv) > 1e-14, npv / np.where(dnpv == 0, 1, dnpv), 0.0)
+        x = np.clip(x - paso, -10, 10)
+        if np.all(np.abs(paso) < tol):
+            break
+
+    npv = np.sum(montos * np.exp(-x[:, None] * tiempos), axis=1)
+    escala = np.maximum(np.sum(np.abs(montos), axis=1), 1e-12)
+    fallidas = ~np.isfinite(x) | (np.abs(npv) / escala > 1e-8)
+
+    if fallidas.any():
+        lo = np.full(fallidas.sum(), -5.0)
+        hi = np.full(fallidas.sum(), 5.0)
+        c, t = montos[fallidas], tiempos[fallidas]
+        f_lo = np.sum(c * np.exp(-lo[:, None] * t), axis=1)
+        for _ in range(200):
+            mid = (lo + hi) / 2
+            f_mid = np.sum(c * np.exp(-mid[:, None] * t), axis=1)
+            mismo = np.sign(f_mid) == np.sign(f_lo)
+            lo = np.where(mismo, mid, lo)
+            f_lo = np.where(mismo, f_mid, f_lo)
+            hi = np.where(mismo, hi, mid)
+        x[fallidas] = (lo + hi) / 2
+
+    return np.expm1(x)
+
+
+def _matriz_flujos(tramos):
+    M = max(len(t["montos"]) for t in tramos)
+    montos = np.zeros((len(tramos), M))
+    tiempos = np.zeros((len(tramos), M))
+    for k, t in enumerate(tramos):
+        montos[k, :len(t["montos"])] = t["montos"]
+        tiempos[k, :len(t["tiempos"])] = t["tiempos"]
+    return montos, tiempos
+
+
+def _version(valores, flujos):
+    """Huella de la serie completa y de toda la tabla de flujos (fechas incluidas)."""
+    h = hashlib.md5()
+    h.update(pd.util.hash_pandas_object(valores, index=True).to_numpy().tobytes())
+    h.update(pd.util.hash_pandas_object(flujos[["fecha", "monto"]], index=False).to_numpy().tobytes())
+    return h.hexdigest()[:12]
+
+
+def rendimientos_por_periodo(valores, flujos, periodos=PERIODOS):
+    """
+    Tabla TWR / MWR por periodo. MWR se reporta como rendimiento del periodo
+    (comparable con TWR) y también la TIR anualizada.
+    """
+    version = _version(valores, flujos)
+    faltantes = [p for p in periodos if (version, p) not in _CACHE]
+
+    if faltantes:
+        tramos = _tramos(valores, flujos, faltantes)
+        montos, tiempos = _matriz_flujos(tramos)
+        tir = tir_vectorizada(montos, tiempos)
+        for t, irr in zip(tramos, tir):
+            anios = t["tiempos"][-1]
+            _CACHE[(version, t["periodo"])] = {
+                "periodo": t["periodo"],
+                "inicio": t["inicio"],
+                "twr": t["twr"],
+                "mwr": (1 + irr) ** anios - 1,
+                "tir_anual": irr,
+            }
+
+    return pd.DataFrame([_CACHE[(version, p)] for p in periodos]).set_index("periodo")
+
+
+def rendimientos_lote(usuarios, periodos=PERIODOS):
+    """
+    Cálculo nocturno para todos los usuarios: {user_id: (valores, flujos)}.
+    Se arma una sola matriz de flujos y la TIR se resuelve en una pasada.
+    """
+    tramos, llaves = [], []
+    for user_id, (valores, flujos) in usuarios.items():
+        for t in _tramos(valores, flujos, periodos):
+            tramos.append(t)
+            llaves.append(user_id)
+
+    if not tramos:
+        return pd.DataFrame(columns=["user_id", "periodo", "twr", "mwr", "tir_anual"])
+
+    montos, tiempos = _matriz_flujos(tramos)
+    tir = tir_vectorizada(montos, tiempos)
+    anios = np.array([t["tiempos"][-1] for t in tramos])
+
+    return pd.DataFrame({
+        "user_id": llaves,
+        "periodo": [t["periodo"] for t in tramos],
+        "twr": [t["twr"] for t in tramos],
+        "mwr": (1 + tir) ** anios - 1,
+        "tir_anual": tir,
+    })
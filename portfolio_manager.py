@@ -4,7 +4,14 @@ Gestión de portafolio para el usuario
 import streamlit as st
 import json
 import os
+import pandas as pd
 from data_loader import save_user_portfolio_to_supabase, get_logged_user_id
+from rebalance import planear_rebalanceo, error_seguimiento
+from ledger import Ledger, TIPOS
+from opportunities import UMBRALES
+from alerts import nueva_alerta, REARMES
+from ticker_registry import REGISTRO, indice_prefijos
+from screener import CATALOGO_PATH, catalogo_completo, catalogo_emisoras
 
 def load_portfolio_dict():
     """Carga el portafolio como dict (para el gestor)"""
@@ -81,6 +88,12 @@ def show_portfolio_manager():
         st.markdown("**Acciones BMV (MXN)**")
         show_asset_list(portfolio.get('mexico', []), 'mexico', portfolio)
     
+    show_rebalance_planner(portfolio)
+    show_cash_flows(portfolio)
+    show_ledger()
+    show_opportunity_thresholds(portfolio)
+    show_alerts(portfolio)
+    
     # Botón guardar
     if st.button("💾 Guardar cambios"):
         user_id = get_logged_user_id()
@@ -97,6 +110,15 @@ def show_portfolio_manager():
                 json.dump(portfolio, f, indent=2)
             st.warning("⚠️ Guardado localmente (no en la nube)")
 
+def indice_tickers():
+    """Índice de autocompletado; se reconstruye solo si cambió el catálogo de emisoras"""
+    version = os.path.getmtime(CATALOGO_PATH) if os.path.exists(CATALOGO_PATH) else None
+    if st.session_state.get("indice_tickers_version") != version or "indice_tickers" not in st.session_state:
+        st.session_state.indice_tickers = indice_prefijos(REGISTRO, catalogo_emisoras())
+        st.session_state.catalogo_completo = catalogo_completo()
+        st.session_state.indice_tickers_version = version
+    return st.session_state.indice_tickers
+
 def show_asset_list(assets, tipo, portfolio):
     """Muestra lista de activos con opciones de editar"""
     
@@ -128,7 +150,21 @@ def show_asset_list(assets, tipo, portfolio):
     st.write("**➕ Agregar nuevo:**")
     col1, col2, col3, col4 = st.columns([2, 2, 2, 1])
     with col1:
-        new_ticker = st.text_input("Ticker", placeholder="AMZN", key=f"new_ticker_{tipo}")
+        texto_ticker = st.text_input("Ticker", placeholder="AMZN", key=f"new_ticker_{tipo}")
+        indice = indice_tickers()
+        new_ticker = indice.resolver(texto_ticker) if texto_ticker else None
+        if texto_ticker and new_ticker is None:
+            sugerencias = indice.buscar(texto_ticker)
+            if sugerencias:
+                new_ticker = st.selectbox("Sugerencias", sugerencias, key=f"sug_ticker_{tipo}")
+            elif not st.session_state.catalogo_completo:
+                # Con el catálogo incompleto no se puede saber si existe: se avisa pero no se bloquea
+                st.warning(f"'{texto_ticker}' no está en el catálogo descargado hasta ahora; se agrega sin validar")
+                new_ticker = texto_ticker.strip().upper()
+            else:
+                st.error(f"'{texto_ticker}' no está en el catálogo de emisoras")
+        elif new_ticker:
+            st.caption(f"✓ {new_ticker}")
     with col2:
         new_titulos = st.number_input("Títulos", min_value=0, value=0, key=f"new_tit_{tipo}")
     with col3:
@@ -151,3 +187,167 @@ def show_asset_list(assets, tipo, portfolio):
     
     # Actualizar portfolio
     portfolio[tipo] = assets
+
+def show_rebalance_planner(portfolio):
+    """Planeador de rebalanceo hacia pesos objetivo (títulos enteros)"""
+    with st.expander("⚖️ Planear rebalanceo"):
+        global_df = pd.DataFrame(portfolio.get('global', []))
+        mexico_df = pd.DataFrame(portfolio.get('mexico', []))
+        global_df['mercado'] = 'Global'
+        mexico_df['mercado'] = 'México'
+        df = pd.concat([global_df, mexico_df], ignore_index=True)
+        
+        if df.empty or 'precio_mercado' not in df.columns:
+            st.info("Agrega activos con precio para planear un rebalanceo.")
+            return
+        
+        modo = st.radio("Objetivo por", ["ticker", "mercado"], horizontal=True, key="rebal_modo")
+        efectivo = st.number_input("Efectivo disponible", min_value=0.0, value=0.0, key="rebal_efectivo")
+        
+        valor = df['titulos'] * df['precio_mercado']
+        total = valor.sum() + efectivo
+        actuales = (valor.groupby(df[modo]).sum() / total * 100) if total > 0 else valor * 0
+        
+        objetivos = {}
+        cols = st.columns(3)
+        for i, clave in enumerate(actuales.index):
+            with cols[i % 3]:
+                objetivos[clave] = st.number_input(
+                    f"{clave} (%)", min_value=0.0, max_value=100.0,
+                    value=round(float(actuales[clave]), 1), step=0.5, key=f"rebal_obj_{modo}_{clave}"
+                ) / 100
+        banda = st.slider("Tolerancia sin operar (% del peso objetivo)", 0, 50, 5, key="rebal_banda") / 100
+        
+        try:
+            plan, efectivo_final = planear_rebalanceo(df, objetivos, efectivo=efectivo, por=modo, banda=banda)
+        except ValueError as e:
+            st.warning(str(e))
+            return
+        
+        ordenes = plan[plan['operacion'] != "MANTENER"]
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Órdenes", f"{len(ordenes)}")
+        col2.metric("Efectivo final", f"${efectivo_final:,.2f}")
+        col3.metric("Error de seguimiento", f"{error_seguimiento(plan) * 100:.2f}%")
+        st.dataframe(
+            ordenes[["ticker", "operacion", "cantidad", "precio_mercado", "monto",
+                     "peso_actual", "peso_objetivo", "peso_final"]].style.format({
+                "precio_mercado": "${:,.2f}", "monto": "${:,.2f}",
+                "peso_actual": "{:.1%}", "peso_objetivo": "{:.1%}", "peso_final": "{:.1%}"
+            }),
+            use_container_width=True
+        )
+
+def show_cash_flows(portfolio):
+    """Registro de aportaciones y retiros (para TWR/MWR)"""
+    with st.expander("💵 Aportaciones y retiros"):
+        flujos = portfolio.setdefault('flujos', [])
+        if flujos:
+            st.dataframe(pd.DataFrame(flujos), use_container_width=True)
+        else:
+            st.info("Sin flujos registrados.")
+        
+        col1, col2, col3 = st.columns([2, 2, 1])
+        with col1:
+            fecha = st.date_input("Fecha", key="flujo_fecha")
+        with col2:
+            monto = st.number_input("Monto (+ aportación, − retiro)", value=0.0, key="flujo_monto")
+        with col3:
+            if st.button("➕ Registrar", key="flujo_agregar") and monto != 0:
+                flujos.append({"fecha": fecha.strftime("%Y-%m-%d"), "monto": monto})
+                st.success("Flujo registrado. Recuerda guardar cambios.")
+
+def show_opportunity_thresholds(portfolio):
+    """Umbrales personalizados de las reglas de oportunidades"""
+    with st.expander("🎯 Umbrales de oportunidades"):
+        propios = portfolio.setdefault('umbrales_oportunidades', {})
+        cols = st.columns(3)
+        for i, (nombre, defecto) in enumerate(UMBRALES.items()):
+            with cols[i % 3]:
+                valor = st.number_input(nombre.replace("_", " ").capitalize(), value=float(propios.get(nombre, defecto)),
+                                        step=0.5, key=f"umbral_{nombre}")
+            if valor != defecto:
+                propios[nombre] = valor
+            else:
+                propios.pop(nombre, None)
+        if st.button("↩️ Restablecer", key="umbrales_reset"):
+            propios.clear()
+            st.success("Umbrales restablecidos. Recuerda guardar cambios.")
+
+def show_alerts(portfolio):
+    """Alertas de precio objetivo (se revisan con cada actualización de precios)"""
+    with st.expander("🔔 Alertas de precio"):
+        alertas = portfolio.setdefault('alertas', [])
+        for i, alerta in enumerate(alertas):
+            col1, col2, col3 = st.columns([4, 2, 1])
+            with col1:
+                st.write(f"{alerta['ticker']} {alerta['condicion']} ${alerta['precio']:,.2f} MXN ({alerta.get('rearme', 'una_vez')})")
+            with col2:
+                if alerta.get('activa', True):
+                    st.write("🟢 Activa")
+                else:
+                    st.write(f"✔️ Disparada {str(alerta.get('disparada_en', ''))[:16]}")
+            with col3:
+                if st.button("🗑️", key=f"del_alerta_{alerta['id']}"):
+                    alertas.pop(i)
+                    st.rerun()
+        
+        # Solo hay precio (en MXN) para las posiciones del portafolio
+        tenencias = [a['ticker'] for a in portfolio.get('global', []) + portfolio.get('mexico', []) if a.get('ticker')]
+        if not tenencias:
+            st.info("Agrega posiciones para poner alertas sobre ellas.")
+            return
+        st.caption("Las alertas se revisan contra el precio de mercado de tus posiciones, en MXN (también las del SIC/Global).")
+        col1, col2, col3, col4 = st.columns([2, 1, 2, 2])
+        with col1:
+            ticker = st.selectbox("Posición", tenencias, key="alerta_ticker")
+        with col2:
+            condicion = st.selectbox("Condición", ["<", ">"], key="alerta_condicion")
+        with col3:
+            precio = st.number_input("Precio (MXN)", min_value=0.0, value=0.0, key="alerta_precio")
+        with col4:
+            rearme = st.selectbox("Rearme", REARMES, key="alerta_rearme")
+        if ticker and precio > 0 and st.button("➕ Agregar alerta", key="alerta_agregar"):
+            try:
+                alertas.append(nueva_alerta(ticker, condicion, precio, rearme, tenencias=tenencias))
+            except ValueError as e:
+                st.error(f"❌ {e}")
+            else:
+                st.success("Alerta agregada. Recuerda guardar cambios.")
+                st.rerun()
+
+def show_ledger():
+    """Bitácora de operaciones con lotes FIFO y ganancias realizadas"""
+    with st.expander("🧾 Bitácora de operaciones"):
+        ledger = Ledger(get_logged_user_id() or "demo").cargar()
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            tipo = st.selectbox("Tipo", TIPOS, key="tx_tipo")
+            fecha = st.date_input("Fecha", key="tx_fecha")
+        with col2:
+            ticker = st.text_input("Ticker", key="tx_ticker")
+            mercado = st.selectbox("Mercado", ["global", "mexico"], key="tx_mercado")
+        with col3:
+            titulos = st.number_input("Títulos", min_value=0.0, value=0.0, key="tx_titulos")
+            precio = st.number_input("Precio", min_value=0.0, value=0.0, key="tx_precio")
+        with col4:
+            factor = st.number_input("Factor (split)", min_value=0.0, value=0.0, key="tx_factor")
+            monto = st.number_input("Monto (dividendo)", min_value=0.0, value=0.0, key="tx_monto")
+        
+        if ticker and st.button("Registrar operación", key="tx_registrar"):
+            try:
+                ledger.registrar(tipo, ticker, titulos=titulos, precio=precio, mercado=mercado,
+                                 fecha=fecha, factor=factor or None, monto=monto or None)
+                st.success(f"✅ {tipo} de {ticker.upper()} registrada")
+            except ValueError as e:
+                st.error(f"❌ {e}")
+        
+        st.write("**Posiciones derivadas:**")
+        st.dataframe(ledger.posiciones(), use_container_width=True)
+        st.write("**Lotes abiertos (FIFO):**")
+        st.dataframe(ledger.lotes_abiertos(), use_container_width=True)
+        realizadas = ledger.ganancias_realizadas()
+        if not realizadas.empty:
+            st.write(f"**Ganancia realizada:** ${realizadas['ganancia'].sum():,.2f}")
+            st.dataframe(realizadas, use_container_width=True)
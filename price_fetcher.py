@@ -8,6 +8,8 @@ import os
 from dotenv import load_dotenv
 from typing import Optional
 import pytz  # Agregado para manejar zonas horarias
+from intraday import BAR_STORE
+from ticker_registry import REGISTRO
 load_dotenv()  # Para .env en desarrollo local
 
 from typing import Optional
@@ -108,6 +110,7 @@ def fetch_live_prices(df, token=None, days_back=7, intervalo="1m", fx_rates=None
             hkd_mxn = 2.60
         fx_rates = {"USD_MXN": usd_mxn, "HKD_MXN": hkd_mxn}
         st.info(f"USD/MXN: {usd_mxn:.4f} | HKD/MXN: {hkd_mxn:.4f}")
+    BAR_STORE.fx_rates = fx_rates
 
     base_url = "https://api.databursatil.com/v2/intradia"
 
@@ -171,6 +174,9 @@ def fetch_live_prices(df, token=None, days_back=7, intervalo="1m", fx_rates=None
             if not ts_sorted:
                 raise ValueError("Sin timestamps")
 
+            # Guardamos las barras de 1m en vez de descartarlas (curva intradía)
+            BAR_STORE.agregar_payload(ticker_original, ticker_data)
+
             last_price = float(ticker_data[ts_sorted[0]])
             prev_price = float(ticker_data[ts_sorted[1]]) if len(ts_sorted) >= 2 else None
 
@@ -192,12 +198,8 @@ def fetch_live_prices(df, token=None, days_back=7, intervalo="1m", fx_rates=None
         except Exception as e1:
             st.caption(f"[DEBUG-DB] Intento 1 falló: {str(e1)}")
 
-            # Reintento con variantes
-            variants = []
-            if "*" in ticker_db:
-                variants.append(ticker_db.replace("*", ""))
-            if ".MX" in ticker_db:
-                variants.append(ticker_db.replace(".MX", ""))
+            # Reintento con variantes (registro de tickers)
+            variants = [v for v in REGISTRO.variantes(ticker_db) if v != ticker_db]
 
             for var_num, variant in enumerate(variants, start=2):
                 url_var = url.replace(ticker_db, variant)
@@ -219,6 +221,8 @@ def fetch_live_prices(df, token=None, days_back=7, intervalo="1m", fx_rates=None
                     if not ts_sorted:
                         raise ValueError("Sin timestamps")
 
+                    BAR_STORE.agregar_payload(ticker_original, ticker_data)
+
                     last_price = float(ticker_data[ts_sorted[0]])
                     prev_price = float(ticker_data[ts_sorted[1]]) if len(ts_sorted) >= 2 else None
 
@@ -248,7 +252,8 @@ def fetch_live_prices(df, token=None, days_back=7, intervalo="1m", fx_rates=None
 
         # Fallback yfinance
         if not success_db:
-            ticker_yf = ticker_original.replace("*", "").replace(".MX", "")
+            ticker_yf = REGISTRO.simbolo_yf(ticker_original, row.get("mercado"))
+            moneda_yf = REGISTRO.moneda(ticker_original, row.get("mercado"))
 
             try:
                 yf_obj = yf.Ticker(ticker_yf)
@@ -264,21 +269,15 @@ def fetch_live_prices(df, token=None, days_back=7, intervalo="1m", fx_rates=None
                         prev_yf = hist["Close"].iloc[-2] if len(hist) >= 2 else last_yf
 
                 if last_yf is not None and pd.notna(last_yf):
-                    if ".MX" in ticker_original:
-                        price_mxn = last_yf
-                        prev_mxn = prev_yf if prev_yf else last_yf
-                    elif ".HK" in ticker_original:
-                        price_mxn = last_yf * fx_rates["HKD_MXN"]
-                        prev_mxn = prev_yf * fx_rates["HKD_MXN"] if prev_yf else price_mxn
-                    else:
-                        price_mxn = last_yf * fx_rates["USD_MXN"]
-                        prev_mxn = prev_yf * fx_rates["USD_MXN"] if prev_yf else price_mxn
+                    fx = 1.0 if moneda_yf == "MXN" else fx_rates[f"{moneda_yf}_MXN"]
+                    price_mxn = last_yf * fx
+                    prev_mxn = prev_yf * fx if prev_yf else price_mxn
 
                     df.at[idx, "precio_mercado"] = round(price_mxn, 4)
                     df.at[idx, "valor_mercado"] = round(price_mxn * row["titulos"], 2)
 
                     if prev_yf and prev_mxn > 0:
-                        var_pct = (price_mxn - prev_price) / prev_mxn * 100
+                        var_pct = (price_mxn - prev_mxn) / prev_mxn * 100
                         df.at[idx, "var_pct_dia"] = round(var_pct, 2)
                         df.at[idx, "ganancia_dia"] = round((price_mxn - prev_mxn) * row["titulos"], 2)
 
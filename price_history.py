@@ -0,0 +1,125 @@
+"""
+Caché local de cierres diarios por ticker (yfinance → CSV en history/prices)
+"""
+import hashlib
+import os
+from datetime import date, timedelta
+
+import pandas as pd
+import yfinance as yf
+
+from ticker_registry import REGISTRO
+
+PRICES_DIR = "history/prices"
+ANIOS_HISTORIA = 10
+FX_SIMBOLOS = {"USD": "USDMXN=X", "HKD": "HKDMXN=X"}
+
+
+def simbolo_yfinance(ticker, mercado="Global"):
+    """Símbolo de yfinance para un ticker del portafolio (vía el registro)."""
+    return REGISTRO.simbolo_yf(ticker, mercado)
+
+
+def moneda_ticker(ticker, mercado="Global"):
+    """Moneda en que cotiza el símbolo de yfinance (vía el registro)."""
+    return REGISTRO.moneda(ticker, mercado)
+
+
+def _ruta(simbolo):
+    nombre = "".join(c if c.isalnum() or c in "-_." else "_" for c in simbolo)
+    return os.path.join(PRICES_DIR, f"{nombre}.csv")
+
+
+def _leer_serie(simbolo):
+    ruta = _ruta(simbolo)
+    if not os.path.exists(ruta):
+        return pd.Series(dtype=float, name=simbolo)
+    serie = pd.read_csv(ruta, index_col=0)["close"]
+    serie.index = pd.to_datetime(serie.index)
+    serie.name = simbolo
+    return serie
+
+
+def actualizar_serie(simbolo, anios=ANIOS_HISTORIA):
+    """
+    Descarga solo los días que faltan desde el último cierre guardado.
+    Si el archivo ya se revisó hoy no se hace ninguna consulta.
+    """
+    ruta = _ruta(simbolo)
+    serie = _leer_serie(simbolo)
+
+    if os.path.exists(ruta) and date.fromtimestamp(os.path.getmtime(ruta)) == date.today():
+        return serie
+
+    if serie.empty:
+        inicio = date.today() - timedelta(days=365 * anios)
+    else:
+        inicio = serie.index[-1].date() + timedelta(days=1)
+
+    try:
+        hist = yf.Ticker(simbolo).history(start=inicio.strftime("%Y-%m-%d"), auto_adjust=True)
+        nuevos = hist["Close"].dropna()
+        nuevos.index = pd.to_datetime(nuevos.index).tz_localize(None).normalize()
+        nuevos = nuevos[nuevos.index > (serie.index[-1] if not serie.empty else pd.Timestamp.min)]
+        if not nuevos.empty:
+            serie = pd.concat([serie, nuevos])
+    except Exception as e:
+        print(f"Error actualizando cierres de {simbolo}: {e}")
+
+    os.makedirs(PRICES_DIR, exist_ok=True)
+    serie.rename("close").to_frame().to_csv(ruta)  # Toca el archivo aunque no haya datos nuevos
+    serie.name = simbolo
+    return serie
+
+
+def cargar_fx(monedas=("USD", "HKD"), actualizar=True):
+    """Tipos de cambio diarios contra MXN (columnas = moneda)."""
+    series = {}
+    for moneda in monedas:
+        if moneda == "MXN":
+            continue
+        simbolo = FX_SIMBOLOS[moneda]
+        series[moneda] = actualizar_serie(simbolo) if actualizar else _leer_serie(simbolo)
+    return pd.DataFrame(series).sort_index()
+
+
+def cargar_cierres(tickers, mercados=None, en_mxn=False, actualizar=True):
+    """
+    Matriz fecha × ticker de cierres diarios desde la caché local.
+    Las columnas conservan el ticker del portafolio (p.ej. "AMZN*").
+    Con en_mxn=True los precios en USD/HKD se convierten con el tipo de cambio del día.
+    """
+    if mercados is None:
+        mercados = ["Global"] * len(tickers)
+
+    series, monedas = {}, {}
+    for ticker, mercado in zip(tickers, mercados):
+        simbolo = simbolo_yfinance(ticker, mercado)
+        serie = actualizar_serie(simbolo) if actualizar else _leer_serie(simbolo)
+        if serie.empty:
+            continue
+        series[ticker] = serie[~serie.index.duplicated(keep="last")]
+        monedas[ticker] = moneda_ticker(ticker, mercado)
+
+    cierres = pd.DataFrame(series).sort_index()
+
+    if en_mxn and not cierres.empty:
+        fx = cargar_fx(sorted(set(monedas.values())), actualizar=actualizar)
+        fx = fx.reindex(cierres.index).ffill().bfill()
+        fx["MXN"] = 1.0
+        factores = fx[[monedas[t] for t in cierres.columns]].to_numpy()
+        cierres = cierres * factores
+
+    return cierres
+
+
+def version_datos(cierres):
+    """
+    Huella corta de la matriz completa de cierres para usar como llave de
+    caché; un ajuste retroactivo (split, dividendo) también la cambia.
+    """
+    if cierres.empty:
+        return "vacio"
+    h = hashlib.md5(str(list(cierres.columns)).encode())
+    h.update(pd.util.hash_pandas_object(cierres, index=True).to_numpy().tobytes())
+    return h.hexdigest()[:12]
@@ -0,0 +1,106 @@
+"""
+Planeador de rebalanceo en títulos enteros hacia pesos objetivo
+"""
+import numpy as np
+import pandas as pd
+
+
+def expandir_objetivos_mercado(df, objetivos_mercado):
+    """
+    Convierte pesos por mercado ({"México": 0.4, "Global": 0.6}) en pesos por ticker,
+    repartiendo cada mercado en proporción al valor actual (o en partes iguales si está vacío).
+    """
+    valor = df["titulos"] * df["precio_mercado"]
+    pesos = pd.Series(0.0, index=df.index)
+    for mercado, peso in objetivos_mercado.items():
+        mask = (df["mercado"] == mercado).to_numpy()
+        if not mask.any():
+            continue
+        valor_m = valor[mask]
+        if valor_m.sum() > 0:
+            pesos[mask] = peso * valor_m / valor_m.sum()
+        else:
+            pesos[mask] = peso / mask.sum()
+    return dict(zip(df["ticker"], pesos))
+
+
+def planear_rebalanceo(df, objetivos, efectivo=0.0, por="ticker", banda=0.05):
+    """
+    Lista de compras/ventas en títulos enteros para acercarse a los pesos objetivo.
+
+    - objetivos: {ticker: peso} o {mercado: peso} si por="mercado". Lo que no
+      se asigne (suma < 1) queda como efectivo objetivo.
+    - banda: desviación tolerada relativa al peso objetivo (0.05 = ±5% del peso);
+      las posiciones dentro de la banda no se operan, lo que reduce el número de órdenes.
+
+    Todo es vectorizado: redondeo hacia abajo y luego se reparte el efectivo
+    sobrante un título a la vez a las posiciones con mayor déficit.
+    """
+    df = df[["ticker", "mercado", "titulos", "precio_mercado"]].copy()
+    df = df[df["precio_mercado"] > 0].reset_index(drop=True)
+
+    if por == "mercado":
+        objetivos = expandir_objetivos_mercado(df, objetivos)
+
+    precio = df["precio_mercado"].to_numpy(dtype=float)
+    actuales = df["titulos"].to_numpy(dtype=float)
+    peso_obj = df["ticker"].map(objetivos).fillna(0.0).to_numpy(dtype=float)
+    if peso_obj.sum() > 1:
+        peso_obj = peso_obj / peso_obj.sum()
+
+    total = float(actuales @ precio + efectivo)
+    if total <= 0:
+        raise ValueError("El portafolio no tiene valor ni efectivo para rebalancear")
+    peso_act = actuales * precio / total
+
+    # 1. Títulos ideales (fraccionarios) y redondeo hacia abajo
+    ideales = peso_obj * total / precio
+    nuevos = np.floor(ideales)
+
+    # 2. Dentro de la banda no se opera
+    dentro = np.abs(peso_act - peso_obj) <= banda * peso_obj
+    nuevos[dentro] = actuales[dentro]
+
+    # 3. Si lo que se quedó quieto rebasa el efectivo, vendemos lo más sobreponderado:
+    #    los títulos necesarios para cubrir el faltante, como máximo hasta su ideal
+    sobrante = total - nuevos @ precio
+    if sobrante < 0:
+        exceso = np.where(dentro, (nuevos - ideales) * precio, 0.0)
+        for i in np.argsort(-exceso):
+            if sobrante >= 0 or exceso[i] <= 0:
+                break
+            vender = min(np.ceil(-sobrante / precio[i]), nuevos[i] - np.floor(ideales[i]))
+            nuevos[i] -= vender
+            sobrante += vender * precio[i]
+
+    # 4. Efectivo restante: un título más a quien tenga mayor déficit (en pesos)
+    deficit = np.where(dentro, 0.0, (ideales - nuevos) * precio)
+    orden = np.argsort(-deficit)
+    orden = orden[deficit[orden] > 0]
+    acumulado = np.cumsum(precio[orden])
+    nuevos[orden[acumulado <= sobrante]] += 1
+
+    delta = nuevos - actuales
+    plan = pd.DataFrame({
+        "ticker": df["ticker"],
+        "mercado": df["mercado"],
+        "precio_mercado": precio,
+        "titulos_actuales": actuales.astype(int),
+        "titulos_objetivo": nuevos.astype(int),
+        "operacion": np.select([delta > 0, delta < 0], ["COMPRAR", "VENDER"], "MANTENER"),
+        "cantidad": np.abs(delta).astype(int),
+        "monto": np.abs(delta) * precio,
+        "peso_actual": peso_act,
+        "peso_objetivo": peso_obj,
+        "peso_final": nuevos * precio / total,
+    })
+
+    efectivo_final = total - nuevos @ precio
+    if efectivo_final < -1e-6:
+        raise ValueError(f"El plan gastaría más efectivo del disponible ({efectivo_final:,.2f})")
+    return plan, efectivo_final
+
+
+def error_seguimiento(plan):
+    """Distancia euclidiana entre pesos finales y objetivo."""
+    return float(np.sqrt(np.sum((plan["peso_final"] - plan["peso_objetivo"]) ** 2)))
@@ -2,10 +2,30 @@ import streamlit as st
 from data_loader import load_positions
 from price_fetcher import fetch_live_prices, get_databursatil_token
 from portfolio import resumen_portafolio
-from opportunities import detectar_oportunidades
-from news_fetcher import fetch_ticker_news_rss, suggest_similar_opportunities
-from auth import require_auth, is_logged_in, login_form, logout, init_session_state
-from portfolio_manager import show_portfolio_manager
+from opportunities import evaluar_reglas, ordenar_senales, formatear_senal, umbrales_usuario
+from news_fetcher import fetch_ticker_news_rss, suggest_similar_opportunities, prefetch_news, FeedPortafolio
+from auth import require_auth, is_logged_in, login_form, logout, init_session_state, get_user_id
+from portfolio_manager import show_portfolio_manager, load_portfolio_dict
+from montecarlo import proyectar_portafolio, resumen_horizontes
+from performance import cargar_flujos, rendimientos_por_periodo
+from optimizer import cierres_portafolio, frontera_eficiente, comparar_pesos, metricas_cartera
+from backtester import backtest_lote, pesos_objetivo
+from attribution import atribucion, resumen_atribucion, costos_desde_ledger
+from price_history import cargar_cierres, cargar_fx, moneda_ticker, version_datos
+from indicators import IndicadoresIncrementales
+from streaming import EvaluadorStreaming, senales_a_tabla
+from signal_backtest import HORIZONTES, disparos, resumen_senales
+from alerts import IndiceAlertas, guardar_pendientes, resolver_tenencia
+from news_archive import ARCHIVO
+from sentiment import sentimiento_por_ticker
+from fundamentals import FUNDAMENTALES
+from screener import CIERRES_PATH, METRICAS, Screener, actualizar_en_segundo_plano
+from cross_listing import formatear_marcas, listados_duales, monitor_primas, serie_primas
+from ledger import Ledger
+from scenarios import (CRISIS, choque_fx, choque_mercado, choque_sector, choque_historico,
+                       componer, evaluar_escenarios, valores_por_posicion, sectores_posiciones)
+from ticker_registry import REGISTRO
+from intraday import BAR_STORE, CurvaIntradia, barras_yfinance, estadisticas_intradia
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
@@ -67,6 +87,46 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# === Escenarios what-if (fragmento) ===
+@st.fragment
+def panel_escenarios(df):
+    """
+    Escenarios what-if como fragmento: mover un slider solo vuelve a correr
+    esta función, no el script completo (sin fetch de precios ni Supabase).
+    """
+    with st.expander("🧪 Escenarios what-if"):
+        # Todo se calcula sobre df ya cargado: mover sliders no consulta precios
+        col_s1, col_s2, col_s3 = st.columns(3)
+        choque_usd = col_s1.slider("USD/MXN (%)", -30, 30, 0, 1, key="esc_usd")
+        choque_bmv = col_s2.slider("BMV (%)", -50, 30, 0, 1, key="esc_bmv")
+        choque_global = col_s3.slider("Global (%)", -50, 30, 0, 1, key="esc_global")
+        escenarios = {
+            "Personalizado": componer(choque_fx(df, "USD", choque_usd),
+                                      choque_mercado(df, "México", choque_bmv),
+                                      choque_mercado(df, "Global", choque_global)),
+            "USD/MXN +10%": choque_fx(df, "USD", 10),
+            "USD/MXN −10%": choque_fx(df, "USD", -10),
+            "BMV −15%": choque_mercado(df, "México", -15),
+            "Global −20%": choque_mercado(df, "Global", -20),
+        }
+        for sector in sorted({s for s in sectores_posiciones(df) if s}):
+            escenarios[f"{sector} −25%"] = choque_sector(df, sector, -25)
+        crisis_sel = st.multiselect("Repetir crisis históricas", list(CRISIS), key="esc_crisis")
+        if crisis_sel:
+            cierres_esc = cierres_portafolio(df, actualizar=False)
+            for nombre in crisis_sel:
+                if not cierres_esc.empty:
+                    escenarios[nombre] = np.nan_to_num(choque_historico(df, cierres_esc, *CRISIS[nombre]))
+
+        tabla_esc = evaluar_escenarios(df, escenarios)
+        st.dataframe(tabla_esc.style.format({
+            "valor_mercado": "${:,.0f}", "cambio": "${:+,.0f}", "cambio_pct": "{:+.2f}%", "ganancia_live": "${:,.0f}"
+        }), use_container_width=True)
+        st.dataframe(valores_por_posicion(df, escenarios["Personalizado"]).style.format({
+            "valor_mercado": "${:,.2f}", "cambio": "${:+,.2f}", "ganancia_live": "${:,.2f}"
+        }), use_container_width=True)
+
+
 # === Funciones de autenticación (sin cambios) ===
 def get_real_password():
     try:
@@ -243,10 +303,13 @@ if is_logged_in():
     except Exception as e:
         st.error(f"Error al cargar portafolio: {e}")
         df = pd.DataFrame()
+    # Dict del usuario (umbrales, flujos, alertas): una sola consulta a Supabase por rerun
+    portfolio_usuario = load_portfolio_dict()
 else:
     # No logueado - mostrar demo
     st.markdown('<div class="demo-watermark">DEMO</div>', unsafe_allow_html=True)
     st.sidebar.warning("🔒 Modo DEMO – Regístrate para ver tu portafolio")
+    portfolio_usuario = None
     try:
         df = load_positions(path="demo.json")
     except Exception as e:
@@ -261,6 +324,9 @@ if df.empty:
         st.rerun()
     st.stop()
 else:
+    # Noticias de todas las posiciones en segundo plano mientras se actualizan precios
+    prefetch_news(df["ticker"].astype(str).tolist())
+
     if not token.strip():
         st.error("❌ Token de DataBursatil no configurado.")
         st.info("Las actualizaciones de precios no funcionarán hasta que configures DATABURSATIL_TOKEN.")
@@ -281,6 +347,92 @@ else:
                 status.update(label=f"❌ Error: {e}", state="error")
                 st.info("Mostrando datos sin actualización reciente.")
 
+    # === Estadísticas intradía (mismas barras de fetch_live_prices, sin nuevas consultas) ===
+    stats_intradia = estadisticas_intradia(df["ticker"].astype(str).str.strip().str.upper().unique())
+    for col in ["vol_intradia", "rango_pct", "dist_vwap_pct", "movs_grandes"]:
+        df[col] = df["ticker"].astype(str).str.strip().str.upper().map(stats_intradia.get(col, {}))
+
+    # === Indicadores técnicos sobre los cierres diarios en caché ===
+    try:
+        cierres_ind = cargar_cierres(df["ticker"].tolist(), df["mercado"].tolist(), actualizar=False)
+        # El estado incremental vive entre reruns: un cierre nuevo es una actualización O(tickers)
+        inc_ind = st.session_state.get("indicadores_inc")
+        if len(cierres_ind) < 2:
+            resumen_ind = pd.DataFrame()
+        else:
+            if (inc_ind is None or inc_ind.tickers != list(cierres_ind.columns)
+                    or inc_ind.fecha not in cierres_ind.index):
+                inc_ind = IndicadoresIncrementales(cierres_ind)
+                st.session_state.indicadores_inc = inc_ind
+            resumen_ind = inc_ind.actualizar_desde(cierres_ind)
+    except Exception as e:
+        print(f"Error calculando indicadores: {e}")
+        cierres_ind = pd.DataFrame()
+        resumen_ind = pd.DataFrame()
+    for col in ["rsi_14", "dist_ma20_pct", "macd_hist", "bb_pct_b"]:
+        df[col] = df["ticker"].map(resumen_ind.get(col, {}))
+
+    # === Noticias del portafolio ya descargadas y su sentimiento por posición (memo por titular) ===
+    feed = st.session_state.setdefault("feed_portafolio", FeedPortafolio())
+    nuevas_feed = feed.actualizar(df["ticker"].astype(str).tolist())
+    df["sentimiento"] = df["ticker"].astype(str).map(sentimiento_por_ticker(feed.noticias))
+
+    # === Fundamentales: lectura en bloque de la caché; los vencidos se refrescan en segundo plano ===
+    simbolos_fund = [REGISTRO.simbolo_yf(t, m) for t, m in zip(df["ticker"].astype(str), df["mercado"])]
+    FUNDAMENTALES.refrescar_en_segundo_plano(simbolos_fund)
+    fundamentales = FUNDAMENTALES.leer(simbolos_fund)
+    df["market_cap"] = pd.to_numeric(fundamentales["market_cap"], errors="coerce").to_numpy() / 1e9
+    df["pe"] = pd.to_numeric(fundamentales["pe"], errors="coerce").to_numpy()
+    df["dividend_yield"] = pd.to_numeric(fundamentales["dividend_yield"], errors="coerce").to_numpy()
+    df["sector"] = [REGISTRO.sector(t) or s for t, s in zip(df["ticker"].astype(str), fundamentales["sector"])]
+
+    # === Señales en vivo: solo las barras nuevas del store desde el último rerun ===
+    costos_ticker = df.groupby(df["ticker"].astype(str).str.strip().str.upper())["costo_promedio"].mean()
+    umbrales_vivo = umbrales_usuario(portfolio_usuario)
+    estaticos = {str(t).strip().upper(): {"rsi_14": v} for t, v in resumen_ind.get("rsi_14", pd.Series(dtype=float)).dropna().items()}
+    # Con un cierre nuevo en caché cambian el cierre previo y la MA20: se reconstruye
+    llave_eval = (costos_ticker.astype(float).to_dict(), cierres_ind.index.max() if len(cierres_ind) else None)
+    evaluador = st.session_state.get("evaluador_streaming")
+    if evaluador is None or st.session_state.get("llave_evaluador") != llave_eval:
+        try:
+            cierres_mxn = cargar_cierres(df["ticker"].tolist(), df["mercado"].tolist(), en_mxn=True, actualizar=False)
+            cierres_mxn.columns = [str(c).strip().upper() for c in cierres_mxn.columns]
+        except Exception as e:
+            print(f"Error cargando cierres para señales en vivo: {e}")
+            cierres_mxn = None
+        evaluador = EvaluadorStreaming(costos_ticker.to_dict(), cierres_mxn, estaticos, umbrales=umbrales_vivo)
+        st.session_state.evaluador_streaming = evaluador
+        st.session_state.llave_evaluador = llave_eval
+    elif evaluador.umbrales != umbrales_vivo or evaluador.estaticos != estaticos:
+        # Umbrales editados o RSI recalculado: sin perder el estado por ticker
+        evaluador.configurar(umbrales_vivo, estaticos)
+    senales_nuevas = evaluador.consumir_store(BAR_STORE)
+    if BAR_STORE.ultima_marca() is not None:
+        # El primer consumo recorre también días previos (calentamiento); solo cuentan las de hoy
+        hoy_barras = BAR_STORE.ultima_marca().date()
+        senales_nuevas = [s for s in senales_nuevas if s["marca"].date() == hoy_barras]
+
+    # === Alertas de precio del usuario (el índice conserva el último precio entre reruns) ===
+    if is_logged_in():
+        portfolio_alertas = portfolio_usuario
+        alertas_usuario = portfolio_alertas.get("alertas", [])
+        # Alertas viejas guardadas como "AMZN": se ligan a la posición "AMZN*" para que tengan precio
+        tenencias_alerta = df["ticker"].astype(str).str.strip().str.upper().unique()
+        for a in alertas_usuario:
+            a["ticker"] = resolver_tenencia(a["ticker"], tenencias_alerta) or a["ticker"]
+        firma_alertas = [(a["id"], a["ticker"], a["precio"], a["condicion"], a.get("rearme")) for a in alertas_usuario]
+        indice = st.session_state.get("indice_alertas")
+        if indice is None or st.session_state.get("firma_alertas") != firma_alertas:
+            indice = IndiceAlertas().cargar_usuario(get_user_id(), alertas_usuario)
+            st.session_state.indice_alertas = indice
+            st.session_state.firma_alertas = firma_alertas
+        precios_alerta = df.groupby(df["ticker"].astype(str).str.strip().str.upper())["precio_mercado"].last()
+        for _, alerta in indice.procesar_precios(precios_alerta.dropna().to_dict()):
+            st.toast(f"🔔 {alerta['ticker']} {alerta['condicion']} ${alerta['precio']:,.2f} MXN (precio ${alerta['precio_disparo']:,.2f})")
+            st.warning(f"🔔 Alerta: {alerta['ticker']} {alerta['condicion']} ${alerta['precio']:,.2f} MXN — precio actual ${alerta['precio_disparo']:,.2f} MXN")
+        if indice.pendientes_guardar:
+            guardar_pendientes(indice, {get_user_id(): {**portfolio_alertas, "alertas": indice.alertas_usuario(get_user_id())}})
+
     # === Clasificación por mercado ===
     #df["mercado"] = df["ticker"].apply(lambda x: "México" if x.endswith(".MX") else "Global")
 
@@ -302,6 +454,36 @@ else:
     with col_d4:
         st.metric("Variación promedio hoy", f"{pct_dia_total:+.2f}%")
 
+    # === Curva intradía del portafolio ===
+    with st.expander("⏱️ Curva intradía del portafolio", expanded=True):
+        por_ticker = df.groupby(df["ticker"].astype(str).str.strip().str.upper())
+        titulos_ticker = por_ticker["titulos"].sum()
+        if st.checkbox("Completar tickers sin DataBursatil con barras de yfinance", key="curva_yf"):
+            # El mercado de la posición decide .MX/MXN para emisoras BMV que no están en tickers.json
+            mercados_ticker = por_ticker["mercado"].first()
+            for t in titulos_ticker.index:
+                if t not in BAR_STORE.tickers():
+                    moneda = REGISTRO.moneda(t, mercados_ticker[t])
+                    bolsa = {"HKD": "HK", "MXN": "BMV", "USD": "US"}[moneda]
+                    barras_yfinance(REGISTRO.simbolo_yf(t, mercados_ticker[t]), ticker=t, moneda=moneda, bolsa=bolsa)
+
+        curva = st.session_state.get("curva_intradia")
+        if curva is None or not curva.titulos.equals(titulos_ticker.astype(float)):
+            curva = CurvaIntradia(titulos_ticker)
+            st.session_state.curva_intradia = curva
+        datos_curva = curva.actualizar_desde_store(BAR_STORE, ahora=pd.Timestamp.now(tz=CDMX_TZ))
+
+        if datos_curva.empty:
+            st.info("Sin barras intradía todavía. Se llenan al actualizar precios desde DataBursatil.")
+        else:
+            fig_curva = go.Figure(go.Scatter(
+                x=datos_curva.index, y=datos_curva["pnl"], mode='lines', name='P&L del día',
+                line=dict(color='#00CC96' if datos_curva["pnl"].iloc[-1] >= 0 else '#EF553B', width=2)
+            ))
+            fig_curva.update_layout(xaxis_title="Hora (CDMX)", yaxis_title="P&L del día ($)",
+                                    margin=dict(l=20, r=20, t=20, b=20), height=300)
+            st.plotly_chart(fig_curva, use_container_width=True)
+
     # === Sidebar: Filtros y noticias ===
     with st.sidebar:
         st.header("🔍 Filtros y Consultas")
@@ -331,7 +513,8 @@ else:
             else:
                 st.info("No hay noticias recientes relevantes.")
             
-            similares = suggest_similar_opportunities(selected_ticker)
+            posiciones = dict(zip(df["ticker"], df["mercado"]))
+            similares = suggest_similar_opportunities(selected_ticker, extra=posiciones)
             if similares:
                 st.markdown("**💡 Alternativas similares:**")
                 for sim in similares:
@@ -375,6 +558,37 @@ else:
     col3.metric("México", f"${resumen_mex['total_valor']:,.0f}", f"{resumen_mex['ganancia_pct']:.1f}%")
     col4.metric("Global", f"${resumen_global['total_valor']:,.0f}", f"{resumen_global['ganancia_pct']:.1f}%")
 
+    # === Atribución precio vs tipo de cambio ===
+    if st.checkbox("💱 Separar P&L en efecto precio y efecto tipo de cambio", key="mostrar_atribucion"):
+        # Solo caché local: separar el P&L no cuesta consultas a yfinance
+        try:
+            monedas_pos = {t: moneda_ticker(t, m) for t, m in zip(df["ticker"], df["mercado"])}
+            fx_hist = cargar_fx(sorted(set(monedas_pos.values()) - {"MXN"}), actualizar=False)
+            cierres_atr = cargar_cierres(df["ticker"].tolist(), df["mercado"].tolist(), en_mxn=False, actualizar=False)
+        except Exception as e:
+            print(f"Error leyendo caché para atribución: {e}")
+            cierres_atr = pd.DataFrame()
+        if len(cierres_atr) < 2:
+            st.info("No hay suficientes cierres en caché para separar el P&L.")
+        else:
+            try:
+                ledger_usuario = Ledger(get_user_id() or "demo").cargar()
+                tabla_atr = atribucion(df, cierres=cierres_atr, fx_hist=fx_hist,
+                                       costos=costos_desde_ledger(ledger_usuario, fx_hist, monedas_pos))
+                resumen_atr = resumen_atribucion(tabla_atr)
+                col_a1, col_a2, col_a3 = st.columns(3)
+                col_a1.metric("Efecto precio (día)", f"${resumen_atr['efecto_precio_dia']:,.0f}")
+                col_a2.metric("Efecto tipo de cambio (día)", f"${resumen_atr['efecto_fx_dia']:,.0f}")
+                col_a3.metric("Término cruzado (día)", f"${resumen_atr['cruzado_dia']:,.0f}")
+                st.dataframe(tabla_atr.style.format({c: "${:,.2f}" for c in tabla_atr.columns if c != "moneda"},
+                                                    na_rep="–"), use_container_width=True)
+                st.caption("Con cierres diarios en caché. El total de posiciones en USD/HKD requiere la bitácora de operaciones.")
+            except Exception as e:
+                st.warning(f"No se pudo calcular la atribución: {e}")
+
+    # === Escenarios what-if ===
+    panel_escenarios(df)
+
     # === Histórico del Portafolio ===
     st.markdown("### 📈 Histórico del Portafolio")
     history_path = "history/portfolio_history.csv"
@@ -455,11 +669,131 @@ else:
             yearly = df_history.groupby('year')['daily_return'].apply(lambda x: (1 + x).prod() - 1) * 100
             st.bar_chart(yearly)
             
+            # Rendimiento sin el efecto de aportaciones y retiros
+            st.markdown("#### Rendimiento ajustado por flujos (TWR vs MWR)")
+            flujos = cargar_flujos(portfolio_usuario)
+            tabla_rend = rendimientos_por_periodo(df_history['portfolio_value'], flujos)
+            st.dataframe(
+                tabla_rend[["twr", "mwr", "tir_anual"]].style.format("{:+.2%}"),
+                use_container_width=True
+            )
+            if flujos.empty:
+                st.caption("Sin aportaciones ni retiros registrados: TWR y MWR coinciden.")
+            
         except Exception as e:
             st.warning(f"Error al cargar histórico: {e}")
     else:
         st.info("📊 Histórico no disponible. Ejecuta el script de histórico para comenzar a trackear.")
 
+    # === Proyección Monte Carlo ===
+    st.markdown("### 🔮 Proyección Monte Carlo")
+    if os.path.exists(history_path):
+        with st.expander("Simular trayectorias futuras del portafolio"):
+            col_mc1, col_mc2 = st.columns(2)
+            n_trayectorias = col_mc1.select_slider(
+                "Trayectorias", options=[10_000, 25_000, 50_000, 100_000], value=10_000
+            )
+            metodo_mc = col_mc2.radio("Método", ["bootstrap", "normal"], horizontal=True)
+
+            def figura_abanico(abanico):
+                fig_mc = go.Figure()
+                for bajo, alto, opacidad in [("p5", "p95", 0.15), ("p25", "p75", 0.3)]:
+                    fig_mc.add_trace(go.Scatter(x=abanico.index, y=abanico[alto], mode='lines',
+                                                line=dict(width=0), showlegend=False))
+                    fig_mc.add_trace(go.Scatter(x=abanico.index, y=abanico[bajo], mode='lines',
+                                                line=dict(width=0), fill='tonexty',
+                                                fillcolor=f'rgba(0, 204, 150, {opacidad})',
+                                                name=f"{bajo}–{alto}"))
+                fig_mc.add_trace(go.Scatter(x=abanico.index, y=abanico["p50"], mode='lines',
+                                            name='Mediana', line=dict(color='#00CC96', width=2)))
+                fig_mc.update_layout(xaxis_title="Años", yaxis_title="Valor ($)",
+                                     margin=dict(l=20, r=20, t=20, b=20), height=400)
+                return fig_mc
+
+            if st.button("▶️ Simular"):
+                grafica_mc = st.empty()
+                avance_mc = st.progress(0.0)
+                for abanico, completadas in proyectar_portafolio(
+                    df, history_path=history_path, progresivo=True,
+                    n_paths=n_trayectorias, metodo=metodo_mc
+                ):
+                    grafica_mc.plotly_chart(figura_abanico(abanico), use_container_width=True)
+                    avance_mc.progress(completadas / n_trayectorias,
+                                       text=f"{completadas:,} de {n_trayectorias:,} trayectorias")
+                st.dataframe(resumen_horizontes(abanico).style.format("${:,.0f}"),
+                             use_container_width=True)
+    else:
+        st.info("La proyección necesita el histórico de retornos diarios.")
+
+    # === Optimización media-varianza ===
+    st.markdown("### 🧮 Frontera eficiente")
+    if st.checkbox("Calcular frontera eficiente con cierres diarios", key="mostrar_frontera"):
+        try:
+            cierres = cierres_portafolio(df)
+            col_o1, col_o2 = st.columns(2)
+            tasa_libre = col_o1.number_input("Tasa libre de riesgo anual (%)", value=10.0, step=0.25) / 100
+            aversion = col_o2.select_slider(
+                "Aversión al riesgo (λ)", options=[0.5, 1, 2, 3, 5, 8, 13, 20, 35, 60, 100], value=5
+            )
+            resultado_opt = frontera_eficiente(cierres, tasa_libre)
+            tabla_pesos = comparar_pesos(df, cierres, aversion=aversion, tasa_libre=tasa_libre)
+
+            fig_front = go.Figure()
+            frontera = resultado_opt["frontera"]
+            fig_front.add_trace(go.Scatter(x=frontera["volatilidad"] * 100, y=frontera["rendimiento"] * 100,
+                                           mode='lines', name='Frontera', line=dict(color='#00CC96')))
+            for nombre, columna in [("Actual", "peso_actual"), ("Mín. varianza", "peso_min_var"),
+                                    ("Máx. Sharpe", "peso_max_sharpe"), (f"λ = {aversion}", "peso_aversion")]:
+                m = metricas_cartera(cierres, tabla_pesos[columna], tasa_libre)
+                fig_front.add_trace(go.Scatter(x=[m["volatilidad"] * 100], y=[m["rendimiento"] * 100],
+                                               mode='markers', name=nombre, marker=dict(size=11)))
+            fig_front.update_layout(xaxis_title="Volatilidad anual (%)", yaxis_title="Rendimiento anual (%)",
+                                    margin=dict(l=20, r=20, t=20, b=20), height=400)
+            st.plotly_chart(fig_front, use_container_width=True)
+            st.dataframe(tabla_pesos.style.format("{:.1%}"), use_container_width=True)
+            st.caption("Estimado con retornos históricos en MXN y covarianza encogida (no es consejo de inversión)")
+        except Exception as e:
+            st.warning(f"No se pudo calcular la frontera eficiente: {e}")
+
+    # === Backtest de políticas de rebalanceo ===
+    st.markdown("### ⏪ Backtest de rebalanceo")
+    if st.checkbox("Comparar políticas de rebalanceo con cierres históricos", key="mostrar_backtest"):
+        try:
+            cierres_bt = cierres_portafolio(df)
+            tipo_pesos = st.radio("Pesos objetivo", ["igual", "actual"], horizontal=True, key="bt_pesos")
+            valor_ticker = df.groupby("ticker")["valor_mercado"].sum()
+            pesos_bt = pesos_objetivo(list(cierres_bt.columns), tipo_pesos,
+                                      (valor_ticker / valor_ticker.sum()).to_dict())
+            # El pool de procesos solo corre si cambian los cierres o los pesos
+            llave_bt = (version_datos(cierres_bt), tipo_pesos, tuple(np.round(pesos_bt, 6)))
+            if st.session_state.get("backtest_llave") != llave_bt:
+                st.session_state.backtest_tabla = backtest_lote(cierres_bt, pesos_bt)
+                st.session_state.backtest_llave = llave_bt
+            tabla_bt = st.session_state.backtest_tabla
+            st.dataframe(
+                tabla_bt.style.format({
+                    "cagr": "{:+.2%}", "volatilidad": "{:.2%}", "sharpe": "{:.2f}",
+                    "max_drawdown": "{:.2%}", "rotacion_anual": "{:.0%}", "banda": "{:.0%}"
+                }, na_rep="–"),
+                use_container_width=True
+            )
+            st.caption(f"{cierres_bt.index[0].date()} → {cierres_bt.index[-1].date()}, costo de 10 pb por operación")
+        except Exception as e:
+            st.warning(f"No se pudo correr el backtest: {e}")
+
+    if st.checkbox("Evidencia histórica de las señales de oportunidad", key="mostrar_evidencia"):
+        if len(cierres_ind) < 30:
+            st.info("No hay suficientes cierres en caché para evaluar las señales.")
+        else:
+            eventos_sen = disparos(cierres_ind, umbrales=umbrales_usuario(portfolio_usuario))
+            tabla_sen = resumen_senales(eventos_sen, cierres_ind)
+            formato_sen = {"disparos": "{:,.0f}", "direccion": "{:+.0f}"}
+            for h in HORIZONTES:
+                formato_sen.update({f"ret_medio_{h}d": "{:+.2%}", f"exceso_{h}d": "{:+.2%}", f"acierto_{h}d": "{:.0%}"})
+            st.dataframe(tabla_sen.style.format(formato_sen, na_rep="–"), use_container_width=True)
+            st.caption(f"{cierres_ind.index[0].date()} → {cierres_ind.index[-1].date()}. Cuenta solo el primer día de cada racha; "
+                       "var_pct_total se aproxima con el retorno de 60 días y las reglas intradía no se evalúan.")
+
     # === Gráfico ===
     st.markdown("### 🥧 Distribución del portafolio")
     fig = px.pie(df, values="valor_mercado", names="ticker", hole=0.4,
@@ -472,8 +806,11 @@ else:
     
     df_display = df_filtered[[
         "ticker", "mercado", "titulos", "costo_promedio", "precio_mercado",
-        "valor_mercado", "ganancia_dia", "var_pct_dia",
-        "ganancia_live", "var_pct_total"
+        "valor_mercado", "ganancia_dia", "var_pct_dia", "sentimiento",
+        "ganancia_live", "var_pct_total",
+        "vol_intradia", "rango_pct", "dist_vwap_pct", "movs_grandes",
+        "rsi_14", "dist_ma20_pct",
+        "sector", "market_cap", "pe", "dividend_yield"
     ]].copy()
 
     def color_ganancia(val):
@@ -495,10 +832,21 @@ else:
             "ganancia_dia": "${:,.2f}",
             "ganancia_live": "${:,.2f}",
             "var_pct_dia": "{:+.2f}%",
-            "var_pct_total": "{:+.2f}%"
-        })
+            "sentimiento": "{:+.2f}",
+            "var_pct_total": "{:+.2f}%",
+            "vol_intradia": "{:.2f}%",
+            "rango_pct": "{:.2f}%",
+            "dist_vwap_pct": "{:+.2f}%",
+            "movs_grandes": "{:.0f}",
+            "rsi_14": "{:.0f}",
+            "dist_ma20_pct": "{:+.2f}%",
+            "market_cap": "{:,.1f} mil M",
+            "pe": "{:.1f}",
+            "dividend_yield": "{:.2f}%"
+        }, na_rep="–")
     )
 
+    st.caption("Capitalización en miles de millones de la moneda de origen; fundamentales de yfinance, actualizados como máximo una vez al día.")
     st.dataframe(styled_df, use_container_width=True)    # === Top 5 ===
     st.divider()
     col_g, col_p = st.columns(2)
@@ -519,13 +867,114 @@ else:
     # === Oportunidades ===
     st.divider()
     st.header("🎯 Oportunidades detectadas")
-    ops = detectar_oportunidades(df_filtered)
-    for op in ops:
-        if "🔻" in op or "📉" in op:
+    umbrales = umbrales_usuario(portfolio_usuario)
+    senales = ordenar_senales(evaluar_reglas(df_filtered, umbrales=umbrales))
+    if senales.empty:
+        st.write("No se detectaron oportunidades o movimientos significativos hoy. Todo en rango normal.")
+    for ticker, regla, valor, tono in zip(senales["ticker"], senales["regla"], senales["valor"], senales["tono"]):
+        op = formatear_senal(ticker, regla, valor)
+        if tono == "negativo":
             st.error(f"⚠️ {op}")
-        elif "🟢" in op or "🚀" in op:
+        elif tono == "positivo":
             st.success(f"✅ {op}")
-        elif "📈" in op:
+        elif tono == "info":
             st.info(f"📊 {op}")
         else:
-            st.write(op)
\ No newline at end of file
+            st.write(op)
+
+    with st.expander(f"📡 Señales en vivo ({len(senales_nuevas)} nuevas)"):
+        st.caption(f"Reglas evaluadas barra por barra; una señal se repite como máximo cada {evaluador.enfriamiento.seconds // 60} min.")
+        en_vivo = senales_a_tabla(reversed(evaluador.senales))
+        if not en_vivo.empty:
+            en_vivo = en_vivo[en_vivo["marca"].map(lambda m: m.date()) == hoy_barras]
+        if en_vivo.empty:
+            st.info("Sin señales nuevas en las barras recibidas.")
+        else:
+            en_vivo["mensaje"] = [formatear_senal(t, r, v) for t, r, v in zip(en_vivo["ticker"], en_vivo["regla"], en_vivo["valor"])]
+            en_vivo["hora"] = en_vivo["marca"].map(lambda m: m.strftime("%H:%M"))
+            st.dataframe(en_vivo[["hora", "ticker", "regla", "severidad", "mensaje"]], use_container_width=True, hide_index=True)
+
+    # === Noticias de todo el portafolio (lo que ya está en caché; se completa en cada rerun) ===
+    with st.expander("📰 Noticias del portafolio"):
+        if not feed.noticias:
+            st.info("Las noticias se están descargando en segundo plano; aparecerán en la próxima actualización.")
+        elif nuevas_feed:
+            st.caption(f"{len(nuevas_feed)} noticias nuevas desde la última actualización")
+        for item in feed.recientes(20):
+            st.markdown(f"**{item['title']}**")
+            caption_parts = [" ".join(f"`{t}`" for t in item["tickers"]), item['publisher']]
+            if item.get('published'):
+                caption_parts.append(item['published'])
+            caption_parts.append(f"[Leer →]({item['link']})")
+            st.caption(" • ".join(caption_parts))
+
+        ARCHIVO.vaciar()
+        busqueda = st.text_input("Buscar en el archivo de noticias", placeholder="Ej: Cemex deuda", key="buscar_noticias")
+        if busqueda:
+            resultados = ARCHIVO.buscar(busqueda)
+            if resultados.empty:
+                st.info("Sin resultados en el archivo local.")
+            else:
+                st.dataframe(resultados, use_container_width=True, hide_index=True,
+                             column_config={"link": st.column_config.LinkColumn("link")})
+    # === Screener del universo BMV/SIC (solo datos en caché) ===
+    with st.expander("🔎 Screener BMV/SIC"):
+        if st.button("Actualizar catálogo y cierres en segundo plano", key="screener_actualizar"):
+            if actualizar_en_segundo_plano(token):
+                st.info("Actualización iniciada; los resultados aparecerán al terminar.")
+            else:
+                st.info("Ya hay una actualización en curso.")
+
+        version_scr = os.path.getmtime(CIERRES_PATH) if os.path.exists(CIERRES_PATH) else None
+        if st.session_state.get("screener_version") != version_scr:
+            st.session_state.screener = Screener.cargar()
+            st.session_state.screener_version = version_scr
+        scr = st.session_state.screener
+
+        if scr.metricas.empty:
+            st.info("Aún no hay cierres del universo en caché.")
+        else:
+            col_s1, col_s2, col_s3 = st.columns(3)
+            with col_s1:
+                orden_scr = st.selectbox("Ordenar por", list(METRICAS), format_func=lambda m: METRICAS[m][0], key="screener_orden")
+                top_scr = st.number_input("Top", min_value=5, max_value=100, value=20, step=5, key="screener_top")
+            with col_s2:
+                mom_min = st.number_input("Momentum 3m mínimo %", value=-100.0, step=5.0, key="screener_mom")
+                vol_max = st.number_input("Volatilidad máxima %", value=200.0, step=5.0, key="screener_vol")
+            with col_s3:
+                dist_max = st.number_input("A lo más % bajo el máximo 52s", value=100.0, step=5.0, key="screener_dist")
+                mercados_scr = st.multiselect("Mercado", ["México", "Global"], default=["México", "Global"], key="screener_mercados")
+            filtros_scr = {"mom_3m": (mom_min, None), "volatilidad": (None, vol_max), "dist_max_52s": (-dist_max, None)}
+            tabla_scr = scr.top(orden_scr, int(top_scr), filtros_scr, mercados_scr)
+            st.dataframe(
+                tabla_scr.style.format({c: "{:+.1f}" for c in METRICAS} | {"precio": "${:,.2f}"}, na_rep="–"),
+                use_container_width=True, hide_index=True
+            )
+            st.caption(f"{len(scr.tickers):,} emisoras en caché; {int(scr.filtrar(filtros_scr, mercados_scr).sum()):,} pasan los filtros.")
+
+    # === Prima de los listados SIC contra su mercado de origen ===
+    with st.expander("🌎 Prima SIC vs mercado de origen"):
+        duales = listados_duales(df["ticker"].astype(str).tolist(), df["mercado"].tolist())
+        if not duales:
+            st.info("No hay posiciones del SIC con precio de origen en otra moneda.")
+        elif st.checkbox("Comparar el precio BMV contra origen × tipo de cambio", key="mostrar_primas"):
+            historico_primas = serie_primas(duales)
+            tabla_primas = monitor_primas(duales, BAR_STORE, historico=historico_primas)
+            tabla_primas["marca_bmv"] = formatear_marcas(tabla_primas["marca_bmv"])
+            st.dataframe(
+                tabla_primas.style.format({
+                    "precio_bmv": "${:,.2f}", "precio_origen": "{:,.2f}", "fx": "{:.4f}", "precio_teorico": "${:,.2f}",
+                    "prima_pct": "{:+.2f}%", "z": "{:+.1f}", "retraso_min": "{:.0f}"
+                }, na_rep="–"),
+                use_container_width=True, hide_index=True
+            )
+            revisar = tabla_primas[tabla_primas["estado"].isin(["vieja", "atípica"])]
+            if not revisar.empty:
+                st.warning("Revisar cotización: " + ", ".join(f"{t} ({e})" for t, e in zip(revisar["ticker"], revisar["estado"])))
+            if historico_primas.empty:
+                st.caption("Sin cierres BMV en caché para la serie histórica.")
+                if st.button("Descargar cierres BMV de estas posiciones", key="primas_descargar"):
+                    actualizar_en_segundo_plano(token, list(duales))
+            else:
+                st.line_chart(historico_primas)
+                st.caption("Prima diaria % con cierres en caché (BMV vs origen × FX del día).")
@@ -0,0 +1,94 @@
+"""
+Escenarios what-if: choques vectorizados sobre las posiciones actuales
+"""
+import numpy as np
+import pandas as pd
+
+from price_history import moneda_ticker
+from ticker_registry import REGISTRO
+
+# Ventanas históricas para repetir sobre el portafolio actual (cierres en MXN)
+CRISIS = {
+    "Elección EE.UU. 2016": ("2016-11-08", "2016-11-11"),
+    "COVID-19 2020": ("2020-02-19", "2020-03-23"),
+    "Alza de tasas 2022": ("2022-01-03", "2022-10-12"),
+}
+
+
+def monedas_posiciones(df):
+    """Moneda económica de cada posición (un SIC en MXN sigue expuesto al USD)."""
+    return np.array([moneda_ticker(t, m) for t, m in zip(df["ticker"], df["mercado"])])
+
+
+def choque_fx(df, moneda, pct):
+    """Vector de choque (retorno) por posición para un movimiento de la moneda contra el MXN."""
+    return np.where(monedas_posiciones(df) == moneda, pct / 100, 0.0)
+
+
+def choque_mercado(df, mercado, pct):
+    return np.where(df["mercado"].to_numpy() == mercado, pct / 100, 0.0)
+
+
+def sectores_posiciones(df):
+    """Sector de cada posición: la columna del df si existe, si no el registro de tickers."""
+    if "sector" in df.columns:
+        return df["sector"].to_numpy()
+    return np.array([REGISTRO.sector(t) for t in df["ticker"]], dtype=object)
+
+
+def choque_sector(df, sector, pct):
+    return np.where(sectores_posiciones(df) == sector, pct / 100, 0.0)
+
+
+def choque_historico(df, cierres, inicio, fin):
+    """
+    Retorno de cada posición en la ventana [inicio, fin] según los cierres en MXN
+    de la caché. Tickers sin datos en la ventana reciben el promedio de los demás.
+    """
+    ventana = cierres.ffill().loc[inicio:fin]
+    if len(ventana) < 2:
+        return np.full(len(df), np.nan)
+    retornos = (ventana.iloc[-1] / ventana.iloc[0] - 1).reindex(df["ticker"]).to_numpy(dtype=float)
+    promedio = np.nanmean(retornos) if np.isfinite(retornos).any() else 0.0
+    return np.where(np.isfinite(retornos), retornos, promedio)
+
+
+def componer(*choques):
+    """Combina choques multiplicativamente: (1+a)(1+b) − 1."""
+    total = np.ones_like(np.asarray(choques[0], dtype=float))
+    for c in choques:
+        total = total * (1 + np.asarray(c, dtype=float))
+    return total - 1
+
+
+def evaluar_escenarios(df, escenarios):
+    """
+    Reevalúa valor_mercado y ganancia_live para todos los escenarios en una sola
+    operación: matriz de choques K × n contra el vector de valores actuales.
+    escenarios: {nombre: vector de choques por posición}
+    """
+    nombres = list(escenarios)
+    S = np.vstack([np.asarray(escenarios[n], dtype=float) for n in nombres])  # K × n
+    valor = df["valor_mercado"].to_numpy(dtype=float)
+    costo = (df["costo_promedio"] * df["titulos"]).to_numpy(dtype=float)
+
+    nuevos = valor * (1 + S)  # K × n
+    valor_total = nuevos.sum(axis=1)
+    return pd.DataFrame({
+        "valor_mercado": valor_total,
+        "cambio": valor_total - valor.sum(),
+        "cambio_pct": (valor_total / valor.sum() - 1) * 100 if valor.sum() > 0 else 0.0,
+        "ganancia_live": valor_total - costo.sum(),
+    }, index=pd.Index(nombres, name="escenario"))
+
+
+def valores_por_posicion(df, choque):
+    """Detalle por posición de un escenario (para la tabla del panel)."""
+    valor = df["valor_mercado"].to_numpy(dtype=float)
+    nuevo = valor * (1 + np.asarray(choque, dtype=float))
+    return pd.DataFrame({
+        "ticker": df["ticker"].to_numpy(),
+        "valor_mercado": nuevo,
+        "cambio": nuevo - valor,
+        "ganancia_live": nuevo - (df["costo_promedio"] * df["titulos"]).to_numpy(dtype=float),
+    })
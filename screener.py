@@ -0,0 +1,317 @@
+"""
+Screener del universo BMV/SIC: catálogo local de emisoras (DataBursatil
+/v2/emisoras), cierres diarios en caché y filtros vectorizados sin consultas
+en vivo por búsqueda
+"""
+import heapq
+import json
+import os
+import string
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import requests
+
+CATALOGO_PATH = "history/emisoras.json"
+CIERRES_PATH = "history/screener.npz"
+URL_EMISORAS = "https://api.databursatil.com/v2/emisoras"
+URL_HISTORICOS = "https://api.databursatil.com/v2/historicos"
+MERCADOS = ("local", "global")
+LETRAS = string.ascii_uppercase + string.digits
+TTL_CATALOGO_DIAS = 7
+LETRAS_POR_ACTUALIZACION = 6   # El catálogo se renueva por partes, no todo a la vez
+DIAS_HISTORIA = 400            # Alcanza para 52 semanas y momentum de 6 meses
+TRABAJADORES = 8
+
+# Métrica → (descripción, mayor es mejor)
+METRICAS = {
+    "mom_1m": ("Momentum 1 mes %", True),
+    "mom_3m": ("Momentum 3 meses %", True),
+    "mom_6m": ("Momentum 6 meses %", True),
+    "drawdown": ("Caída desde máximo 52s %", True),      # Negativa: cerca de 0 es mejor
+    "volatilidad": ("Volatilidad anual %", False),
+    "dist_max_52s": ("Distancia al máximo 52s %", True),  # Negativa: cerca de 0 es mejor
+    "dist_min_52s": ("Distancia al mínimo 52s %", True),
+}
+
+
+# ── Catálogo ─────────────────────────────────────────────────────────────
+
+def _leer_catalogo(path=CATALOGO_PATH):
+    if not os.path.exists(path):
+        return {"emisoras": {}, "letras": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _guardar_catalogo(catalogo, path=CATALOGO_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporal = f"{path}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(catalogo, f, ensure_ascii=False)
+    os.replace(temporal, path)
+
+
+def _claves_catalogo():
+    return [f"{m}:{l}" for m in MERCADOS for l in LETRAS]
+
+
+def catalogo_emisoras(path=CATALOGO_PATH):
+    """{ticker: meta} del catálogo en caché (vacío si aún no se descarga)."""
+    return _leer_catalogo(path)["emisoras"]
+
+
+def catalogo_completo(path=CATALOGO_PATH):
+    """True si todas las letras de ambos mercados se han descargado al menos una vez."""
+    letras = _leer_catalogo(path)["letras"]
+    return all(c in letras for c in _claves_catalogo())
+
+
+def _aplanar(respuesta, mercado):
+    """{emisora: {serie: meta}} → {emisora+serie: meta} solo con las activas."""
+    emisoras = {}
+    for emisora, series in (respuesta or {}).items():
+        for serie, meta in (series or {}).items():
+            if (meta or {}).get("estatus") != "ACTIVA":
+                continue
+            emisoras[f"{emisora}{serie}"] = {
+                "razon_social": meta.get("razon_social"),
+                "bolsa": meta.get("bolsa"),
+                "tipo": meta.get("tipo_valor_descripcion"),
+                "mercado": "México" if mercado == "local" else "Global",
+            }
+    return emisoras
+
+
+def actualizar_catalogo(token, path=CATALOGO_PATH, max_letras=LETRAS_POR_ACTUALIZACION):
+    """
+    Descarga todas las letras que nunca se han bajado y, de las vencidas, solo
+    las `max_letras` más viejas; una consulta por letra y mercado. Devuelve el
+    catálogo completo {ticker: meta}.
+    """
+    catalogo = _leer_catalogo(path)
+    limite = time.time() - TTL_CATALOGO_DIAS * 86400
+    faltantes = [c for c in _claves_catalogo() if c not in catalogo["letras"]]
+    vencidas = sorted((t, c) for c, t in catalogo["letras"].items() if t < limite)
+    pendientes = faltantes + [c for _, c in vencidas[:max_letras]]
+    if not pendientes or not token:
+        return catalogo["emisoras"]
+
+    for clave in pendientes:
+        mercado, letra = clave.split(":")
+        try:
+            resp = requests.get(URL_EMISORAS, params={"token": token, "letra": letra, "mercado": mercado}, timeout=15)
+            resp.raise_for_status()
+            nuevas = _aplanar(resp.json(), mercado)
+        except Exception as e:
+            print(f"Error descargando emisoras {mercado}/{letra}: {e}")
+            continue
+        # Reemplaza lo que había bajo esa letra (bajas incluidas)
+        catalogo["emisoras"] = {
+            t: meta for t, meta in catalogo["emisoras"].items()
+            if not (t.startswith(letra) and meta["mercado"] == ("México" if mercado == "local" else "Global"))
+        }
+        catalogo["emisoras"].update(nuevas)
+        catalogo["letras"][clave] = time.time()
+
+    _guardar_catalogo(catalogo, path)
+    return catalogo["emisoras"]
+
+
+# ── Cierres diarios ──────────────────────────────────────────────────────
+
+def _cierre(valor):
+    """El API devuelve el cierre solo o como primer elemento de una lista/dict."""
+    if isinstance(valor, (list, tuple)):
+        valor = valor[0] if valor else None
+    elif isinstance(valor, dict):
+        valor = valor.get("cierre", valor.get("close"))
+    return float(valor) if valor is not None else np.nan
+
+
+def _descargar_historicos(token, ticker, inicio, final):
+    try:
+        resp = requests.get(URL_HISTORICOS, params={
+            "token": token, "emisora_serie": ticker, "inicio": inicio, "final": final,
+        }, timeout=15)
+        resp.raise_for_status()
+        data = resp.json()
+    except Exception as e:
+        print(f"Error descargando históricos de {ticker}: {e}")
+        return pd.Series(dtype=float, name=ticker)
+    if isinstance(data, dict) and isinstance(data.get(ticker), dict):
+        data = data[ticker]
+    if not isinstance(data, dict):
+        return pd.Series(dtype=float, name=ticker)
+    serie = pd.Series({pd.Timestamp(f).normalize(): _cierre(v) for f, v in data.items()}, name=ticker)
+    return serie.sort_index().dropna()
+
+
+def _leer_cierres(path=CIERRES_PATH):
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    datos = np.load(path, allow_pickle=False)
+    return pd.DataFrame(
+        datos["cierres"], index=pd.to_datetime(datos["fechas"]), columns=[str(t) for t in datos["tickers"]]
+    )
+
+
+def cierres_en_cache(path=CIERRES_PATH):
+    """Matriz fecha × ticker de cierres BMV/SIC guardada por actualizar_cierres."""
+    return _leer_cierres(path)
+
+
+def _guardar_cierres(cierres, path=CIERRES_PATH):
+    # Temporal + os.replace: un lector nunca ve el .npz a medio escribir
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporal = f"{path}.tmp"
+    with open(temporal, "wb") as f:
+        np.savez_compressed(
+            f, cierres=cierres.to_numpy(dtype=float), tickers=np.array(list(cierres.columns)),
+            fechas=np.array(cierres.index.strftime("%Y-%m-%d"), dtype=str),
+        )
+    os.replace(temporal, path)
+
+
+def actualizar_cierres(token, tickers, path=CIERRES_PATH, trabajadores=TRABAJADORES):
+    """
+    Trae solo los días que faltan desde el último cierre guardado (la ventana
+    completa para tickers nuevos), en paralelo, y guarda la matriz fecha × ticker.
+    """
+    cierres = _leer_cierres(path)
+    hoy = date.today()
+    final = hoy.strftime("%Y-%m-%d")
+    inicio_nuevos = (hoy - timedelta(days=DIAS_HISTORIA)).strftime("%Y-%m-%d")
+
+    tareas = []
+    for t in tickers:
+        ultima = cierres[t].last_valid_index() if t in cierres.columns else None
+        if ultima is not None and ultima.date() >= hoy:
+            continue
+        inicio = (ultima + timedelta(days=1)).strftime("%Y-%m-%d") if ultima is not None else inicio_nuevos
+        tareas.append((t, inicio))
+    if not tareas:
+        return cierres
+
+    with ThreadPoolExecutor(max_workers=trabajadores) as pool:
+        series = list(pool.map(lambda a: _descargar_historicos(token, a[0], a[1], final), tareas))
+
+    nuevas = pd.DataFrame({s.name: s for s in series if not s.empty})
+    if not nuevas.empty:
+        cierres = nuevas.combine_first(cierres) if not cierres.empty else nuevas
+        corte = pd.Timestamp(hoy - timedelta(days=DIAS_HISTORIA))
+        cierres = cierres[cierres.index >= corte].sort_index()
+        _guardar_cierres(cierres, path)
+    return cierres
+
+
+_ACTUALIZACION = {"hilo": None}
+
+
+def actualizar_en_segundo_plano(token, tickers=None):
+    """
+    Catálogo + cierres del universo en un hilo; no bloquea la app. Con
+    `tickers` solo se ponen al día los cierres de esos tickers.
+    """
+    hilo = _ACTUALIZACION["hilo"]
+    if hilo is not None and hilo.is_alive():
+        return False
+
+    def tarea():
+        lista = list(tickers) if tickers is not None else list(actualizar_catalogo(token))
+        actualizar_cierres(token, lista)
+
+    _ACTUALIZACION["hilo"] = threading.Thread(target=tarea, daemon=True)
+    _ACTUALIZACION["hilo"].start()
+    return True
+
+
+# ── Screener ─────────────────────────────────────────────────────────────
+
+def calcular_metricas(cierres):
+    """
+    Métricas por ticker sobre toda la matriz a la vez (columnas = tickers).
+    Los huecos se rellenan hacia adelante; tickers sin datos quedan en NaN.
+    """
+    precios = cierres.ffill().to_numpy(dtype=float)
+    n = len(precios)
+    ultimo = precios[-1] if n else np.full(cierres.shape[1], np.nan)
+
+    def momentum(dias):
+        if n <= dias:
+            return np.full_like(ultimo, np.nan)
+        return (ultimo / precios[-dias - 1] - 1) * 100
+
+    ventana = precios[-252:]
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # Columnas todo NaN
+        maximo = np.nanmax(ventana, axis=0)
+        minimo = np.nanmin(ventana, axis=0)
+        log_ret = np.diff(np.log(precios[-64:]), axis=0)
+        volatilidad = np.nanstd(log_ret, axis=0, ddof=1) * np.sqrt(252) * 100
+        pico = np.fmax.accumulate(np.where(np.isnan(ventana), -np.inf, ventana), axis=0)
+        drawdown = np.nanmin(ventana / pico - 1, axis=0) * 100
+
+    return pd.DataFrame({
+        "precio": ultimo,
+        "mom_1m": momentum(21),
+        "mom_3m": momentum(63),
+        "mom_6m": momentum(126),
+        "drawdown": drawdown,
+        "volatilidad": volatilidad,
+        "dist_max_52s": (ultimo / maximo - 1) * 100,
+        "dist_min_52s": (ultimo / minimo - 1) * 100,
+    }, index=cierres.columns)
+
+
+class Screener:
+    """
+    Las métricas se calculan una vez al cargar (o cuando cambian los cierres);
+    cada búsqueda es un AND de máscaras numpy y un top-k con heap.
+    """
+
+    def __init__(self, cierres, catalogo=None):
+        self.catalogo = catalogo or {}
+        self.metricas = calcular_metricas(cierres)
+        self.tickers = self.metricas.index.to_numpy()
+        self._columnas = {c: self.metricas[c].to_numpy() for c in self.metricas.columns}
+        self._mercado = np.array([self.catalogo.get(t, {}).get("mercado", "") for t in self.tickers])
+
+    @classmethod
+    def cargar(cls, cierres_path=CIERRES_PATH, catalogo_path=CATALOGO_PATH):
+        return cls(_leer_cierres(cierres_path), catalogo_emisoras(catalogo_path))
+
+    def filtrar(self, filtros=None, mercados=None):
+        """
+        filtros: {métrica: (mínimo, máximo)} con None para no acotar.
+        Devuelve la máscara booleana sobre el universo.
+        """
+        mascara = np.isfinite(self._columnas["precio"])
+        for metrica, (minimo, maximo) in (filtros or {}).items():
+            valores = self._columnas[metrica]
+            mascara &= np.isfinite(valores)
+            if minimo is not None:
+                mascara &= valores >= minimo
+            if maximo is not None:
+                mascara &= valores <= maximo
+        if mercados:
+            mascara &= np.isin(self._mercado, list(mercados))
+        return mascara
+
+    def top(self, por="mom_3m", k=20, filtros=None, mercados=None, ascendente=None):
+        """Los k mejores por una métrica entre los que pasan los filtros."""
+        if ascendente is None:
+            ascendente = not METRICAS[por][1]
+        indices = np.flatnonzero(self.filtrar(filtros, mercados))
+        valores = self._columnas[por]
+        elegir = heapq.nsmallest if ascendente else heapq.nlargest
+        mejores = elegir(k, indices, key=valores.__getitem__)
+        tabla = self.metricas.iloc[mejores].copy()
+        tabla.insert(0, "nombre", [self.catalogo.get(t, {}).get("razon_social") for t in tabla.index])
+        tabla.insert(1, "mercado", self._mercado[mejores])
+        return tabla.rename_axis("ticker").reset_index()
@@ -0,0 +1,175 @@
+"""
+Sentimiento de titulares (español e inglés) con léxico local y memo por hash
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+ARCHIVO_SENTIMIENTO = "history/sentiment.db"
+VERSION_LEXICO = 2      # Subir al cambiar el léxico para invalidar el memo
+VIDA_MEDIA_HORAS = 48   # Peso de cada noticia en el agregado por posición
+
+# Raíces sin acentos → polaridad. Se comparan por prefijo ("recuper" cubre recupera/recuperacion),
+# así que solo van raíces largas que no sean el inicio de palabras ajenas
+RAICES = {
+    # Español positivo
+    "subida": 0.6, "subieron": 0.6, "dispar": 0.7, "ganancia": 0.7, "utilidad": 0.5, "record": 0.6,
+    "crece": 0.6, "crecio": 0.6, "crecimiento": 0.6, "repunt": 0.7, "recuper": 0.6, "mejor": 0.5,
+    "supera": 0.7, "avanz": 0.5, "optimis": 0.6, "impuls": 0.5, "fortalec": 0.5, "expans": 0.4,
+    "benefici": 0.5, "dividend": 0.4, "aprob": 0.4, "acuerdo": 0.3, "lider": 0.3, "rebot": 0.5,
+    "maximo": 0.5, "mejora": 0.6, "solido": 0.4, "solida": 0.4, "compra": 0.2, "invers": 0.2,
+    # Español negativo
+    "caida": -0.7, "cayeron": -0.7, "bajar": -0.5, "desplom": -0.9, "perdida": -0.7, "pierd": -0.6,
+    "deuda": -0.4, "quiebra": -1.0, "crisis": -0.8, "multa": -0.6, "recort": -0.5, "despid": -0.6,
+    "riesgo": -0.4, "incertidumbre": -0.5, "debil": -0.5, "rebaj": -0.5, "retroced": -0.5, "hundi": -0.8,
+    "hunde": -0.8, "fraude": -1.0, "investigacion": -0.4, "sancion": -0.6, "minimo": -0.5, "temor": -0.6,
+    "alerta": -0.4, "golpe": -0.6, "frena": -0.4, "arancel": -0.4, "recesion": -0.8, "volatil": -0.3,
+    "advierte": -0.4,
+    # Inglés positivo
+    "soared": 0.8, "soaring": 0.8, "surged": 0.7, "surging": 0.7, "rallied": 0.6, "rallies": 0.6,
+    "gained": 0.6, "jumped": 0.6, "rising": 0.5, "profit": 0.6, "upgrad": 0.7, "strong": 0.5,
+    "growth": 0.5, "bullish": 0.7, "outperform": 0.6, "boost": 0.5, "approv": 0.4,
+    # Inglés negativo
+    "falling": -0.6, "fallen": -0.6, "dropped": -0.6, "dropping": -0.6, "plung": -0.9, "slump": -0.8,
+    "losses": -0.7, "missed": -0.6, "misses": -0.6, "downgrad": -0.7, "weaker": -0.5, "weaken": -0.5,
+    "bearish": -0.7, "lawsuit": -0.6, "bankrupt": -1.0, "layoff": -0.6, "cutting": -0.4, "warned": -0.5,
+    "warning": -0.5, "feared": -0.6, "fraud": -1.0, "decline": -0.5, "tumbl": -0.8, "crash": -0.9,
+    "tariff": -0.4, "recession": -0.8,
+}
+# Palabras cortas que como prefijo darían falsos positivos ("miss" → mission, "gana" → ganado):
+# solo cuentan completas y con sus inflexiones listadas
+PALABRAS = {
+    # Español
+    "sube": 0.6, "suben": 0.6, "subio": 0.6, "alza": 0.7, "alzas": 0.7, "gana": 0.6, "ganan": 0.6,
+    "gano": 0.6, "ganaron": 0.6, "crecen": 0.6,
+    "cae": -0.7, "caen": -0.7, "cayo": -0.7, "caidas": -0.7, "baja": -0.5, "bajan": -0.5, "bajas": -0.5,
+    # Inglés
+    "soar": 0.8, "soars": 0.8, "surge": 0.7, "surges": 0.7, "rally": 0.6, "gain": 0.6, "gains": 0.6,
+    "jump": 0.6, "jumps": 0.6, "beat": 0.7, "beats": 0.7, "rise": 0.5, "rises": 0.5, "rose": 0.5,
+    "risen": 0.5, "wins": 0.5, "profits": 0.6,
+    "fall": -0.6, "falls": -0.6, "fell": -0.6, "drop": -0.6, "drops": -0.6, "loss": -0.7, "miss": -0.6,
+    "weak": -0.5, "sues": -0.5, "sued": -0.5, "cut": -0.4, "cuts": -0.4, "warn": -0.5, "warns": -0.5,
+    "fear": -0.6, "fears": -0.6, "debt": -0.4, "debts": -0.4,
+}
+NEGADORES = {"no", "not", "sin", "nunca", "never", "without", "ni"}
+_RAICES = sorted(RAICES, key=len, reverse=True)
+_PATRON = re.compile("|".join(re.escape(r) for r in _RAICES))
+
+
+def _tokens(texto):
+    # Titulares de Google News: se descarta el " - Medio" final
+    texto = re.sub(r"\s+-\s+[^-]+$", "", texto or "")
+    texto = unicodedata.normalize("NFKD", texto.lower()).encode("ascii", "ignore").decode()
+    return re.findall(r"[a-z]+", texto)
+
+
+def clave_sentimiento(texto):
+    """
+    Llave del memo: md5 de todos los tokens en orden. No se usa hash_titular
+    porque descarta las palabras cortas ("no", "ni") y el orden, que cambian la polaridad.
+    """
+    return hashlib.md5(" ".join(_tokens(texto)).encode()).hexdigest()
+
+
+def _clave(noticia):
+    # FeedPortafolio guarda la llave al incorporar la noticia: no se re-tokeniza en cada rerun
+    return noticia.get("clave_sentimiento") or clave_sentimiento(noticia["title"])
+
+
+def puntuar(texto):
+    """
+    Polaridad en [-1, 1]: promedio de las palabras del léxico. Un negador
+    invierte la siguiente palabra del léxico dentro de las 3 posteriores.
+    """
+    total, n, negar = 0.0, 0, 0
+    for palabra in _tokens(texto):
+        if palabra in NEGADORES:
+            negar = 3
+            continue
+        valor = PALABRAS.get(palabra)
+        if valor is None:
+            m = _PATRON.match(palabra)
+            valor = RAICES[m.group(0)] if m else None
+        if valor is not None:
+            total += -valor if negar else valor
+            n += 1
+            negar = 0
+        elif negar:
+            negar -= 1
+    return max(-1.0, min(1.0, total / n)) if n else 0.0
+
+
+class MemoSentimiento:
+    """
+    Puntuaciones por hash de titular en memoria y en SQLite, para que la misma
+    nota no se vuelva a puntuar entre reruns ni entre sesiones.
+    """
+
+    def __init__(self, path=ARCHIVO_SENTIMIENTO):
+        self.path = path
+        self._memo = {}
+        self._cargado = False
+        self._lock = threading.Lock()
+
+    def _conectar(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        con = sqlite3.connect(self.path)
+        con.execute("CREATE TABLE IF NOT EXISTS sentimiento (hash TEXT PRIMARY KEY, puntaje REAL, version INTEGER)")
+        return con
+
+    def _cargar(self):
+        try:
+            with self._conectar() as con:
+                filas = con.execute("SELECT hash, puntaje FROM sentimiento WHERE version = ?", (VERSION_LEXICO,))
+                self._memo.update(dict(filas.fetchall()))
+        except sqlite3.Error as e:
+            print(f"Error cargando memo de sentimiento: {e}")
+        self._cargado = True
+
+    def puntuar_lote(self, noticias):
+        """
+        {clave: puntaje} para una lista de noticias (dicts con "title" y
+        opcionalmente "clave_sentimiento"). Solo se puntúan las claves nuevas y
+        se guardan en una transacción.
+        """
+        with self._lock:
+            if not self._cargado:
+                self._cargar()
+            hashes = [_clave(n) for n in noticias]
+            nuevas = {h: puntuar(n["title"]) for h, n in zip(hashes, noticias) if h not in self._memo}
+            if nuevas:
+                self._memo.update(nuevas)
+                try:
+                    with self._conectar() as con:
+                        con.executemany("INSERT OR REPLACE INTO sentimiento VALUES (?, ?, ?)",
+                                        [(h, p, VERSION_LEXICO) for h, p in nuevas.items()])
+                except sqlite3.Error as e:
+                    print(f"Error guardando memo de sentimiento: {e}")
+            return {h: self._memo[h] for h in hashes}
+
+
+MEMO = MemoSentimiento()
+
+
+def sentimiento_por_ticker(noticias, memo=MEMO, ahora=None, vida_media_horas=VIDA_MEDIA_HORAS):
+    """
+    Promedio del sentimiento por posición, ponderado por recencia (vida media
+    en horas). noticias: items de FeedPortafolio (con "title", "tickers" y "timestamp").
+    """
+    if not noticias:
+        return {}
+    puntajes = memo.puntuar_lote(noticias)
+    ahora = ahora or time.time()
+    suma, pesos = {}, {}
+    for n in noticias:
+        edad_horas = max(ahora - (n.get("timestamp") or ahora), 0) / 3600
+        peso = 0.5 ** (edad_horas / vida_media_horas)
+        p = puntajes[_clave(n)]
+        for t in n.get("tickers", []):
+            suma[t] = suma.get(t, 0.0) + peso * p
+            pesos[t] = pesos.get(t, 0.0) + peso
+    return {t: suma[t] / pesos[t] for t in suma if pesos[t] > 0}
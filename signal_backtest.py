@@ -0,0 +1,134 @@
+"""
+Evidencia histórica de las señales: reproduce las reglas sobre cierres en
+caché y mide retornos posteriores y tasa de acierto por regla
+"""
+import numpy as np
+import pandas as pd
+
+from indicators import rsi, macd, bollinger
+from opportunities import REGLAS, UMBRALES, COMPARADORES
+
+HORIZONTES = (1, 5, 20)
+
+# Reglas de indicators.detect_opportunities con el mismo formato declarativo
+REGLAS_INDICADORES = [
+    {"id": "ind_caida_fuerte", "severidad": 2, "tono": "negativo", "direccion": 1,
+     "condiciones": [("var_pct_dia", "<", -3.0)],
+     "mensaje": "{ticker}: caída fuerte ({valor:.2f}%)"},
+    {"id": "ind_debajo_ma20", "severidad": 1, "tono": "negativo", "direccion": 1,
+     "condiciones": [("dist_ma20_pct", "<", 0.0)],
+     "mensaje": "{ticker}: debajo de MA20"},
+]
+
+
+def panel_columnas(cierres, dias_compra=60):
+    """
+    Columnas de las reglas como matrices fecha × ticker. Sin historial de
+    compras, var_pct_total se aproxima con el retorno desde hace `dias_compra`
+    barras (una compra hipotética en esa fecha). Las columnas intradía no se
+    pueden reconstruir con cierres y quedan fuera.
+    """
+    cierres = cierres.ffill()
+    media, superior, inferior = bollinger(cierres)
+    _, _, hist = macd(cierres)
+    ancho = (superior - inferior).replace(0, np.nan)
+    return {
+        "var_pct_dia": cierres.pct_change(fill_method=None) * 100,
+        "var_pct_total": (cierres / cierres.shift(dias_compra) - 1) * 100,
+        "dist_ma20_pct": (cierres / media - 1) * 100,
+        "rsi_14": rsi(cierres),
+        "macd_hist": hist,
+        "bb_pct_b": (cierres - inferior) / ancho,
+    }
+
+
+def retornos_futuros(cierres, horizontes=HORIZONTES):
+    """{h: matriz del retorno de t a t+h}; NaN donde no hay h barras por delante."""
+    P = cierres.ffill().to_numpy(dtype=float)
+    futuros = {}
+    for h in horizontes:
+        F = np.full_like(P, np.nan)
+        if h < len(P):
+            F[:-h] = P[h:] / P[:-h] - 1
+        futuros[h] = F
+    return futuros
+
+
+def disparos(cierres, reglas=None, umbrales=None, dias_compra=60, horizontes=HORIZONTES,
+             solo_entradas=True):
+    """
+    Todas las veces que cada regla se activa sobre el universo completo,
+    evaluando cada regla como una máscara fecha × ticker. Con solo_entradas
+    cuenta el primer día de cada racha (como las transiciones del streaming).
+    Regresa una fila por disparo con fecha, ticker, regla, valor y ret_{h}d.
+    """
+    reglas = reglas if reglas is not None else REGLAS + REGLAS_INDICADORES
+    umbrales = umbrales or UMBRALES
+    panel = {c: m.to_numpy(dtype=float) for c, m in panel_columnas(cierres, dias_compra).items()}
+    futuros = retornos_futuros(cierres, horizontes)
+    fechas, tickers = cierres.index, np.asarray(cierres.columns)
+
+    partes = []
+    with np.errstate(invalid="ignore"):
+        for regla in reglas:
+            condiciones = regla["condiciones"]
+            if not all(c in panel for c, _, _ in condiciones):
+                continue
+            mask = np.ones(next(iter(panel.values())).shape, dtype=bool)
+            for columna, comparador, umbral in condiciones:
+                u = umbrales[umbral] if isinstance(umbral, str) else umbral
+                mask &= COMPARADORES[comparador](panel[columna], u)
+            if solo_entradas:
+                mask[1:] &= ~mask[:-1]
+            t, j = np.nonzero(mask)
+            if not t.size:
+                continue
+            parte = {
+                "fecha": fechas[t],
+                "ticker": tickers[j],
+                "regla": regla["id"],
+                "direccion": regla.get("direccion", 0),
+                "valor": panel[condiciones[0][0]][t, j],
+            }
+            for h in horizontes:
+                parte[f"ret_{h}d"] = futuros[h][t, j]
+            partes.append(pd.DataFrame(parte))
+
+    columnas = ["fecha", "ticker", "regla", "direccion", "valor"] + [f"ret_{h}d" for h in horizontes]
+    if not partes:
+        return pd.DataFrame(columns=columnas)
+    return pd.concat(partes, ignore_index=True)[columnas]
+
+
+def resumen_senales(eventos, cierres, horizontes=HORIZONTES):
+    """
+    Por regla: número de disparos, retorno promedio a cada horizonte, su exceso
+    sobre el retorno promedio incondicional del universo y la tasa de acierto
+    (fracción de disparos donde el retorno va en la `direccion` de la regla;
+    NaN para reglas sin dirección).
+    """
+    futuros = retornos_futuros(cierres, horizontes)
+    base = {h: np.nanmean(futuros[h]) for h in horizontes}
+
+    if eventos.empty:
+        return pd.DataFrame()
+    grupos = eventos.groupby("regla", sort=False)
+    tabla = pd.DataFrame({"disparos": grupos.size(), "direccion": grupos["direccion"].first()})
+    for h in horizontes:
+        col = f"ret_{h}d"
+        validos = eventos[col].notna()
+        signo = np.sign(eventos[col]) * eventos["direccion"]
+        acierto = (signo > 0).where(validos & (eventos["direccion"] != 0))
+        tabla[f"ret_medio_{h}d"] = grupos[col].mean()
+        tabla[f"exceso_{h}d"] = tabla[f"ret_medio_{h}d"] - base[h]
+        tabla[f"acierto_{h}d"] = acierto.groupby(eventos["regla"]).mean()
+    return tabla.sort_values("disparos", ascending=False)
+
+
+def evaluar_universo(tickers, mercados, actualizar=False, **kwargs):
+    """Carga los cierres (moneda local) de la caché y regresa (eventos, resumen)."""
+    from price_history import cargar_cierres
+
+    cierres = cargar_cierres(tickers, mercados, en_mxn=False, actualizar=actualizar)
+    eventos = disparos(cierres, **kwargs)
+    return eventos, resumen_senales(eventos, cierres, kwargs.get("horizontes", HORIZONTES))
@@ -0,0 +1,194 @@
+"""
+Tickers similares por correlación de retornos diarios y sector, con índice
+de vecinos más cercanos precalculado y actualizado día a día
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from ticker_registry import REGISTRO
+
+INDICE_PATH = "history/similarity.npz"
+VENTANA = 252        # Días de retornos en la correlación
+TOP_K = 8
+BONO_SECTOR = 0.10   # Se suma a la correlación si comparten sector
+
+
+def universo(extra=None):
+    """
+    (tickers, mercados) del universo: el registro más los candidatos que éste
+    sugiere (heredan el mercado del ticker que los sugiere) y las posiciones
+    `extra` ({ticker: mercado}) que no estén en el registro.
+    """
+    tickers = {}
+    for t, mercado in (extra or {}).items():
+        tickers[REGISTRO.resolver(t) or str(t).strip().upper()] = mercado
+    for clave in REGISTRO.tickers():
+        info = REGISTRO.info(clave)
+        tickers.setdefault(clave, info["mercado"])
+        for similar in info.get("similares", []):
+            canonico = REGISTRO.resolver(similar) or similar
+            tickers.setdefault(canonico, info["mercado"])
+    return list(tickers), [tickers[t] for t in tickers]
+
+
+class IndiceSimilitud:
+    """
+    Mantiene las sumas de la ventana móvil de retornos (Σx, Σxxᵀ) para que
+    un día nuevo sea una actualización de rango uno: se suma el día que entra
+    y se resta el que sale, O(N²) en lugar de recalcular O(T·N²). Después de
+    cada actualización se recalcula la tabla top-k, de modo que la consulta
+    es un acceso a dict.
+    """
+
+    def __init__(self, tickers, ventana=VENTANA, k=TOP_K, bono_sector=BONO_SECTOR):
+        self.tickers = list(tickers)
+        self.ventana = ventana
+        self.k = k
+        self.bono_sector = bono_sector
+        n = len(self.tickers)
+        self.buffer = np.zeros((0, n))   # Retornos dentro de la ventana (orden cronológico)
+        self.suma = np.zeros(n)
+        self.suma2 = np.zeros((n, n))
+        self.ultima_fecha = None
+        self.vecinos = {}
+
+    @classmethod
+    def construir(cls, cierres, **kwargs):
+        indice = cls(list(cierres.columns), **kwargs)
+        indice.actualizar(cierres)
+        return indice
+
+    @staticmethod
+    def _retornos(cierres):
+        # Calendarios distintos: el día sin cotización cuenta como retorno 0
+        return cierres.ffill().pct_change(fill_method=None).fillna(0.0)
+
+    def actualizar(self, cierres):
+        """Incorpora solo las fechas posteriores a ultima_fecha (de una en una)."""
+        cierres = cierres.reindex(columns=self.tickers)
+        retornos = self._retornos(cierres)
+        if self.ultima_fecha is not None:
+            retornos = retornos[retornos.index > self.ultima_fecha]
+            if cierres.index[0] > self.ultima_fecha:
+                retornos = retornos.iloc[1:]  # El primer retorno no tiene cierre previo
+        else:
+            retornos = retornos.iloc[1:]
+        if retornos.empty:
+            return 0
+
+        filas = retornos.to_numpy(dtype=float)
+        for x in filas:
+            self.suma += x
+            self.suma2 += np.outer(x, x)
+            if len(self.buffer) >= self.ventana:
+                y = self.buffer[0]
+                self.suma -= y
+                self.suma2 -= np.outer(y, y)
+                self.buffer = self.buffer[1:]
+            self.buffer = np.vstack([self.buffer, x])
+        self.ultima_fecha = retornos.index[-1]
+        self._recalcular_vecinos()
+        return len(filas)
+
+    def correlacion(self):
+        n = max(len(self.buffer), 1)
+        media = self.suma / n
+        cov = self.suma2 / n - np.outer(media, media)
+        desv = np.sqrt(np.clip(np.diag(cov), 0, None))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = cov / np.outer(desv, desv)
+        return np.nan_to_num(corr, nan=0.0)
+
+    def _recalcular_vecinos(self):
+        corr = self.correlacion()
+        sectores = np.array([REGISTRO.sector(t) or "" for t in self.tickers], dtype=object)
+        mismo = (sectores[:, None] == sectores[None, :]) & (sectores[:, None] != "")
+        puntaje = corr + self.bono_sector * mismo
+        np.fill_diagonal(puntaje, -np.inf)
+        sin_datos = np.diag(corr) == 0  # Series planas o sin historial
+        puntaje[:, sin_datos] = -np.inf
+
+        k = min(self.k, len(self.tickers) - 1)
+        if k <= 0:
+            self.vecinos = {}
+            return
+        top = np.argpartition(-puntaje, k - 1, axis=1)[:, :k]
+        filas = np.arange(len(self.tickers))[:, None]
+        orden = np.argsort(-puntaje[filas, top], axis=1)
+        top = top[filas, orden]
+        self.vecinos = {
+            t: [(self.tickers[j], float(puntaje[i, j])) for j in top[i] if np.isfinite(puntaje[i, j])]
+            for i, t in enumerate(self.tickers) if not sin_datos[i]
+        }
+
+    def similares(self, ticker, k=None):
+        """Top-k (ticker, puntaje) para un ticker del universo; [] si no está."""
+        clave = REGISTRO.resolver(ticker) or str(ticker).strip().upper()
+        return self.vecinos.get(clave, [])[:k or self.k]
+
+    def guardar(self, path=INDICE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(
+            path, tickers=np.array(self.tickers), buffer=self.buffer, suma=self.suma, suma2=self.suma2,
+            ultima_fecha=np.array(str(self.ultima_fecha) if self.ultima_fecha is not None else ""),
+            parametros=np.array([self.ventana, self.k, self.bono_sector]),
+        )
+
+    @classmethod
+    def cargar(cls, path=INDICE_PATH):
+        if not os.path.exists(path):
+            return None
+        datos = np.load(path, allow_pickle=False)
+        ventana, k, bono = datos["parametros"]
+        indice = cls([str(t) for t in datos["tickers"]], ventana=int(ventana), k=int(k), bono_sector=float(bono))
+        indice.buffer, indice.suma, indice.suma2 = datos["buffer"], datos["suma"], datos["suma2"]
+        fecha = str(datos["ultima_fecha"])
+        indice.ultima_fecha = pd.Timestamp(fecha) if fecha else None
+        indice._recalcular_vecinos()
+        return indice
+
+
+def actualizar_indice(actualizar=True, extra=None, path=INDICE_PATH):
+    """
+    Proceso offline: descarga/lee los cierres del universo, crea el índice si
+    no existe (o si cambió el universo) y si existe solo agrega los días nuevos.
+    """
+    from price_history import cargar_cierres
+
+    tickers, mercados = universo(extra)
+    cierres = cargar_cierres(tickers, mercados, en_mxn=False, actualizar=actualizar)
+    indice = IndiceSimilitud.cargar(path)
+    if indice is None or indice.tickers != list(cierres.columns):
+        indice = IndiceSimilitud.construir(cierres.iloc[-(VENTANA + 1):])
+    else:
+        indice.actualizar(cierres)
+    indice.guardar(path)
+    return indice
+
+
+_INDICE = {"indice": None, "fecha": None, "extra": {}}
+
+
+def indice_similitud(extra=None):
+    """
+    Índice para la app (uno por proceso, compartido entre sesiones): se carga
+    del disco y se pone al corriente con los cierres ya en caché (sin
+    descargas) una vez al día o cuando llegan posiciones que aún no están en
+    el universo. El universo del día acumula las `extra` de todas las sesiones.
+    """
+    hoy = pd.Timestamp.today().normalize()
+    extra = extra or {}
+    if _INDICE["fecha"] != hoy:
+        _INDICE["extra"] = {}
+    nuevos = {t: m for t, m in extra.items() if t not in _INDICE["extra"]}
+    if _INDICE["fecha"] != hoy or nuevos:
+        _INDICE["extra"].update(nuevos)
+        try:
+            _INDICE["indice"] = actualizar_indice(actualizar=False, extra=dict(_INDICE["extra"]))
+        except Exception as e:
+            print(f"Error actualizando índice de similitud: {e}")
+            _INDICE["indice"] = _INDICE["indice"] or IndiceSimilitud.cargar()
+        _INDICE["fecha"] = hoy
+    return _INDICE["indice"]
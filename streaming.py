@@ -0,0 +1,221 @@
+"""
+Evaluación de reglas de oportunidades barra por barra (sin recalcular el DataFrame)
+"""
+import math
+import operator
+from collections import deque
+from datetime import datetime, time as dtime
+
+import pandas as pd
+
+from intraday import BAR_STORE, CDMX_TZ
+from opportunities import REGLAS, UMBRALES
+
+# Versión escalar de opportunities.COMPARADORES (los ufuncs de numpy son lentos por elemento)
+COMPARADORES_ESCALARES = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "abs<": lambda x, u: abs(x) < u,
+    "abs>": lambda x, u: abs(x) > u,
+}
+
+# Columnas que el evaluador mantiene por ticker con costo O(1) por barra
+COLUMNAS_STREAMING = {"var_pct_dia", "var_pct_total", "dist_ma20_pct",
+                      "vol_intradia", "dist_vwap_pct", "movs_grandes"}
+
+
+class _EstadoTicker:
+    __slots__ = ("fecha", "marca", "precio", "cierre_previo", "suma_r2", "movs",
+                 "suma_p", "n", "activas", "valores")
+
+    def __init__(self):
+        self.fecha = None
+        self.marca = None
+        self.precio = None
+        self.cierre_previo = None
+        self.suma_r2 = 0.0
+        self.movs = 0
+        self.suma_p = 0.0
+        self.n = 0
+        self.activas = set()
+        self.valores = {}
+
+
+class EvaluadorStreaming:
+    """
+    Consume barras de 1 minuto (precio en MXN) y mantiene por ticker el estado
+    de cada regla. Solo emite una señal cuando una regla pasa de inactiva a
+    activa y no se emitió la misma (ticker, regla) dentro del enfriamiento.
+
+    - costos: {ticker: costo_promedio} en MXN
+    - cierres: matriz diaria fecha × ticker en MXN (caché local); da el cierre
+      previo de respaldo y los 19 cierres para la MA20 que incluye el precio vivo
+    - columnas estáticas (p.ej. rsi_14 del día anterior) en `estaticos`
+    """
+
+    def __init__(self, costos, cierres=None, estaticos=None, reglas=REGLAS, umbrales=None,
+                 enfriamiento_min=30, umbral_movimiento=0.5, historial=200):
+        self.costos = {t: float(c) for t, c in costos.items()}
+        self.enfriamiento = pd.Timedelta(minutes=enfriamiento_min)
+        self.umbral_movimiento = umbral_movimiento / 100
+        self._reglas_base = reglas
+        self.configurar(umbrales or UMBRALES, estaticos or {})
+
+        self._cierres = {}
+        self._suma19 = {}
+        if cierres is not None and len(cierres):
+            cierres = cierres.ffill()
+            for t in cierres.columns:
+                serie = cierres[t].dropna()
+                self._cierres[t] = serie
+                if len(serie) >= 19:
+                    self._suma19[t] = float(serie.iloc[-19:].sum())
+
+        self._estado = {}
+        self._ultima_emision = {}
+        self._version = 0
+        self.senales = deque(maxlen=historial)
+
+    def configurar(self, umbrales=None, estaticos=None):
+        """
+        Cambia umbrales y/o columnas estáticas sin perder el estado por ticker
+        (posición en el store, reglas activas y enfriamientos).
+        """
+        if umbrales is not None:
+            self.umbrales = umbrales
+        if estaticos is not None:
+            self.estaticos = estaticos
+        disponibles = COLUMNAS_STREAMING | {c for valores in self.estaticos.values() for c in valores}
+        umbrales = self.umbrales
+        # Reglas aplicables ya resueltas: (regla, [(columna, comparador, umbral numérico)])
+        self.reglas = [
+            (r, [(c, COMPARADORES_ESCALARES[comp], umbrales[u] if isinstance(u, str) else u)
+                 for c, comp, u in r["condiciones"]])
+            for r in self._reglas_base if all(c in disponibles for c, _, _ in r["condiciones"])
+        ]
+
+    def _cierre_previo(self, ticker, fecha, store):
+        """Última barra del día anterior; si no hay, último cierre diario; si no, None."""
+        inicio = CDMX_TZ.localize(datetime.combine(fecha, dtime(0, 0)))
+        serie = store.serie(ticker) if store is not None else pd.Series(dtype=float)
+        k = serie.index.searchsorted(inicio) if len(serie) else 0
+        if k > 0:
+            return float(serie.iloc[k - 1]) * self._fx(ticker, store)
+        diarios = self._cierres.get(ticker)
+        if diarios is not None and len(diarios):
+            previos = diarios[diarios.index < pd.Timestamp(fecha)]
+            if len(previos):
+                return float(previos.iloc[-1])
+        return None
+
+    @staticmethod
+    def _fx(ticker, store):
+        moneda = store.moneda(ticker)
+        if moneda == "MXN":
+            return 1.0
+        return float(store.fx_rates.get(f"{moneda}_MXN", 1.0))
+
+    def procesar(self, ticker, marca, precio, store=None):
+        """
+        Incorpora una barra y regresa la lista de señales nuevas (dicts con
+        ticker, regla, severidad, valor, tono, marca). Barras repetidas o
+        atrasadas se ignoran para mantener el costo constante.
+        """
+        e = self._estado.get(ticker)
+        if e is None:
+            e = self._estado[ticker] = _EstadoTicker()
+        if e.marca is not None and marca <= e.marca:
+            return []
+        if not precio or precio <= 0 or math.isnan(precio):
+            return []
+
+        fecha = marca.date()
+        if fecha != e.fecha:
+            e.fecha = fecha
+            e.cierre_previo = self._cierre_previo(ticker, fecha, store)
+            e.suma_r2, e.movs, e.suma_p, e.n = 0.0, 0, 0.0, 0
+            e.precio = None
+
+        if e.precio:
+            r = math.log(precio / e.precio)
+            e.suma_r2 += r * r
+            e.movs += abs(r) > self.umbral_movimiento
+        e.precio = precio
+        e.marca = marca
+        e.suma_p += precio
+        e.n += 1
+        if e.cierre_previo is None:
+            e.cierre_previo = precio
+
+        v = e.valores
+        v["var_pct_dia"] = (precio / e.cierre_previo - 1) * 100
+        costo = self.costos.get(ticker)
+        v["var_pct_total"] = (precio / costo - 1) * 100 if costo else math.nan
+        suma19 = self._suma19.get(ticker)
+        v["dist_ma20_pct"] = (precio / ((suma19 + precio) / 20) - 1) * 100 if suma19 else math.nan
+        v["vol_intradia"] = math.sqrt(e.suma_r2) * 100
+        v["dist_vwap_pct"] = (precio / (e.suma_p / e.n) - 1) * 100  # TWAP: el payload no trae volumen
+        v["movs_grandes"] = e.movs
+        v.update(self.estaticos.get(ticker, {}))
+
+        return self._evaluar(ticker, e, marca)
+
+    def _evaluar(self, ticker, e, marca):
+        nuevas = []
+        valores = e.valores
+        for regla, condiciones in self.reglas:
+            activa = all(comp(valores[col], u) for col, comp, u in condiciones)
+            clave = regla["id"]
+            if not activa:
+                e.activas.discard(clave)
+                continue
+            if clave in e.activas:
+                continue
+            e.activas.add(clave)
+
+            previa = self._ultima_emision.get((ticker, clave))
+            if previa is not None and marca - previa < self.enfriamiento:
+                continue
+            self._ultima_emision[(ticker, clave)] = marca
+            senal = {
+                "ticker": ticker,
+                "regla": clave,
+                "severidad": regla["severidad"],
+                "valor": e.valores[regla["condiciones"][0][0]],
+                "tono": regla["tono"],
+                "marca": marca,
+            }
+            nuevas.append(senal)
+            self.senales.append(senal)
+        return nuevas
+
+    def consumir_store(self, store=BAR_STORE):
+        """
+        Procesa solo las barras que llegaron al store desde la última llamada
+        (change log de BarStore), en orden de tiempo por ticker.
+        """
+        cambios = store.cambios_desde(self._version)
+        self._version = store.version
+        nuevas = []
+        for ticker in dict.fromkeys(t for t, _ in cambios):
+            if ticker not in self.costos:
+                continue
+            serie = store.serie(ticker)
+            e = self._estado.get(ticker)
+            if e is not None and e.marca is not None:
+                serie = serie.iloc[serie.index.searchsorted(e.marca, side="right"):]
+            fx = self._fx(ticker, store)
+            for marca, precio in zip(serie.index, serie.to_numpy() * fx):
+                nuevas += self.procesar(ticker, marca, float(precio), store)
+        return nuevas
+
+    def activas(self):
+        """Reglas activas ahora mismo por ticker."""
+        return {t: sorted(e.activas) for t, e in self._estado.items() if e.activas}
+
+
+def senales_a_tabla(senales):
+    columnas = ["ticker", "regla", "severidad", "valor", "tono", "marca"]
+    return pd.DataFrame(list(senales), columns=columnas)
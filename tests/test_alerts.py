@@ -0,0 +1,24 @@
+import pytest
+
+from alerts import IndiceAlertas, nueva_alerta, resolver_tenencia
+
+
+def test_resolver_tenencia_con_y_sin_asterisco():
+    tenencias = ["AMZN*", "ALSEA*", "CEMEXCPO"]
+    assert resolver_tenencia("amzn", tenencias) == "AMZN*"
+    assert resolver_tenencia("ALSEA", tenencias) == "ALSEA*"
+    assert resolver_tenencia("CEMEXCPO", tenencias) == "CEMEXCPO"
+    assert resolver_tenencia("TSLA", tenencias) is None
+
+
+def test_alerta_sin_asterisco_dispara_con_el_precio_de_la_posicion():
+    alerta = nueva_alerta("AMZN", ">", 4_500, tenencias=["AMZN*", "WALMEX*"])
+    assert alerta["ticker"] == "AMZN*"
+    indice = IndiceAlertas().cargar_usuario("u1", [alerta])
+    assert indice.procesar_precios({"AMZN*": 4_400.0}) == []
+    assert [a["id"] for _, a in indice.procesar_precios({"AMZN*": 4_600.0})] == [alerta["id"]]
+
+
+def test_alerta_de_ticker_que_no_se_tiene_se_rechaza():
+    with pytest.raises(ValueError):
+        nueva_alerta("TSLA", "<", 3_000, tenencias=["AMZN*"])
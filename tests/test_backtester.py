@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester import backtest
+
+
+def _umbral_dia_a_dia(precios, pesos, banda, costo_bps=10.0, valor_inicial=100.0):
+    """Referencia: revisa la banda cada día y rebalancea al cierre del rompimiento."""
+    costo = costo_bps / 10_000
+    titulos = valor_inicial * pesos / precios[0]
+    valores, n = np.empty(len(precios)), 0
+    for t in range(len(precios)):
+        actual = titulos * precios[t]
+        valor = actual.sum()
+        valores[t] = valor
+        if t == 0 or t == len(precios) - 1 or np.abs(actual / valor - pesos).max() <= banda:
+            continue
+        valor -= np.abs(valor * pesos - actual).sum() * costo
+        valores[t] = valor
+        titulos = valor * pesos / precios[t]
+        n += 1
+    return valores, n
+
+
+@pytest.mark.parametrize("semilla", range(5))
+def test_umbral_igual_a_referencia_diaria(semilla):
+    rng = np.random.default_rng(semilla)
+    precios = 100 * np.cumprod(1 + rng.normal(0, 0.02, (300, 3)), axis=0)
+    cierres = pd.DataFrame(precios, index=pd.bdate_range("2024-01-01", periods=300))
+    pesos = np.array([0.5, 0.3, 0.2])
+    serie, stats = backtest(cierres, pesos, politica="umbral", banda=0.01)
+    esperado, n = _umbral_dia_a_dia(precios, pesos, 0.01)
+    np.testing.assert_allclose(serie.to_numpy(), esperado)
+    assert stats["rebalanceos"] == n
+
+
+def test_rompimiento_al_dia_siguiente_de_un_rebalanceo():
+    # Día 1 rompe la banda; los días 2 y 3 (primer día de cada tramo nuevo) también
+    precios = np.array([[1.0, 1.0], [1.3, 1.0], [1.6, 1.0], [1.0, 1.0], [1.0, 1.0]])
+    cierres = pd.DataFrame(precios, index=pd.bdate_range("2024-01-01", periods=5))
+    pesos = np.array([0.5, 0.5])
+    serie, stats = backtest(cierres, pesos, politica="umbral", banda=0.05, costo_bps=0)
+    esperado, n = _umbral_dia_a_dia(precios, pesos, 0.05, costo_bps=0)
+    assert stats["rebalanceos"] == n == 3  # días 1, 2 y 3
+    np.testing.assert_allclose(serie.to_numpy(), esperado)
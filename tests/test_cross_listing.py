@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cross_listing import formatear_marcas, monitor_primas
+from intraday import CDMX_TZ, BarStore
+
+
+def test_prima_con_un_listado_sin_barras():
+    store = BarStore()
+    minutos = pd.date_range("2025-03-03 09:30", periods=3, freq="min", tz=CDMX_TZ)
+    store.agregar("AMZN*", pd.Series([4_100.0, 4_110.0, 4_120.0], index=minutos))
+    duales = {"AMZN*": ("AMZN", "USD"), "TSLA*": ("TSLA", "USD")}
+    origen = {"AMZN": pd.Series([205.0, 205.5, 206.0], index=minutos)}
+
+    tabla = monitor_primas(duales, store, fx_rates={"USD_MXN": 20.0}, precios_origen=origen)
+
+    assert tabla["estado"].tolist() == ["ok", "sin BMV"]
+    assert tabla.loc[0, "prima_pct"] == pytest.approx((4_120 / (206 * 20) - 1) * 100)
+    assert np.isnan(tabla.loc[1, "prima_pct"])
+    assert formatear_marcas(tabla["marca_bmv"]).tolist() == ["09:32", "–"]
+
+
+def test_formatear_marcas_sin_ninguna_barra():
+    assert formatear_marcas([None, None]).tolist() == ["–", "–"]
+
+
+def test_precios_de_origen_se_reusan_dentro_del_ttl(monkeypatch):
+    import cross_listing
+
+    descargas = []
+    monkeypatch.setattr(cross_listing, "_CACHE_ORIGEN", {})
+    monkeypatch.setattr(cross_listing, "_descargar_origen", lambda s: descargas.append(s) or {})
+    cross_listing._precios_origen(["AMZN", "TSLA"])
+    cross_listing._precios_origen(["AMZN", "TSLA"])
+    assert len(descargas) == 1
+    cross_listing._precios_origen(["AMZN"])
+    cross_listing._precios_origen(["AMZN", "TSLA"], ttl=0)
+    assert len(descargas) == 3
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import IndicadoresIncrementales, calcular_indicadores, resumen_indicadores
+
+
+def _cierres(filas=120, tickers=4, semilla=0):
+    rng = np.random.default_rng(semilla)
+    datos = 100 * np.cumprod(1 + rng.normal(0, 0.02, (filas, tickers)), axis=0)
+    return pd.DataFrame(datos, index=pd.bdate_range("2025-01-01", periods=filas),
+                        columns=[f"T{i}" for i in range(tickers)])
+
+
+def _comparar(cierres, arranque):
+    inc = IndicadoresIncrementales(cierres.iloc[:arranque])
+    incremental = inc.actualizar_desde(cierres)
+    lote = resumen_indicadores(cierres, calcular_indicadores(cierres))
+    pd.testing.assert_frame_equal(incremental, lote, check_names=False, rtol=1e-7, atol=1e-9)
+
+
+def test_incremental_igual_al_lote():
+    _comparar(_cierres(), arranque=40)
+
+
+def test_ticker_con_historia_mas_corta():
+    cierres = _cierres()
+    cierres.iloc[:50, 2] = np.nan  # T2 empieza a cotizar dentro del calentamiento
+    cierres.iloc[:80, 3] = np.nan  # T3 empieza después del arranque
+    _comparar(cierres, arranque=60)
+
+
+@pytest.mark.parametrize("arranque", [2, 5, 19])
+def test_historia_menor_a_la_ventana(arranque):
+    _comparar(_cierres(), arranque=arranque)
+
+
+def test_sin_actualizaciones_no_cambia():
+    cierres = _cierres()
+    inc = IndicadoresIncrementales(cierres)
+    pd.testing.assert_frame_equal(inc.actualizar_desde(cierres), inc.resumen())
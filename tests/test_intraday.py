@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+import intraday
+from intraday import BarStore, CurvaIntradia
+
+
+def _payload(inicio, minutos, base):
+    marcas = pd.date_range(inicio, periods=minutos, freq="min")
+    return {str(m): base + 0.1 * i for i, m in enumerate(marcas)}
+
+
+def test_reenviar_el_mismo_payload_no_registra_cambios():
+    store = BarStore()
+    payload = _payload("2026-10-19 08:30", 30, 20.0)
+    store.agregar_payload("CEMEXCPO", payload)
+    version = store.version
+    store.agregar_payload("CEMEXCPO", payload)
+    assert store.cambios_desde(version) == []
+
+
+def test_registra_el_primer_minuto_nuevo():
+    store = BarStore()
+    payload = _payload("2026-10-19 08:30", 30, 20.0)
+    store.agregar_payload("CEMEXCPO", payload)
+    version = store.version
+    store.agregar_payload("CEMEXCPO", {**payload, **_payload("2026-10-19 09:00", 5, 30.0)})
+    (ticker, marca), = store.cambios_desde(version)
+    assert ticker == "CEMEXCPO"
+    assert marca == pd.Timestamp("2026-10-19 09:00").tz_localize(intraday.CDMX_TZ)
+
+
+def test_curva_incremental_igual_a_reconstruida():
+    store = BarStore()
+    previo = _payload("2026-10-16 14:00", 60, 19.0)
+    hoy = _payload("2026-10-19 08:30", 60, 20.0)
+    store.agregar_payload("A", {**previo, **hoy})
+    store.agregar_payload("B", {**_payload("2026-10-16 14:00", 60, 50.0), **_payload("2026-10-19 08:30", 60, 51.0)})
+    titulos = {"A": 100, "B": 10}
+    curva = CurvaIntradia(titulos)
+    curva.construir(store)
+
+    # price_fetcher reenvía todo el payload más las barras nuevas
+    store.agregar_payload("A", {**previo, **hoy, **_payload("2026-10-19 09:30", 15, 26.0)})
+    incremental = curva.actualizar_desde_store(store)
+    completa = CurvaIntradia(titulos).construir(store)
+    pd.testing.assert_frame_equal(incremental, completa, check_freq=False)
+
+
+def test_log_recortado_pide_recalcular(monkeypatch):
+    monkeypatch.setattr(intraday, "MAX_CAMBIOS", 4)
+    store = BarStore()
+    for i in range(10):
+        store.agregar_payload("A", _payload(pd.Timestamp("2026-10-19 08:30") + pd.Timedelta(minutes=i), 1, 20.0))
+    assert len(store._cambios) <= 4
+    assert store.version == 10
+    assert store.cambios_desde(0) == [("A", store.serie("A").index[0])]
+    assert store.cambios_desde(9) == [("A", store.serie("A").index[-1])]
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+import optimizer
+from optimizer import _CACHE, MAX_VERSIONES, estimar_parametros
+from price_history import version_datos
+
+
+def _cierres(semilla=0):
+    fechas = pd.bdate_range("2024-01-01", periods=120)
+    rng = np.random.default_rng(semilla)
+    precios = 100 * np.cumprod(1 + rng.normal(0.0005, 0.01, (len(fechas), 3)), axis=0)
+    return pd.DataFrame(precios, index=fechas, columns=["AMXB", "WALMEX", "AMZN*"])
+
+
+def test_ajuste_retroactivo_cambia_la_version():
+    cierres = _cierres()
+    ajustados = cierres.copy()
+    ajustados.iloc[:60, 0] /= 2   # Split reexpresado: la última fila no cambia
+    assert version_datos(ajustados) != version_datos(cierres)
+    assert version_datos(cierres.copy()) == version_datos(cierres)
+
+
+def test_estimar_parametros_no_reusa_datos_viejos():
+    _CACHE.clear()
+    cierres = _cierres()
+    antes = estimar_parametros(cierres)
+    ajustados = cierres.copy()
+    ajustados.iloc[:60, 0] /= 2
+    despues = estimar_parametros(ajustados)
+    assert not np.allclose(antes["mu"], despues["mu"])
+
+
+def test_cache_acotada():
+    _CACHE.clear()
+    for semilla in range(MAX_VERSIONES + 5):
+        estimar_parametros(_cierres(semilla))
+    assert len(optimizer._CACHE) == MAX_VERSIONES
+    assert version_datos(_cierres(MAX_VERSIONES + 4)) in _CACHE
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+import performance
+from performance import _CACHE, rendimientos_por_periodo
+
+
+def _datos():
+    fechas = pd.bdate_range("2024-06-03", "2025-12-31")
+    rng = np.random.default_rng(0)
+    valores = pd.Series(100_000 * np.cumprod(1 + rng.normal(0.0004, 0.01, len(fechas))), index=fechas)
+    flujos = pd.DataFrame({"fecha": pd.to_datetime(["2025-03-03", "2025-06-02"]), "monto": [5_000.0, 10_000.0]})
+    return valores, flujos
+
+
+def test_mover_un_flujo_invalida_la_cache():
+    _CACHE.clear()
+    valores, flujos = _datos()
+    antes = rendimientos_por_periodo(valores, flujos)
+
+    movido = flujos.copy()
+    movido.loc[1, "fecha"] = pd.Timestamp("2025-06-09")
+    despues = rendimientos_por_periodo(valores, movido)
+
+    _CACHE.clear()
+    esperado = rendimientos_por_periodo(valores, movido)
+    pd.testing.assert_frame_equal(despues, esperado)
+    assert not np.isclose(antes.loc["Total", "twr"], despues.loc["Total", "twr"])
+
+
+def test_cambiar_un_valor_intermedio_invalida_la_cache():
+    _CACHE.clear()
+    valores, flujos = _datos()
+    rendimientos_por_periodo(valores, flujos)
+    alterado = valores.copy()
+    alterado.iloc[len(alterado) // 2] *= 1.05
+    assert performance._version(valores, flujos) != performance._version(alterado, flujos)
+
+
+def test_misma_entrada_usa_la_cache():
+    _CACHE.clear()
+    valores, flujos = _datos()
+    rendimientos_por_periodo(valores, flujos)
+    n = len(_CACHE)
+    rendimientos_por_periodo(valores.copy(), flujos.copy())
+    assert len(_CACHE) == n
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rebalance import planear_rebalanceo
+
+
+def _df(titulos, precios, tickers=None, mercado="México"):
+    tickers = tickers or [chr(ord("A") + i) for i in range(len(titulos))]
+    return pd.DataFrame({"ticker": tickers, "mercado": mercado, "titulos": titulos, "precio_mercado": precios})
+
+
+def test_no_gasta_mas_efectivo_del_disponible():
+    # A dentro de la banda y sobreponderada por 200: hay que vender 200, no 1
+    plan, efectivo_final = planear_rebalanceo(_df([5200, 0], [1.0, 1.0]), {"A": 0.5, "B": 0.5}, efectivo=4800)
+    assert efectivo_final >= 0
+    assert plan.set_index("ticker").loc["A", "titulos_objetivo"] <= 5000
+    assert plan.set_index("ticker").loc["B", "titulos_objetivo"] == 5000
+
+
+@pytest.mark.parametrize("semilla", range(20))
+def test_efectivo_final_nunca_negativo(semilla):
+    rng = np.random.default_rng(semilla)
+    n = 6
+    titulos = rng.integers(0, 500, n)
+    precios = rng.uniform(1, 300, n).round(2)
+    objetivos = dict(zip("ABCDEF", rng.dirichlet(np.ones(n))))
+    plan, efectivo_final = planear_rebalanceo(_df(titulos, precios), objetivos,
+                                              efectivo=float(rng.uniform(0, 5000)), banda=0.2)
+    assert efectivo_final >= 0
+    assert (plan["titulos_objetivo"] >= 0).all()
+
+
+def test_dentro_de_banda_no_opera():
+    plan, _ = planear_rebalanceo(_df([50, 50], [10.0, 10.0]), {"A": 0.5, "B": 0.5}, efectivo=0)
+    assert (plan["operacion"] == "MANTENER").all()
@@ -0,0 +1,89 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import screener
+from screener import (
+    LETRAS, MERCADOS, METRICAS, Screener, _guardar_cierres, _leer_catalogo, _leer_cierres,
+    actualizar_catalogo, calcular_metricas, catalogo_completo,
+)
+
+
+class _Respuesta:
+    def __init__(self, letra):
+        self.letra = letra
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {f"{self.letra}EMI": {"A": {"estatus": "ACTIVA", "razon_social": self.letra, "bolsa": "BMV"}}}
+
+
+@pytest.fixture
+def consultas(monkeypatch):
+    hechas = []
+
+    def get(url, params, timeout):
+        hechas.append((params["mercado"], params["letra"]))
+        return _Respuesta(params["letra"])
+
+    monkeypatch.setattr(screener.requests, "get", get)
+    return hechas
+
+
+def test_baja_todas_las_letras_faltantes_de_una_vez(tmp_path, consultas):
+    path = str(tmp_path / "emisoras.json")
+    emisoras = actualizar_catalogo("token", path, max_letras=2)
+    assert len(consultas) == len(MERCADOS) * len(LETRAS)
+    assert catalogo_completo(path)
+    assert "AEMIA" in emisoras
+
+
+def test_solo_limita_las_vencidas(tmp_path, consultas):
+    path = str(tmp_path / "emisoras.json")
+    actualizar_catalogo("token", path)
+    catalogo = _leer_catalogo(path)
+    viejo = time.time() - 30 * 86400
+    for i, clave in enumerate(["local:A", "local:B", "global:C", "global:D"]):
+        catalogo["letras"][clave] = viejo + i
+    del catalogo["letras"]["local:Z"]
+    screener._guardar_catalogo(catalogo, path)
+    assert not catalogo_completo(path)
+
+    consultas.clear()
+    actualizar_catalogo("token", path, max_letras=2)
+    assert consultas == [("local", "Z"), ("local", "A"), ("local", "B")]
+    assert catalogo_completo(path)
+
+
+def test_guardar_y_leer_cierres(tmp_path):
+    path = str(tmp_path / "screener.npz")
+    fechas = pd.bdate_range("2025-01-01", periods=5)
+    cierres = pd.DataFrame({"AMXB": [1.0, 2, np.nan, 4, 5], "WALMEX": np.arange(5.0)}, index=fechas)
+    _guardar_cierres(cierres, path)
+    pd.testing.assert_frame_equal(_leer_cierres(path), cierres, check_freq=False)
+    assert list(tmp_path.iterdir()) == [tmp_path / "screener.npz"]
+
+
+def test_metricas_y_top():
+    fechas = pd.bdate_range("2024-01-01", periods=300)
+    t = np.arange(300.0)
+    cierres = pd.DataFrame({
+        "SUBE": 10 + t,                                   # En máximos, sin caída
+        "CAE": 400 - t,                                   # En mínimos
+        "VUELTA": np.where(t < 150, 100 + t, 400 - t),    # A medio camino
+    }, index=fechas)
+    metricas = calcular_metricas(cierres)
+    assert metricas.loc["SUBE", "drawdown"] == pytest.approx(0)
+    assert metricas.loc["SUBE", "dist_max_52s"] == pytest.approx(0)
+    assert metricas.loc["CAE", "dist_max_52s"] < metricas.loc["VUELTA", "dist_max_52s"] < 0
+
+    scr = Screener(cierres)
+    # Mayor es mejor: la menor caída y la más cercana al máximo van primero
+    assert METRICAS["drawdown"][1] and METRICAS["dist_max_52s"][1]
+    assert scr.top("drawdown", k=3)["ticker"].tolist()[0] == "SUBE"
+    assert scr.top("dist_max_52s", k=3)["ticker"].tolist() == ["SUBE", "VUELTA", "CAE"]
+    assert scr.top("volatilidad", k=1, filtros={"mom_1m": (0, None)})["ticker"].tolist() == ["SUBE"]
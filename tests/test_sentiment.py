@@ -0,0 +1,57 @@
+import pytest
+
+from sentiment import MemoSentimiento, clave_sentimiento, puntuar, sentimiento_por_ticker
+
+
+def test_negacion_cambia_clave_y_puntaje():
+    assert clave_sentimiento("Cemex no sube en la BMV") != clave_sentimiento("Cemex sube en la BMV")
+    assert puntuar("Cemex sube en la BMV") > 0
+    assert puntuar("Cemex no sube en la BMV") < 0
+
+
+def test_clave_ignora_el_medio():
+    assert clave_sentimiento("Cemex sube en la BMV - El Economista") == clave_sentimiento("Cemex sube en la BMV")
+
+
+@pytest.mark.parametrize("titulo", [
+    "Mission Produce reports quarterly results",
+    "Surgery volumes at hospital chain",
+    "Ganado bovino en Chihuahua",
+    "Cute dog video goes viral",
+])
+def test_prefijos_cortos_no_cuentan(titulo):
+    assert puntuar(titulo) == 0.0
+
+
+def test_inflexiones_listadas():
+    assert puntuar("Walmex gana terreno") > 0
+    assert puntuar("Netflix misses estimates") < 0
+    assert puntuar("Nvidia surges after earnings") > 0
+    assert puntuar("Mission Produce beats estimates") == pytest.approx(0.7)
+
+
+def test_memo_no_mezcla_titulares_negados(tmp_path):
+    memo = MemoSentimiento(str(tmp_path / "sentimiento.db"))
+    noticias = [
+        {"title": "Cemex sube en la BMV", "hash": "x", "tickers": ["CEMEXCPO"], "timestamp": 0},
+        {"title": "Cemex no sube en la BMV", "hash": "x", "tickers": ["GMEXICOB"], "timestamp": 0},
+    ]
+    por_ticker = sentimiento_por_ticker(noticias, memo=memo, ahora=0)
+    assert por_ticker["CEMEXCPO"] > 0 > por_ticker["GMEXICOB"]
+
+    # Un memo nuevo lee lo guardado en disco
+    otro = MemoSentimiento(memo.path)
+    assert otro.puntuar_lote(noticias[:1]) == {clave_sentimiento(noticias[0]["title"]): por_ticker["CEMEXCPO"]}
+
+
+def test_usa_la_clave_guardada_en_la_noticia(tmp_path, monkeypatch):
+    import sentiment
+
+    memo = MemoSentimiento(str(tmp_path / "sentimiento.db"))
+    titulo = "Cemex sube en la BMV"
+    noticias = [{"title": titulo, "clave_sentimiento": clave_sentimiento(titulo), "tickers": ["CEMEXCPO"], "timestamp": 0}]
+    sentimiento_por_ticker(noticias, memo=memo, ahora=0)
+
+    # Con el feed caliente no se vuelve a tokenizar ningún titular
+    monkeypatch.setattr(sentiment, "clave_sentimiento", lambda texto: pytest.fail("re-tokenizó"))
+    assert sentimiento_por_ticker(noticias, memo=memo, ahora=0)["CEMEXCPO"] > 0
@@ -0,0 +1,31 @@
+import pytest
+
+import similarity
+
+
+@pytest.fixture
+def llamadas(monkeypatch):
+    hechas = []
+    monkeypatch.setattr(similarity, "_INDICE", {"indice": None, "fecha": None, "extra": {}})
+    monkeypatch.setattr(similarity, "actualizar_indice",
+                        lambda actualizar, extra: hechas.append(sorted(extra)) or object())
+    return hechas
+
+
+def test_posiciones_nuevas_de_otra_sesion_reconstruyen(llamadas):
+    similarity.indice_similitud({"GAPB": "México"})
+    similarity.indice_similitud({"GAPB": "México"})
+    assert llamadas == [["GAPB"]]
+
+    # Otra sesión con una posición que el universo no tenía: se agrega, sin perder la anterior
+    similarity.indice_similitud({"ORBIA": "México"})
+    assert llamadas == [["GAPB"], ["GAPB", "ORBIA"]]
+    similarity.indice_similitud({"GAPB": "México", "ORBIA": "México"})
+    assert len(llamadas) == 2
+
+
+def test_cambio_de_dia_reinicia_el_universo(llamadas):
+    similarity.indice_similitud({"GAPB": "México"})
+    similarity._INDICE["fecha"] = None
+    similarity.indice_similitud({"ORBIA": "México"})
+    assert llamadas == [["GAPB"], ["ORBIA"]]
@@ -0,0 +1,35 @@
+import pandas as pd
+
+from intraday import CDMX_TZ, BarStore
+from opportunities import UMBRALES
+from streaming import EvaluadorStreaming
+
+
+def _store(precios):
+    store = BarStore()
+    minutos = pd.date_range("2025-03-03 09:30", periods=len(precios), freq="min", tz=CDMX_TZ)
+    store.agregar("WALMEX", pd.Series(precios, index=minutos))
+    return store, minutos
+
+
+def test_configurar_cambia_umbrales_sin_perder_el_estado():
+    store, _ = _store([100.0, 100.0, 130.0])
+    evaluador = EvaluadorStreaming({"WALMEX": 100.0})
+    ids = {s["regla"] for s in evaluador.consumir_store(store)}
+    assert "ganancia_fuerte" not in ids and "ganancia" in ids
+
+    evaluador.configurar({**UMBRALES, "ganancia_fuerte": 20.0})
+    assert evaluador.umbrales["ganancia_fuerte"] == 20.0
+    # La posición en el store se conserva: no se vuelven a procesar las barras viejas
+    assert evaluador.consumir_store(store) == []
+
+    siguiente = pd.date_range("2025-03-03 09:33", periods=1, freq="min", tz=CDMX_TZ)
+    store.agregar("WALMEX", pd.Series([131.0], index=siguiente))
+    assert "ganancia_fuerte" in {s["regla"] for s in evaluador.consumir_store(store)}
+
+
+def test_configurar_estaticos_habilita_reglas():
+    evaluador = EvaluadorStreaming({"WALMEX": 100.0})
+    assert "sobreventa" not in {r["id"] for r, _ in evaluador.reglas}
+    evaluador.configurar(estaticos={"WALMEX": {"rsi_14": 25.0}})
+    assert "sobreventa" in {r["id"] for r, _ in evaluador.reglas}
@@ -0,0 +1,29 @@
+from ticker_registry import RegistroTickers, indice_prefijos
+
+
+def _indice():
+    registro = RegistroTickers({"AMZN*": {"nombre": "Amazon", "alias": ["AMZN"]}})
+    catalogo = {"WALMEX*": {"razon_social": "Wal-Mart de México"}, "AMXB": {"razon_social": "América Móvil"}}
+    return indice_prefijos(registro, catalogo)
+
+
+def test_resolver_clave_exacta_y_alias():
+    indice = _indice()
+    assert indice.resolver("amzn") == "AMZN*"
+    assert indice.resolver("walmex") == "WALMEX*"
+    assert indice.resolver("AM") is None
+
+
+def test_buscar_por_prefijo_sin_repetir():
+    indice = _indice()
+    assert indice.buscar("am") == ["AMZN*", "AMXB"]
+    assert indice.buscar("wal") == ["WALMEX*"]
+    assert indice.buscar("am", limite=1) == ["AMZN*"]
+    assert indice.buscar("") == []
+
+
+def test_emisoras_bmv_fuera_del_registro_usan_el_mercado():
+    registro = RegistroTickers()
+    for t in ["ORBIA", "GAPB", "PINFRA", "KIMBERA", "BIMBOA"]:
+        assert registro.moneda(t, "México") == "MXN"
+        assert registro.simbolo_yf(t, "México") == f"{t}.MX"
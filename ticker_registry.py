@@ -0,0 +1,173 @@
+"""
+Registro de metadatos por ticker (nombre, bolsa, moneda, sector, ETF, alias)
+cargado una vez desde tickers.json
+"""
+import json
+import os
+from bisect import bisect_left
+
+REGISTRY_PATH = "tickers.json"
+
+
+def normalizar(simbolo):
+    """Única normalización de símbolos en todo el proyecto."""
+    return str(simbolo).strip().upper()
+
+
+def _sin_sufijos(simbolo):
+    return simbolo.replace("*", "").replace(".MX", "")
+
+
+class RegistroTickers:
+    """
+    Índices en memoria: clave canónica → metadatos y alias normalizado → clave.
+    Cada alias se registra también sin "*" ni ".MX", de modo que "AMZN",
+    "AMZN*" y "amzn" resuelven a la misma entrada con un solo dict lookup.
+
+    Los tickers que no están en el archivo se describen con las reglas de
+    siempre (sufijos .MX/.HK y el mercado de la posición).
+    """
+
+    def __init__(self, entradas=None):
+        self._entradas = {}
+        self._alias = {}
+        for clave, meta in (entradas or {}).items():
+            self.agregar(clave, meta)
+
+    @classmethod
+    def cargar(cls, path=REGISTRY_PATH):
+        if not os.path.exists(path):
+            print(f"Registro de tickers no encontrado: {path}")
+            return cls()
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def agregar(self, clave, meta):
+        clave = normalizar(clave)
+        self._entradas[clave] = {"ticker": clave, **meta}
+        for alias in [clave, *meta.get("alias", [])]:
+            alias = normalizar(alias)
+            self._alias.setdefault(alias, clave)
+            self._alias.setdefault(_sin_sufijos(alias), clave)
+
+    def resolver(self, simbolo):
+        """Clave canónica del registro o None si no está."""
+        s = normalizar(simbolo)
+        return self._alias.get(s) or self._alias.get(_sin_sufijos(s))
+
+    def info(self, simbolo, mercado=None):
+        """Metadatos del ticker; los desconocidos se infieren del símbolo y el mercado."""
+        clave = self.resolver(simbolo)
+        if clave is not None:
+            return self._entradas[clave]
+        return self._inferir(normalizar(simbolo), mercado)
+
+    @staticmethod
+    def _inferir(s, mercado):
+        limpio = s.replace("*", "")
+        if limpio.endswith(".HK"):
+            yf, moneda, bolsa = limpio, "HKD", "HK"
+        elif limpio.endswith(".MX") or mercado == "México":
+            yf = limpio if limpio.endswith(".MX") else f"{limpio}.MX"
+            moneda, bolsa = "MXN", "BMV"
+        else:
+            yf, moneda, bolsa = limpio, "USD", "SIC"
+        if limpio.endswith("=X"):
+            yf = limpio
+        return {
+            "ticker": s,
+            "nombre": _sin_sufijos(s),
+            "mercado": mercado or ("México" if moneda == "MXN" else "Global"),
+            "bolsa": bolsa,
+            "yf": yf,
+            "moneda": moneda,
+            "sector": None,
+            "etf": False,
+            "alias": [],
+        }
+
+    def nombre(self, simbolo):
+        return self.info(simbolo)["nombre"]
+
+    def simbolo_yf(self, simbolo, mercado=None):
+        return self.info(simbolo, mercado)["yf"]
+
+    def moneda(self, simbolo, mercado=None):
+        """Moneda del símbolo de yfinance (la del mercado de origen)."""
+        return self.info(simbolo, mercado)["moneda"]
+
+    def sector(self, simbolo):
+        return self.info(simbolo).get("sector")
+
+    def es_etf(self, simbolo):
+        return bool(self.info(simbolo).get("etf"))
+
+    def similares(self, simbolo):
+        return list(self.info(simbolo).get("similares", []))
+
+    def variantes(self, simbolo):
+        """Símbolos a intentar en DataBursatil: el ticker tal cual y sin sufijos."""
+        s = normalizar(simbolo)
+        meta = self.info(s)
+        candidatos = [s, *meta.get("variantes", []), _sin_sufijos(s)]
+        return list(dict.fromkeys(candidatos))
+
+    def tickers(self):
+        return list(self._entradas)
+
+
+class IndicePrefijos:
+    """
+    Arreglo ordenado de claves (símbolos, alias y nombres normalizados) con su
+    ticker destino; una búsqueda por prefijo son dos bisect sobre el arreglo,
+    lo bastante rápido para correr en cada tecla.
+    """
+
+    def __init__(self, pares):
+        pares = sorted({(normalizar(clave), destino) for clave, destino in pares if clave})
+        self.claves = [clave for clave, _ in pares]
+        self.destinos = [destino for _, destino in pares]
+
+    def buscar(self, prefijo, limite=10):
+        """Tickers cuyo símbolo, alias o nombre empieza con el prefijo (sin repetir)."""
+        p = normalizar(prefijo)
+        if not p:
+            return []
+        inicio = bisect_left(self.claves, p)
+        fin = bisect_left(self.claves, p + "\uffff", lo=inicio)
+        encontrados = {}
+        for i in range(inicio, fin):
+            encontrados.setdefault(self.destinos[i], None)
+            if len(encontrados) >= limite:
+                break
+        return list(encontrados)
+
+    def resolver(self, simbolo):
+        """Ticker destino de una clave exacta o None si es desconocida."""
+        s = normalizar(simbolo)
+        i = bisect_left(self.claves, s)
+        if i < len(self.claves) and self.claves[i] == s:
+            return self.destinos[i]
+        return None
+
+
+def indice_prefijos(registro, catalogo=None):
+    """
+    Índice de autocompletado sobre el registro (claves y alias) y el catálogo
+    de emisoras {ticker: {"razon_social": ...}} del screener.
+    """
+    pares = []
+    for alias, clave in registro._alias.items():
+        pares.append((alias, clave))
+    for clave in registro.tickers():
+        pares.append((registro.nombre(clave), clave))
+    for ticker, meta in (catalogo or {}).items():
+        destino = registro.resolver(ticker) or normalizar(ticker)
+        pares.append((ticker, destino))
+        pares.append((_sin_sufijos(normalizar(ticker)), destino))
+        if meta.get("razon_social"):
+            pares.append((meta["razon_social"], destino))
+    return IndicePrefijos(pares)
+
+
+REGISTRO = RegistroTickers.cargar()